@@ -0,0 +1,51 @@
+"""
+shared route dependencies
+
+unit id:
+state is sharded per unit (or nurse), see app/core/state.py.
+clients pick their shard with the `X-Unit-Id` header. leaving it out uses the
+default unit, so single-unit demos and the swagger UI work without extra setup.
+
+unit ids become registry keys and sqlite rows, so they are checked here: short,
+plain ascii, no empty string. anything else is a 422 before a route runs.
+
+validation timing:
+FastAPI validates the request body before the route runs, so the route can't
+time it with metrics.stage(). it does solve dependencies first though, so a
+dependency marks the start and the route records the rest (see validation_started).
+"""
+
+import time
+
+from fastapi import Header
+
+from app.core.state import DEFAULT_UNIT_ID
+
+UNIT_ID_PATTERN = r"^[A-Za-z0-9][A-Za-z0-9._:-]*$"
+UNIT_ID_MAX_LENGTH = 64
+
+
+def unit_id(
+    x_unit_id: str = Header(
+        default=DEFAULT_UNIT_ID,
+        description="Unit (or nurse) whose shift state this request works on.",
+        pattern=UNIT_ID_PATTERN,
+        max_length=UNIT_ID_MAX_LENGTH,
+    ),
+) -> str:
+    return x_unit_id
+
+
+async def validation_started() -> float:
+    """
+    perf_counter() right before FastAPI validates the request body.
+
+    A route that depends on it records the "validate" stage first thing:
+
+        metrics.record("validate", time.perf_counter() - started)
+
+    The JSON is already parsed by then, so this is the pydantic part only.
+    Async so it runs on the event loop, without a threadpool hop of its own
+    (a sync route's own hop to a worker thread is still counted).
+    """
+    return time.perf_counter()
@@ -0,0 +1,60 @@
+"""
+ndjson streaming for schedules
+
+why this exists:
+for big (multi-day, unit-wide) schedules, building the whole ScheduleResponse,
+validating it again through response_model and only then sending it means the
+client waits for everything and the server holds everything in memory.
+
+clients that send `Accept: application/x-ndjson` get one JSON object per line instead:
+
+    {"kind": "start", "generated_at": "..."}
+    {"kind": "task", "task": {...ScheduledTask...}}      (one per placed task, in order)
+    {"kind": "end", "notes": [...], "unscheduled_count": 3}
+
+each task line is written as soon as the placement loop fixes it.
+notes and unscheduled_count are only known at the end, so they come last.
+"""
+
+from __future__ import annotations
+
+from typing import Iterator
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+
+from app.api.responses import TASK_ADAPTER
+from app.services.scheduler import ScheduleStream
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(request: Request) -> bool:
+    """
+    True when the client asked for the streaming format.
+    Everyone else keeps getting the normal JSON ScheduleResponse.
+    """
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _lines(stream: ScheduleStream) -> Iterator[bytes]:
+    yield to_json({"kind": "start", "generated_at": stream.generated_at}) + b"\n"
+
+    for task in stream.tasks:
+        yield b'{"kind":"task","task":' + TASK_ADAPTER.dump_json(task) + b"}\n"
+
+    yield to_json(
+        {
+            "kind": "end",
+            "notes": stream.notes,
+            "unscheduled_count": stream.unscheduled_count,
+        }
+    ) + b"\n"
+
+
+def ndjson_schedule_response(stream: ScheduleStream) -> StreamingResponse:
+    """
+    Wraps a ScheduleStream in a streaming NDJSON response.
+    """
+    return StreamingResponse(_lines(stream), media_type=NDJSON_MEDIA_TYPE)
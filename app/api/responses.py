@@ -0,0 +1,88 @@
+"""
+response helpers shared by the scheduling routes
+
+why this exists:
+returning a pydantic model from a route with response_model set makes FastAPI
+validate the whole model again and then serialize it in a second pass. for a
+schedule the scheduler just built out of trusted values (see model_construct in
+app/services/scheduler.py), that is pure overhead, and on big schedules a big
+share of request latency.
+
+so scheduling routes hand their result to these helpers instead:
+- one pass, straight to JSON bytes, through a TypeAdapter built once at import
+- timed as the "serialize" metrics stage (FastAPI serializing after the route
+  returns is something we can't time)
+
+response_model stays on the routes, so /docs still shows the real schema.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.core import metrics
+from app.schemas.clinical import (
+    BatchScheduleResponse,
+    ScheduledTask,
+    ScheduleDiff,
+    ScheduleResponse,
+)
+
+# Building a TypeAdapter compiles a serializer, so we do it once, not per request.
+SCHEDULE_ADAPTER = TypeAdapter(ScheduleResponse)
+BATCH_ADAPTER = TypeAdapter(BatchScheduleResponse)
+DIFF_ADAPTER = TypeAdapter(ScheduleDiff)
+TASK_ADAPTER = TypeAdapter(ScheduledTask)
+
+
+def json_response(
+    adapter: TypeAdapter,
+    value: object,
+    headers: Optional[dict[str, str]] = None,
+    status_code: int = 200,
+) -> Response:
+    """
+    JSON response for any value `adapter` can dump, serialized once and timed.
+    """
+    with metrics.stage("serialize"):
+        body = adapter.dump_json(value)
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def schedule_json(result: ScheduleResponse) -> bytes:
+    """
+    A ScheduleResponse as JSON bytes, for pushed updates that are serialized
+    once and sent to many subscribers.
+    """
+    with metrics.stage("serialize"):
+        return SCHEDULE_ADAPTER.dump_json(result)
+
+
+def schedule_json_response(
+    result: ScheduleResponse,
+    headers: Optional[dict[str, str]] = None,
+) -> Response:
+    """
+    JSON response for a ScheduleResponse, serialized once and timed.
+    """
+    return json_response(SCHEDULE_ADAPTER, result, headers)
+
+
+def batch_json_response(result: BatchScheduleResponse) -> Response:
+    """
+    Same as schedule_json_response, for batch results.
+    """
+    return json_response(BATCH_ADAPTER, result)
+
+
+def diff_json_response(
+    diff: ScheduleDiff,
+    headers: Optional[dict[str, str]] = None,
+) -> Response:
+    """
+    Same as schedule_json_response, for replan diffs.
+    """
+    return json_response(DIFF_ADAPTER, diff, headers)
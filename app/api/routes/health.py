@@ -1,8 +1,28 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from app.core import metrics
 from app.core.config import settings
 
 router = APIRouter()
 
 @router.get("/health")
 def health():
-    return {"status": "ok", "app": settings.app_name, "env": settings.environment}
\ No newline at end of file
+    return {"status": "ok", "app": settings.app_name, "env": settings.environment}
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Scheduling stage timings and counters in the Prometheus text format.
+
+    Only available with METRICS_ENABLED=true (see app/core/metrics.py).
+    """
+    if not metrics.ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Metrics are disabled. Set METRICS_ENABLED=true to turn them on.",
+        )
+    return PlainTextResponse(
+        metrics.registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -1,9 +1,115 @@
-from fastapi import APIRouter
-from app.schemas.clinical import ScheduleRequest, ScheduleResponse
-from app.services.scheduler import generate_schedule
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from app.api.deps import validation_started
+from app.api.ndjson import ndjson_schedule_response, wants_ndjson
+from app.api.responses import batch_json_response, schedule_json, schedule_json_response
+from app.core import metrics
+from app.core.config import settings
+from app.schemas.clinical import (
+    BatchScheduleRequest,
+    BatchScheduleResponse,
+    ScheduleRequest,
+    ScheduleResponse,
+)
+from app.services.batch import BatchCapacityError, run_batch
+from app.services.order_table import to_epoch_us
+from app.services.schedule_cache import (
+    LRUCache,
+    next_due_us,
+    request_digest,
+    time_bucket,
+    urgency_bucket_seconds,
+)
+from app.services.scheduler import generate_schedule, stream_schedule
 
 router = APIRouter()
 
+# (request digest, scheduler settings, time bucket)
+#   -> (response body, computed at, expires at: the next due time in epoch us, if any)
+_generate_cache: LRUCache[tuple[bytes, datetime, Optional[int]]] = LRUCache(
+    settings.generate_cache_max_entries,
+    max_bytes=settings.generate_cache_max_bytes,
+    weigh=lambda entry: len(entry[0]),
+)
+_GENERATE_BUCKET_SECONDS = urgency_bucket_seconds(settings.generate_cache_max_urgency_drift)
+
+
 @router.post("/schedule/generate", response_model=ScheduleResponse)
-def schedule_generate(req: ScheduleRequest):
-    return generate_schedule(req)
\ No newline at end of file
+def schedule_generate(
+    req: ScheduleRequest,
+    request: Request,
+    started: float = Depends(validation_started),
+):
+    metrics.record("validate", time.perf_counter() - started)
+
+    # Opt-in streaming: `Accept: application/x-ndjson` gets one task per line
+    # as soon as it is placed (see app/api/ndjson.py).
+    if wants_ndjson(request):
+        return ndjson_schedule_response(stream_schedule(req))
+    if settings.generate_cache_enabled:
+        return _cached_schedule_response(req)
+    return schedule_json_response(generate_schedule(req))
+
+
+def _cached_schedule_response(req: ScheduleRequest) -> Response:
+    """
+    generate_schedule through the result cache (settings.generate_cache_enabled).
+
+    The `X-Cache` header says HIT or MISS, and `Age` how many seconds ago the
+    returned schedule was computed (never more than one time bucket). A cached
+    schedule is also never served once one of its orders has become overdue.
+    """
+    now = datetime.now(timezone.utc)
+    key = (
+        request_digest(req),
+        settings.schedule_selection,
+        settings.schedule_placement,
+        settings.schedule_optimize_ms,
+        time_bucket(now, _GENERATE_BUCKET_SECONDS),
+    )
+
+    now_us = to_epoch_us(now)
+    cached = _generate_cache.get(key, is_fresh=lambda entry: entry[2] is None or now_us < entry[2])
+    if cached is not None:
+        body, computed_at, _ = cached
+        age = int((now - computed_at).total_seconds())
+        cache_status = "HIT"
+    else:
+        body = schedule_json(generate_schedule(req, now=now))
+        _generate_cache.put(key, (body, now, next_due_us(req, now)))
+        age, cache_status = 0, "MISS"
+
+    headers = {"X-Cache": cache_status, "Age": str(age)}
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.post("/schedule/generate/batch", response_model=BatchScheduleResponse)
+async def schedule_generate_batch(batch: BatchScheduleRequest):
+    """
+    Generates many schedules in one call (for example every nurse on a unit at shift change).
+
+    Items run in parallel on a bounded worker pool and results come back in order.
+    A bad item gets an `error` instead of a `schedule`, the rest still succeed.
+    """
+    if len(batch.requests) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Batch too large: at most {settings.batch_max_items} requests per call.",
+        )
+
+    try:
+        results = await run_batch(batch.requests)
+    except BatchCapacityError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+        ) from e
+
+    # Serializing a few hundred schedules is real work, keep it off the event loop.
+    return await run_in_threadpool(
+        batch_json_response, BatchScheduleResponse.model_construct(results=results)
+    )
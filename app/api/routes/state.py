@@ -5,6 +5,10 @@ these endpoints let us:
 - set shift / patient list once
 - add/remove orders as the "shift" evolves
 - replan the schedule without resending the entire payload
+- subscribe to schedule updates instead of polling for them
+
+every endpoint works on one unit's state, picked with the `X-Unit-Id` header
+(see app/api/deps.py). no header means the default unit.
 
 this is a backend leap because it introduces:
 - state
@@ -14,25 +18,106 @@ this is a backend leap because it introduces:
 
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Optional
-
-from fastapi import APIRouter, HTTPException, status
-from pydantic import BaseModel
-
-from app.core.state import get_context, reset_context
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, AsyncIterator, Literal, Optional, Union
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+
+from app.api.deps import unit_id
+from app.api.ndjson import NDJSON_MEDIA_TYPE, ndjson_schedule_response, wants_ndjson
+from app.api.responses import diff_json_response, json_response, schedule_json, schedule_json_response
+from app.core.config import settings
+from app.core.errors import describe_validation_error
+from app.core.state import ShiftContext, context_version, get_context, peek_context, reset_context
 from app.schemas.clinical import (
     Order,
     Patient,
-    ScheduleRequest,
+    RecurringOrder,
+    ScheduleDiff,
     ScheduleResponse,
     Shift,
 )
-from app.services.scheduler import generate_schedule
+from app.services.broadcast import DebouncedBroadcaster
+from app.services.order_table import to_epoch_us
+from app.services.schedule_cache import LRUCache, time_bucket
+from app.services.schedule_diff import diff_schedules
+from app.services.singleflight import OverloadedError, SingleFlight
+from app.services.scheduler import ScheduleStream, plan_ranked, timeline_start
 
 router = APIRouter(prefix="/state")
 
 
+@dataclass(frozen=True)
+class _Plan:
+    """
+    A computed replan, as cached.
+    """
+    result: ScheduleResponse
+    # where the timeline starts if it was laid out back to back (sequential
+    # placement), None for gap placement, whose slots hang on due times
+    origin: Optional[datetime]
+    # stale from here on (epoch us), see _lookup
+    expires_us: Optional[int]
+
+
+# (version scope, context version, time bucket, expiry it replaces), see _lookup
+_CacheKey = tuple[str, int, int, int]
+
+_replan_cache: LRUCache[_Plan] = LRUCache(settings.replan_cache_max_entries)
+
+# Replans run here, not on FastAPI's threadpool, and identical ones are merged.
+_replan_executor = ThreadPoolExecutor(
+    max_workers=settings.replan_max_workers,
+    thread_name_prefix="careshift-replan",
+)
+_replan_flights: SingleFlight[Optional[tuple[_CacheKey, _Plan]]] = SingleFlight(
+    _replan_executor, max_pending=settings.replan_max_pending
+)
+
+
+async def _feed_event(unit: str) -> Optional[tuple[str, bytes]]:
+    """
+    Current schedule of a unit for GET /state/subscribe: (schedule version, JSON).
+    Goes through the replan cache and single flight like /state/replan.
+    """
+    try:
+        key, plan, _ = await _current_schedule(peek_context(unit), datetime.now(timezone.utc))
+    except HTTPException:
+        # No shift yet, or overloaded: nothing to send, the next change or refresh tries again.
+        return None
+    return _schedule_version(key), schedule_json(plan.result)
+
+
+# Pushed updates: one replan per burst of changes, sent to every subscriber of the unit.
+_feed = DebouncedBroadcaster(
+    _feed_event,
+    debounce_seconds=settings.subscribe_debounce_ms / 1000,
+    heartbeat_seconds=settings.subscribe_heartbeat_seconds,
+    refresh_seconds=settings.subscribe_refresh_seconds,
+)
+
+
+async def _changes_unit(unit: str = Depends(unit_id)) -> AsyncIterator[str]:
+    """
+    unit_id for routes that change state: once the route changed something,
+    subscribers of the unit get a replan (debounced, see app/services/broadcast.py).
+
+    "Changed something" is the context version moving. Routes also answer
+    validation problems with a plain 422 response rather than an exception,
+    so getting past the yield doesn't mean anything was committed.
+    """
+    before = context_version(unit)
+    yield unit
+    if context_version(unit) != before:
+        _feed.changed(unit)
+
+
 class StateResponse(BaseModel):
     """
     What we return when someone asks for current state.
@@ -41,28 +126,112 @@ class StateResponse(BaseModel):
     shift: Optional[Shift]
     patients: list[Patient]
     orders: list[Order]
+    recurring_orders: list[RecurringOrder]
     updated_at: str
 
 
+class BulkOrderError(BaseModel):
+    """
+    One rejected row from a bulk order import.
+    `index` is the position of the row in the array (or the NDJSON line, skipping blanks).
+    """
+    index: int
+    order_id: Optional[str] = None
+    detail: str
+
+
+class BulkOrderResult(BaseModel):
+    """
+    Outcome of a bulk order import.
+    Imports are all or nothing, so either `accepted` is the full batch or `errors` is not empty.
+    """
+    accepted: int
+    errors: list[BulkOrderError]
+
+
+class SetShiftOp(BaseModel):
+    op: Literal["set_shift"]
+    shift: Shift
+
+
+class SetPatientsOp(BaseModel):
+    op: Literal["set_patients"]
+    patients: list[Patient]
+
+
+class AddOrderOp(BaseModel):
+    op: Literal["add_order"]
+    order: Order
+
+
+class DeleteOrderOp(BaseModel):
+    op: Literal["delete_order"]
+    # a one-off order id, or a recurring occurrence id ("{id}@{k}")
+    order_id: str
+
+
+StateOperation = Annotated[
+    Union[SetShiftOp, SetPatientsOp, AddOrderOp, DeleteOrderOp],
+    Field(discriminator="op"),
+]
+
+
+class StateTransaction(BaseModel):
+    """
+    Operations applied in order, all or none.
+    With `replan`, the response also carries the schedule for the new state.
+    """
+    operations: list[StateOperation] = Field(min_length=1)
+    replan: bool = False
+
+
+class TransactionError(BaseModel):
+    """
+    One rejected operation. `index` is its position in `operations`.
+    """
+    index: int
+    op: str
+    detail: str
+
+
+class TransactionResult(BaseModel):
+    """
+    Outcome of a transaction: either every operation was applied, or `errors` is not empty.
+    """
+    applied: int
+    errors: list[TransactionError]
+    schedule: Optional[ScheduleResponse] = None
+
+
+_TRANSACTION_ADAPTER = TypeAdapter(TransactionResult)
+
+
 @router.get("", response_model=StateResponse)
-def get_state() -> StateResponse:
+def get_state(unit: str = Depends(unit_id)) -> StateResponse:
     """
     Returns the current in-memory state.
 
     This is basically our "debug dashboard" for the backend.
     If something looks wrong, check /state first.
     """
-    ctx = get_context()
+    ctx = peek_context(unit)
+
+    # one lock hold so shift, patients and orders come from the same moment
+    with ctx.lock:
+        shift, patients, orders = ctx.shift, ctx.patients, ctx.orders
+        recurring = ctx.recurring_orders
+
     return StateResponse(
-        shift=ctx.shift,
-        patients=ctx.patients,
-        orders=ctx.orders,
+        shift=shift,
+        patients=patients,
+        orders=orders,
+        recurring_orders=recurring,
         updated_at=datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
     )
 
 
 @router.post("/reset", status_code=status.HTTP_204_NO_CONTENT)
-def reset_state() -> None:
+def reset_state(unit: str = Depends(_changes_unit)) -> None:
     """
     Resets state for demos and dev work.
 
@@ -71,11 +240,11 @@ def reset_state() -> None:
     - state gets messy
     - reset and start clean
     """
-    reset_context()
+    reset_context(unit)
 
 
 @router.post("/shift", response_model=Shift)
-def set_shift(shift: Shift) -> Shift:
+def set_shift(shift: Shift, unit: str = Depends(_changes_unit)) -> Shift:
     """
     Sets the shift window in state.
 
@@ -87,13 +256,13 @@ def set_shift(shift: Shift) -> Shift:
             detail="Invalid shift window: end_at must be after start_at.",
         )
 
-    ctx = get_context()
-    ctx.shift = shift
+    ctx = get_context(unit)
+    ctx.set_shift(shift)
     return shift
 
 
 @router.post("/patients", response_model=list[Patient])
-def set_patients(patients: list[Patient]) -> list[Patient]:
+def set_patients(patients: list[Patient], unit: str = Depends(_changes_unit)) -> list[Patient]:
     """
     Replaces the current patient list.
 
@@ -110,66 +279,573 @@ def set_patients(patients: list[Patient]) -> list[Patient]:
             detail="Patient IDs must be unique.",
         )
 
-    ctx = get_context()
-    ctx.patients = patients
+    ctx = get_context(unit)
 
     # Optional cleanup:
     # If we removed a patient, any orders referencing them become invalid.
-    # For v1, we filter those orders out so state stays consistent.
-    patient_ids = set(ids)
-    ctx.orders = [o for o in ctx.orders if o.patient_id in patient_ids]
+    # For v1, we drop those orders so state stays consistent.
+    # The context only touches the orders of patients that were actually removed.
+    ctx.set_patients(patients)
 
     return patients
 
 
 @router.post("/orders", response_model=Order, status_code=status.HTTP_201_CREATED)
-def add_order(order: Order) -> Order:
+def add_order(order: Order, unit: str = Depends(_changes_unit)) -> Order:
     """
     Adds a single order to state.
 
     This simulates "new order placed" during the shift.
     """
-    ctx = get_context()
+    ctx = get_context(unit)
+
+    # Checks and write under one lock hold, so two concurrent requests
+    # can't both pass the duplicate check with the same id.
+    with ctx.lock:
+        if not ctx.has_patient(order.patient_id):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Unknown patient_id '{order.patient_id}'. Add the patient first via POST /state/patients.",
+            )
+
+        # Enforce unique order IDs so delete/update is unambiguous.
+        if ctx.has_order(order.id):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Order with id '{order.id}' already exists.",
+            )
+        series_id = ctx.occurrence_series(order.id)
+        if series_id is not None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=_occurrence_id_taken(order.id, series_id),
+            )
+
+        ctx.add_order(order)
+    return order
+
+
+_BULK_ORDERS_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {"type": "array", "items": {"$ref": "#/components/schemas/Order"}},
+            },
+            NDJSON_MEDIA_TYPE: {
+                "schema": {"type": "string", "description": "One Order JSON object per line."},
+            },
+        },
+    }
+}
+
+
+async def _iter_ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    """
+    Splits the request body into lines as it arrives, so a big feed is parsed
+    row by row instead of being held as one giant JSON document.
+    """
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    yield buffer
+
 
-    if not ctx.has_patient(order.patient_id):
+async def _parse_bulk_rows(request: Request) -> AsyncIterator[tuple[int, Order | str]]:
+    """
+    Yields (index, Order) for every valid row and (index, error message) for every bad one.
+    """
+    if NDJSON_MEDIA_TYPE in request.headers.get("content-type", ""):
+        index = 0
+        async for line in _iter_ndjson_lines(request):
+            if not line.strip():
+                continue
+            try:
+                yield index, Order.model_validate_json(line)
+            except ValidationError as e:
+                yield index, describe_validation_error(e)
+            index += 1
+        return
+
+    try:
+        rows = json.loads(await request.body())
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=f"Unknown patient_id '{order.patient_id}'. Add the patient first via POST /state/patients.",
-        )
+            detail=f"Body is not valid JSON: {e}",
+        ) from e
 
-    # Enforce unique order IDs so delete/update is unambiguous.
-    if any(o.id == order.id for o in ctx.orders):
+    if not isinstance(rows, list):
         raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"Order with id '{order.id}' already exists.",
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Body must be a JSON array of orders (or NDJSON with Content-Type: application/x-ndjson).",
         )
 
-    ctx.orders.append(order)
-    return order
+    for index, row in enumerate(rows):
+        try:
+            yield index, Order.model_validate(row)
+        except ValidationError as e:
+            yield index, describe_validation_error(e)
+
+
+@router.post(
+    "/orders/bulk",
+    response_model=BulkOrderResult,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=_BULK_ORDERS_OPENAPI,
+    responses={422: {"model": BulkOrderResult}},
+)
+async def add_orders_bulk(request: Request, unit: str = Depends(_changes_unit)):
+    """
+    Imports many orders at once, for example a simulated EHR feed.
+
+    Accepts a JSON array of orders, or NDJSON (one order per line) when sent with
+    `Content-Type: application/x-ndjson`.
+
+    Every row is checked in one pass:
+    - the row is a valid Order
+    - the patient exists
+    - the order id is not already in state, and not repeated inside the batch
+    - the order id is not an occurrence id of a recurring order ("{id}@{k}")
+
+    All or nothing: if any row fails, nothing is applied and the response is a 422
+    listing every bad row. Otherwise all orders are added and we return 201.
+    """
+    # Parsing happens here on the event loop as the body streams in.
+    # Checking against state and applying happen together on a worker thread,
+    # under the context lock, so the import is atomic relative to other writes.
+    rows = [row async for row in _parse_bulk_rows(request)]
+    result = await run_in_threadpool(_apply_bulk_orders, get_context(unit), rows)
+
+    if result.errors:
+        return JSONResponse(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            content=result.model_dump(),
+        )
+    return result
+
+
+def _apply_bulk_orders(
+    ctx: ShiftContext,
+    rows: list[tuple[int, Order | str]],
+) -> BulkOrderResult:
+    accepted: list[Order] = []
+    errors: list[BulkOrderError] = []
+    seen_ids: set[str] = set()
+
+    with ctx.lock:
+        for index, row in rows:
+            if isinstance(row, str):
+                errors.append(BulkOrderError(index=index, detail=row))
+                continue
+
+            if not ctx.has_patient(row.patient_id):
+                detail = f"Unknown patient_id '{row.patient_id}'."
+            elif ctx.has_order(row.id):
+                detail = f"Order with id '{row.id}' already exists."
+            elif (series_id := ctx.occurrence_series(row.id)) is not None:
+                detail = _occurrence_id_taken(row.id, series_id)
+            elif row.id in seen_ids:
+                detail = f"Order id '{row.id}' appears more than once in this batch."
+            else:
+                seen_ids.add(row.id)
+                accepted.append(row)
+                continue
+
+            errors.append(BulkOrderError(index=index, order_id=row.id, detail=detail))
+
+        if errors:
+            return BulkOrderResult(accepted=0, errors=errors)
+
+        ctx.add_orders(accepted)
+
+    return BulkOrderResult(accepted=len(accepted), errors=[])
 
 
 @router.delete("/orders/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_order(order_id: str) -> None:
+def delete_order(order_id: str, unit: str = Depends(_changes_unit)) -> None:
     """
     Removes an order from state.
 
     This simulates:
     - order discontinued
     - order completed and no longer needs scheduling
+
+    Occurrence ids of recurring orders ("{id}@{k}", as shown in the schedule)
+    work too: only that occurrence is marked done, the series keeps going.
     """
-    ctx = get_context()
-    before = len(ctx.orders)
-    ctx.orders = [o for o in ctx.orders if o.id != order_id]
+    ctx = peek_context(unit)
 
-    if len(ctx.orders) == before:
+    with ctx.lock:
+        if ctx.remove_order(order_id) is None and ctx.complete_occurrence(order_id) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Order '{order_id}' not found.",
+            )
+
+
+@router.post("/recurring-orders", response_model=RecurringOrder, status_code=status.HTTP_201_CREATED)
+def add_recurring_order(rec: RecurringOrder, unit: str = Depends(_changes_unit)) -> RecurringOrder:
+    """
+    Adds a recurring order (q1h neuro checks, q4h vitals) as one definition.
+
+    Its occurrences show up in replans as orders with ids "{id}@{k}", only for
+    the ones due inside the current shift, or in the hour before it and still open.
+    Those ids are reserved for the series: a 409 if one-off orders already use
+    some of them, and one-off orders can't take them later.
+    """
+    ctx = get_context(unit)
+
+    with ctx.lock:
+        if not ctx.has_patient(rec.patient_id):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Unknown patient_id '{rec.patient_id}'. Add the patient first via POST /state/patients.",
+            )
+
+        if ctx.has_recurring(rec.id):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Recurring order with id '{rec.id}' already exists.",
+            )
+        clashes = ctx.order_ids_in_series(rec.id)
+        if clashes:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=(
+                    f"Recurring order id '{rec.id}' would reuse the ids of existing orders "
+                    f"({', '.join(clashes[:5])}). Pick another id."
+                ),
+            )
+
+        ctx.add_recurring(rec)
+    return rec
+
+
+def _occurrence_id_taken(order_id: str, series_id: str) -> str:
+    return f"Order id '{order_id}' is an occurrence id of recurring order '{series_id}'. Pick another id."
+
+
+@router.delete("/recurring-orders/{series_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_recurring_order(series_id: str, unit: str = Depends(_changes_unit)) -> None:
+    """
+    Discontinues a recurring order: none of its occurrences get scheduled anymore.
+    """
+    ctx = peek_context(unit)
+
+    if ctx.remove_recurring(series_id) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Order '{order_id}' not found.",
+            detail=f"Recurring order '{series_id}' not found.",
+        )
+
+
+@router.post(
+    "/transaction",
+    response_model=TransactionResult,
+    responses={
+        422: {"model": TransactionResult},
+        503: {"description": "Applied, but too many replans in progress to return a schedule."},
+    },
+)
+async def apply_transaction(txn: StateTransaction, unit: str = Depends(_changes_unit)) -> Response:
+    """
+    Applies several changes at once, for example a bedside event like
+    "discontinue two meds, add a STAT lab, then replan", in one request.
+
+    Operations (`op`): set_shift, set_patients, add_order, delete_order. They run
+    in order, each one sees what the ones before it did (an order can be added for
+    a patient that set_patients just introduced, and set_patients drops the orders
+    of patients it removes, like POST /state/patients).
+
+    Every operation is checked against the indexed state first, without changing
+    it. If any fails, nothing is applied and the response is a 422 listing every
+    bad operation. Otherwise all of them are applied under one lock hold (one
+    commit with the sqlite backends) and we return 200.
+
+    With `"replan": true` the schedule for the resulting state comes back in the
+    same response, with the `ETag` and `X-Cache` headers /state/replan sends.
+    """
+    ctx = get_context(unit)
+    errors = await run_in_threadpool(_apply_transaction, ctx, txn)
+    if errors:
+        result = TransactionResult(applied=0, errors=errors)
+        return json_response(
+            _TRANSACTION_ADAPTER, result, status_code=status.HTTP_422_UNPROCESSABLE_ENTITY
         )
 
+    applied = len(txn.operations)
+    if not txn.replan:
+        return json_response(_TRANSACTION_ADAPTER, TransactionResult(applied=applied, errors=[]))
+
+    key, plan, cache_status = await _current_schedule(ctx, datetime.now(timezone.utc))
+    result = TransactionResult.model_construct(applied=applied, errors=[], schedule=plan.result)
+    headers = {"ETag": f'"{_schedule_version(key)}"', "X-Cache": cache_status}
+    return json_response(_TRANSACTION_ADAPTER, result, headers=headers)
+
+
+class _PendingState:
+    """
+    What the context would look like after the operations checked so far,
+    tracked as a few small overlays on top of the real indexes. Checking an
+    operation costs the same as the matching single route would, whatever the
+    size of the state.
+    """
+
+    def __init__(self, ctx: ShiftContext) -> None:
+        self.ctx = ctx
+        self.shift = ctx.shift
+        # None until a set_patients op, then the patient ids it set
+        self.patient_ids: Optional[set[str]] = None
+        # patients removed at some point: their existing orders are gone for good,
+        # even if a later set_patients brings the patient back
+        self.gone_patients: set[str] = set()
+        # order id -> patient id, for orders added by this transaction
+        self.added: dict[str, str] = {}
+        # existing order and occurrence ids deleted by this transaction
+        self.deleted: set[str] = set()
+
+    def has_patient(self, patient_id: str) -> bool:
+        if self.patient_ids is None:
+            return self.ctx.has_patient(patient_id)
+        return patient_id in self.patient_ids
+
+    def has_order(self, order_id: str) -> bool:
+        if order_id in self.added:
+            return True
+        if order_id in self.deleted:
+            return False
+        order = self.ctx.get_order(order_id)
+        if order is not None:
+            return order.patient_id not in self.gone_patients
+        occurrence = self.ctx.open_occurrence(order_id, self.shift)
+        return occurrence is not None and occurrence.patient_id not in self.gone_patients
+
+    def check(self, op: StateOperation) -> Optional[str]:
+        """
+        Error message if `op` can't be applied at this point, otherwise None
+        (and the op's effect is recorded).
+        """
+        if isinstance(op, SetShiftOp):
+            if op.shift.end_at <= op.shift.start_at:
+                return "Invalid shift window: end_at must be after start_at."
+            self.shift = op.shift
+
+        elif isinstance(op, SetPatientsOp):
+            ids = {p.id for p in op.patients}
+            if len(ids) != len(op.patients):
+                return "Patient IDs must be unique."
+            current = self.patient_ids if self.patient_ids is not None else self.ctx.patients_by_id().keys()
+            self.gone_patients |= current - ids
+            self.added = {oid: pid for oid, pid in self.added.items() if pid in ids}
+            self.patient_ids = ids
+
+        elif isinstance(op, AddOrderOp):
+            order = op.order
+            if not self.has_patient(order.patient_id):
+                return f"Unknown patient_id '{order.patient_id}'."
+            if self.has_order(order.id):
+                return f"Order with id '{order.id}' already exists."
+            series_id = self.ctx.occurrence_series(order.id)
+            if series_id is not None:
+                return _occurrence_id_taken(order.id, series_id)
+            self.added[order.id] = order.patient_id
+
+        else:
+            if not self.has_order(op.order_id):
+                return f"Order '{op.order_id}' not found."
+            if self.added.pop(op.order_id, None) is None:
+                self.deleted.add(op.order_id)
+
+        return None
+
+
+def _apply_transaction(ctx: ShiftContext, txn: StateTransaction) -> list[TransactionError]:
+    with ctx.transaction():
+        pending = _PendingState(ctx)
+        errors = [
+            TransactionError(index=index, op=op.op, detail=detail)
+            for index, op in enumerate(txn.operations)
+            if (detail := pending.check(op)) is not None
+        ]
+        if txn.replan and pending.shift is None:
+            errors.append(
+                TransactionError(
+                    index=len(txn.operations),
+                    op="replan",
+                    detail="Shift not set. Add a set_shift operation or use POST /state/shift first.",
+                )
+            )
+        if errors:
+            return errors
+
+        # Consecutive adds go in as one bulk add (one index update, one executemany).
+        adds: list[Order] = []
+        for op in txn.operations:
+            if isinstance(op, AddOrderOp):
+                adds.append(op.order)
+                continue
+            if adds:
+                ctx.add_orders(adds)
+                adds = []
+            if isinstance(op, SetShiftOp):
+                ctx.set_shift(op.shift)
+            elif isinstance(op, SetPatientsOp):
+                ctx.set_patients(op.patients)
+            elif ctx.remove_order(op.order_id) is None:
+                ctx.complete_occurrence(op.order_id)
+        if adds:
+            ctx.add_orders(adds)
+
+    return []
+
+
+def _compute_replan(ctx: ShiftContext, now: datetime) -> Optional[tuple[_CacheKey, _Plan]]:
+    """
+    Snapshot + placement for one replan. Runs on the replan executor.
+
+    Returns None when no shift is set, otherwise (cache key, plan). The key has the
+    version the schedule was actually computed from, which can be newer than the
+    one the caller saw, and it is what the result is cached (and tagged) under.
+    """
+    snap = ctx.snapshot(now)
+    if snap.shift is None:
+        return None
+
+    result = plan_ranked(snap.shift, snap.ranked, now, snap.total)
+    sequential = settings.schedule_placement == "sequential"
+    plan = _Plan(result, timeline_start(snap.shift, now) if sequential else None, snap.next_due_us)
+    key, _ = _lookup(ctx.version_scope(), snap.version, now)
+    _replan_cache.put(key, plan)
+    return key, plan
+
+
+def _lookup(scope: str, version: int, now: datetime) -> tuple[_CacheKey, Optional[_Plan]]:
+    """
+    Where the schedule of `version` at `now` is cached, and the plan if it is
+    there and still fresh.
+
+    A version is only unique within its scope (see ShiftContext.version_scope):
+    the process for in-memory and sqlite contexts, the unit on the shared backend.
+
+    A plan is good for its time bucket, and only until the first order it ranked
+    as not yet due becomes due (expires_us): that order's urgency steps up then,
+    however small the bucket. The plan computed after that is cached under the
+    same key with the expiry it replaces as the last part, so it gets its own
+    ETag and clients holding the old one see the change. Stale plans stay in
+    the cache as bases for `since` diffs.
+    """
+    key: _CacheKey = (scope, version, time_bucket(now, settings.replan_cache_bucket_seconds), 0)
+    now_us = to_epoch_us(now)
+    while (plan := _replan_cache.get(key)) is not None:
+        if plan.expires_us is None or now_us < plan.expires_us:
+            return key, plan
+        key = (*key[:3], plan.expires_us)
+    return key, None
+
+
+def _schedule_version(key: _CacheKey) -> str:
+    """
+    Public name of the schedule cached under `key`, used as the replan ETag
+    and as the `since` value for diffs. On the shared backend every worker
+    names the same schedule the same way.
+    """
+    return "-".join(map(str, key))
+
 
-@router.post("/replan", response_model=ScheduleResponse)
-def replan() -> ScheduleResponse:
+def _parse_schedule_version(value: str) -> Optional[_CacheKey]:
+    """
+    Cache key for something that looks like a schedule version, or None.
+    Accepts the ETag form too (quoted, optionally weak).
+    """
+    parts = _unquote_etag(value).split("-")
+    if len(parts) != 4 or not parts[0].isalnum() or not all(p.isdigit() for p in parts[1:]):
+        return None
+    scope, version, bucket, replaces = parts
+    return scope, int(version), int(bucket), int(replaces)
+
+
+def _unquote_etag(value: str) -> str:
+    return value.strip().removeprefix("W/").strip('"')
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip().removeprefix("W/") for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _replan_response(
+    key: _CacheKey,
+    plan: _Plan,
+    since: Optional[str],
+    cache_status: str,
+) -> Response:
+    """
+    Full schedule, or a diff against `since` when the client asked for one.
+    """
+    result = plan.result
+    schedule_version = _schedule_version(key)
+    headers = {"ETag": f'"{schedule_version}"', "X-Cache": cache_status}
+
+    if since is None:
+        return schedule_json_response(result, headers=headers)
+
+    # The base schedule has to still be in the replan cache. If it was evicted
+    # (or never ours) the client gets everything, flagged as a full refresh.
+    since_key = _parse_schedule_version(since)
+    base = _replan_cache.get(since_key) if since_key is not None else None
+    offset = timedelta(0)
+    if base is None:
+        added, moved, removed, full = result.tasks, [], [], True
+    else:
+        # Both laid out back to back: unchanged tasks slid with the timeline start.
+        if base.origin is not None and plan.origin is not None:
+            offset = plan.origin - base.origin
+        (added, moved, removed), full = diff_schedules(base.result, result, offset), False
+
+    diff = ScheduleDiff.model_construct(
+        version=schedule_version,
+        since=_unquote_etag(since),
+        generated_at=result.generated_at,
+        full=full,
+        offset_seconds=offset.total_seconds(),
+        added=added,
+        moved=moved,
+        removed=removed,
+        notes=result.notes,
+        unscheduled_count=result.unscheduled_count,
+    )
+    return diff_json_response(diff, headers=headers)
+
+
+def _shift_not_set() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        detail="Shift not set. Use POST /state/shift first.",
+    )
+
+
+@router.post(
+    "/replan",
+    response_model=Union[ScheduleResponse, ScheduleDiff],
+    responses={
+        304: {"description": "The schedule in If-None-Match is still current."},
+        503: {"description": "Too many replans in progress, retry shortly."},
+    },
+)
+async def replan(
+    request: Request,
+    unit: str = Depends(unit_id),
+    since: Optional[str] = Query(
+        default=None,
+        description="Schedule version (ETag) the client already has. Returns a ScheduleDiff against it.",
+    ),
+):
     """
     Generates a schedule using whatever is currently in state.
 
@@ -177,20 +853,116 @@ def replan() -> ScheduleResponse:
     - shift/patients set once
     - orders can change over time
     - we can regenerate a schedule without re-sending everything
+
+    Results are cached per (state version, time bucket), and until the next
+    order becomes due, so polling this while nothing changes is nearly free. Concurrent replans of the same version share
+    one computation. The `X-Cache` header says HIT, MISS or COALESCED (joined a
+    computation already in progress).
+
+    Scheduling runs on a small dedicated pool (settings.replan_max_workers).
+    If too many replans are queued, this returns 503 instead of piling up.
+
+    Versioning, for clients that poll:
+    - every schedule has a version, sent as the `ETag` header
+    - send it back as `If-None-Match` and get an empty 304 while it is still current
+    - or send it as `?since=` and get a ScheduleDiff (added / moved / removed tasks)
+      instead of the whole timeline
+
+    NDJSON streaming always computes fresh and has no ETag.
     """
-    ctx = get_context()
+    ctx = peek_context(unit)
+
+    # Scoring is incremental: the context keeps a priority index that add/delete
+    # update in O(log n), so a replan is mostly just timeline placement.
+    now = datetime.now(timezone.utc)
+
+    if wants_ndjson(request):
+        # The snapshot is taken under the context lock, placement runs outside
+        # it as the response streams.
+        snap = await run_in_threadpool(ctx.snapshot, now)
+        if snap.shift is None:
+            raise _shift_not_set()
+        stream = ScheduleStream(
+            shift=snap.shift,
+            ranked=snap.ranked,
+            now=now,
+            total=snap.total,
+        )
+        return ndjson_schedule_response(stream)
+
+    version = await run_in_threadpool(ctx.current_version)
 
+    # No shift means no schedule, so nothing for If-None-Match (not even "*") to match.
     if ctx.shift is None:
+        raise _shift_not_set()
+
+    key, _ = _lookup(ctx.version_scope(), version, now)
+    etag = f'"{_schedule_version(key)}"'
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    key, plan, cache_status = await _current_schedule(ctx, now, version)
+    return _replan_response(key, plan, since, cache_status)
+
+
+async def _current_schedule(
+    ctx: ShiftContext,
+    now: datetime,
+    version: Optional[int] = None,
+) -> tuple[_CacheKey, _Plan, str]:
+    """
+    The schedule for the context as of `version` (default: its current version)
+    at `now`, from the replan cache or computed once through the single flight.
+
+    Returns (cache key, plan, cache status). Raises the HTTP errors
+    /state/replan documents: 503 when overloaded, 422 when no shift is set.
+    """
+    if version is None:
+        version = await run_in_threadpool(ctx.current_version)
+    key, cached = _lookup(ctx.version_scope(), version, now)
+    if cached is not None:
+        return key, cached, "HIT"
+
+    try:
+        computed, shared = await _replan_flights.run(key, lambda: _compute_replan(ctx, now))
+    except OverloadedError as e:
         raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail="Shift not set. Use POST /state/shift first.",
-        )
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        ) from e
 
-    # We build the same ScheduleRequest the stateless endpoint expects.
-    req = ScheduleRequest(
-        shift=ctx.shift,
-        patients=ctx.patients,
-        orders=ctx.orders,
-    )
+    if computed is None:
+        raise _shift_not_set()
+
+    computed_key, plan = computed
+    return computed_key, plan, "COALESCED" if shared else "MISS"
+
+
+@router.get(
+    "/subscribe",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}, "description": "Server-Sent Events."}},
+)
+async def subscribe(
+    unit: str = Depends(unit_id),
+    last_event_id: Optional[str] = Header(default=None),
+) -> StreamingResponse:
+    """
+    Streams the unit's schedule as Server-Sent Events, instead of polling /state/replan.
+
+    - right away: the current schedule (skipped if `Last-Event-ID` says the client has it)
+    - after every burst of changes: the new schedule. Changes within
+      settings.subscribe_debounce_ms are merged into one replan, shared by all subscribers
+    - every settings.subscribe_refresh_seconds: a fresh plan, even without changes
 
-    return generate_schedule(req)
\ No newline at end of file
+    Each event is `event: schedule`, `id:` the schedule version (same as the
+    /state/replan ETag, so it also works as `?since=`), and `data:` a ScheduleResponse.
+    Nothing is sent until a shift is set.
+    """
+    return StreamingResponse(
+        _feed.stream(unit, last_event_id),
+        media_type="text/event-stream",
+        # no caching, and no buffering by nginx style proxies
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
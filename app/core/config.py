@@ -5,6 +5,76 @@ class Settings(BaseSettings):
     app_name: str = "CareShift"
     environment: str = "dev"
 
+    # Where the stateful shift context lives:
+    # - "memory": lost on restart, one copy per process
+    # - "sqlite": persisted to sqlite_path and reloaded on startup
+    # - "shared": sqlite_path shared by every worker (uvicorn --workers N)
+    state_backend: str = "memory"
+    sqlite_path: str = "careshift.db"
+
+    # How old the stateful priority index may get before /state/replan does a
+    # full rescore instead of reusing it (see app/services/priority.py). An order
+    # becoming overdue forces a rescore earlier, whatever this says.
+    rescore_interval_seconds: float = 60.0
+
+    # How generate_schedule orders scored tasks: "heap" pops only until the
+    # shift is full, "sort" sorts the whole backlog. Output is identical.
+    schedule_selection: str = "heap"
+
+    # How tasks land on the timeline: "sequential" packs them back to back and
+    # stops at the first one that doesn't fit, "gaps" anchors each task near its
+    # due time and fills leftover gaps (see app/services/placement.py).
+    schedule_placement: str = "sequential"
+
+    # Wall clock budget (ms) for the local search optimizer that reorders
+    # sequential schedules to cut lateness and patient switches. 0 turns it off.
+    # Applies to /schedule/generate (and batch) and to stateful replans
+    # (/state/replan, /state/subscribe, transaction replans), not to NDJSON streams.
+    schedule_optimize_ms: float = 0.0
+
+    # Replan cache: /state/replan results are reused for the same context
+    # version within one time bucket. Max entries bounds memory.
+    replan_cache_bucket_seconds: float = 15.0
+    replan_cache_max_entries: int = 64
+
+    # Opt-in result cache for the stateless POST /schedule/generate, keyed by a
+    # hash of the request and a time bucket. The bucket is as long as urgency can
+    # go without any order's urgency moving more than max_urgency_drift (0.01 is
+    # 18 seconds on the steepest part of the curve). Bounded by entries and by
+    # total size of the cached responses.
+    generate_cache_enabled: bool = False
+    generate_cache_max_urgency_drift: float = 0.01
+    generate_cache_max_entries: int = 1024
+    generate_cache_max_bytes: int = 64 * 1024 * 1024
+
+    # Replan execution: concurrent replans of the same state share one
+    # computation, run on their own small pool. Past max_pending, replans get a 503.
+    replan_max_workers: int = 2
+    replan_max_pending: int = 16
+
+    # Pushed schedule updates (GET /state/subscribe). Changes within the
+    # debounce window are merged into one replan per burst. A comment line goes
+    # out every heartbeat to keep proxies from closing idle streams, and every
+    # refresh subscribers get a fresh plan (urgency moves with time, and other
+    # workers' changes are not announced to this process).
+    subscribe_debounce_ms: float = 200.0
+    subscribe_heartbeat_seconds: float = 15.0
+    subscribe_refresh_seconds: float = 60.0
+
+    # Batch scheduling (POST /schedule/generate/batch).
+    # "process" gives real parallelism for the CPU bound scheduler, "thread" is
+    # lighter and fine when numpy does most of the work.
+    batch_executor: str = "process"
+    batch_max_workers: int = 4
+    # How many batches may run at the same time, extra ones get a 503.
+    batch_max_concurrent: int = 2
+    # Upper bound on items per batch call.
+    batch_max_items: int = 500
+
+    # Per stage timers and counters, served at GET /metrics and in a
+    # Server-Timing header on scheduling responses. Off means no overhead.
+    metrics_enabled: bool = False
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
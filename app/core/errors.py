@@ -0,0 +1,22 @@
+"""
+small helpers for turning errors into messages a human can read
+
+pydantic's ValidationError string is multi line and verbose. when we report
+errors per item (batch schedules, bulk order rows) we want one short line each.
+"""
+
+from __future__ import annotations
+
+from pydantic import ValidationError
+
+
+def describe_validation_error(e: ValidationError) -> str:
+    """
+    One line summary of a pydantic ValidationError.
+
+    Example: "orders.0.due_at: Field required; orders.0.type: Input should be 'lab', ..."
+    """
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'body'}: {err['msg']}"
+        for err in e.errors()
+    )
@@ -0,0 +1,195 @@
+"""
+scheduling metrics (v1)
+
+why this exists:
+when /schedule/generate or /state/replan is slow we want to know which part is slow:
+request validation, scoring, sorting, placement or serialization.
+
+what we keep:
+- a histogram per stage (careshift_stage_seconds{stage="..."})
+- a few counters: orders scored, tasks placed, orders dropped because the shift was full
+
+where it goes:
+- GET /metrics, in the Prometheus text format
+- a Server-Timing header on the response that did the work, so browser dev tools
+  and curl -v show the breakdown for one request
+
+this is off by default (settings.metrics_enabled). when it is off, stage() hands
+back one shared no-op context manager and count() returns right away, so the
+scheduler pays a function call and a bool check, nothing else.
+
+numbers are per process. with uvicorn --workers N each worker reports its own,
+which is what Prometheus expects when it scrapes them separately.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import ContextManager, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+ENABLED = settings.metrics_enabled
+
+# Upper bounds (seconds) of the stage histogram buckets. Scheduling stages go
+# from microseconds (tiny requests) to seconds (100k order backlogs).
+_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_COUNTER_HELP = {
+    "orders_scored": "Orders scored by the scheduler.",
+    "tasks_placed": "Tasks placed on a timeline.",
+    "orders_dropped_capacity": "Scored orders left unscheduled because the shift was full.",
+}
+
+_NOOP = nullcontext()
+
+# Stage timings of the request being handled, for the Server-Timing header.
+# Set by ServerTimingMiddleware, None outside a request (scripts, benchmarks).
+_request_timings: ContextVar[Optional[dict[str, float]]] = ContextVar("_request_timings", default=None)
+
+
+class _Registry:
+    """
+    Process wide counters and stage histograms.
+
+    Sync routes run on FastAPI's threadpool and replans on their own pool,
+    so every update goes through one lock. Updates are a few additions, the
+    lock is never held for long.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters: dict[str, float] = {name: 0 for name in _COUNTER_HELP}
+        # stage -> (per bucket counts (last one is +Inf), sum of seconds, count)
+        self.stages: dict[str, tuple[list[int], float, int]] = {}
+
+    def add(self, name: str, amount: float) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            buckets, total, count = self.stages.get(stage) or ([0] * (len(_BUCKETS) + 1), 0.0, 0)
+            buckets[bisect_left(_BUCKETS, seconds)] += 1
+            self.stages[stage] = (buckets, total + seconds, count + 1)
+
+    def render(self) -> str:
+        """
+        Everything in the Prometheus text exposition format.
+        """
+        with self._lock:
+            counters = dict(self.counters)
+            stages = {stage: (list(b), s, c) for stage, (b, s, c) in self.stages.items()}
+
+        lines: list[str] = []
+        for name, value in counters.items():
+            metric = f"careshift_{name}_total"
+            lines.append(f"# HELP {metric} {_COUNTER_HELP.get(name, name)}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value:g}")
+
+        lines.append("# HELP careshift_stage_seconds Time spent per scheduling stage.")
+        lines.append("# TYPE careshift_stage_seconds histogram")
+        for stage, (buckets, total, count) in sorted(stages.items()):
+            cumulative = 0
+            for bound, n in zip((*_BUCKETS, "+Inf"), buckets):
+                cumulative += n
+                lines.append(f'careshift_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'careshift_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'careshift_stage_seconds_count{{stage="{stage}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+
+registry = _Registry()
+
+
+class _StageTimer:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc: object) -> None:
+        record(self.name, time.perf_counter() - self.started)
+
+
+def stage(name: str) -> ContextManager[None]:
+    """
+    Times the body of a `with` block as one scheduling stage.
+
+        with metrics.stage("score"):
+            ...
+    """
+    if not ENABLED:
+        return _NOOP
+    return _StageTimer(name)
+
+
+def record(name: str, seconds: float) -> None:
+    """
+    Records an already measured stage duration (for stages that are not one block,
+    like placement, which runs interleaved with streaming).
+    """
+    if not ENABLED:
+        return
+    registry.observe(name, seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def count(name: str, amount: float = 1) -> None:
+    """
+    Bumps one of the counters in _COUNTER_HELP.
+    """
+    if not ENABLED or not amount:
+        return
+    registry.add(name, amount)
+
+
+class ServerTimingMiddleware:
+    """
+    Adds a Server-Timing header listing the stages recorded while handling the request.
+
+    Requests that record nothing (health checks, state reads) get no header.
+    For streamed responses the header goes out before placement happens, so it only
+    covers what ran before the first byte.
+
+    Plain ASGI rather than BaseHTTPMiddleware so streaming responses are untouched.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Worker threads (run_in_threadpool) copy the context, so they all see
+        # and fill this same dict.
+        timings: dict[str, float] = {}
+        token = _request_timings.set(timings)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start" and timings:
+                value = ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings.items())
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"server-timing", value.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
@@ -0,0 +1,308 @@
+"""
+cross-process shared shift context (v1)
+
+why this exists:
+with `uvicorn app.main:app --workers N` every worker process imports its own copy
+of app/core/state.py, so each worker would have its own diverging shift.
+
+how it works:
+all workers share one sqlite file (same tables as app/core/sqlite_store.py) plus
+a per-unit version head and a change log:
+
+- unit_heads(unit_id, version): the current version of each unit
+- unit_log(unit_id, version, op, payload): what each version changed
+
+every worker keeps the unit in memory like the single process store, so reads stay
+fast. before a worker touches a unit (any time it takes the context lock) it
+compares its version with the head. if another worker moved ahead, it replays the
+missing log entries (or fully reloads if the log was trimmed past it).
+
+writes are optimistic:
+a mutation bumps the head with `UPDATE ... WHERE version = <the version we saw>`.
+if another worker got there first the update matches no row, nothing is written,
+and we raise StateConflictError (the API answers 409, the client retries).
+refreshing on every lock acquire keeps that window down to the few milliseconds a
+route holds the lock, so conflicts are rare in practice.
+
+the in-memory backend is the local stand-in for dev and single worker runs.
+selected with settings.state_backend = "shared".
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+from dataclasses import replace
+from datetime import datetime
+from typing import Optional
+
+from pydantic import TypeAdapter
+
+from app.core.sqlite_store import SqliteShiftContext, connect
+from app.core.state import DEFAULT_UNIT_ID, ContextSnapshot, ShiftContext
+from app.schemas.clinical import Order, Patient, RecurringOrder, Shift
+
+_SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS unit_heads (
+    unit_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS unit_log (
+    unit_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    op TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (unit_id, version)
+);
+"""
+
+_ENSURE_HEAD = "INSERT OR IGNORE INTO unit_heads (unit_id, version) VALUES (?, 0)"
+_SELECT_HEAD = "SELECT version FROM unit_heads WHERE unit_id = ?"
+_BUMP_HEAD = "UPDATE unit_heads SET version = version + 1 WHERE unit_id = ? AND version = ?"
+_INSERT_LOG = "INSERT INTO unit_log (unit_id, version, op, payload) VALUES (?, ?, ?, ?)"
+_SELECT_LOG = (
+    "SELECT version, op, payload FROM unit_log "
+    "WHERE unit_id = ? AND version > ? ORDER BY version"
+)
+_TRIM_LOG = "DELETE FROM unit_log WHERE unit_id = ? AND version <= ?"
+
+# How many log entries to keep per unit. A worker that falls further behind
+# than this just reloads the unit from the tables.
+_LOG_RETENTION = 1024
+
+_SHIFT = TypeAdapter(Shift)
+_PATIENTS = TypeAdapter(list[Patient])
+_ORDERS = TypeAdapter(list[Order])
+_RECURRING = TypeAdapter(RecurringOrder)
+
+
+class StateConflictError(RuntimeError):
+    """
+    Another worker changed the unit between our read and our write.
+    Nothing was written. The API turns this into a 409 so the client can retry.
+    """
+
+
+class _RefreshingLock:
+    """
+    Reentrant lock that syncs the context with the shared db on first acquire.
+
+    Routes already take `ctx.lock` around everything they read or check, so
+    hooking the refresh here means every request sees what other workers wrote,
+    without each route having to remember to ask for it.
+    """
+
+    def __init__(self, ctx: SharedShiftContext) -> None:
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._ctx = ctx
+
+    def __enter__(self) -> _RefreshingLock:
+        self._lock.acquire()
+        self._depth += 1
+        if self._depth == 1:
+            try:
+                self._ctx._refresh()
+            except BaseException:
+                self._depth -= 1
+                self._lock.release()
+                raise
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._depth -= 1
+        self._lock.release()
+
+
+class SharedShiftContext(SqliteShiftContext):
+    """
+    SqliteShiftContext that stays in sync with other worker processes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        unit_id: str = DEFAULT_UNIT_ID,
+        conn: Optional[sqlite3.Connection] = None,
+    ) -> None:
+        conn = conn if conn is not None else connect(path)
+        conn.executescript(_SHARED_SCHEMA)
+        with conn:
+            conn.execute(_ENSURE_HEAD, (unit_id,))
+
+        # Read the head and the tables inside one read transaction, so the
+        # loaded state is exactly the state at that head (WAL snapshot).
+        conn.execute("BEGIN")
+        try:
+            self._db_version = conn.execute(_SELECT_HEAD, (unit_id,)).fetchone()[0]
+            super().__init__(path, unit_id=unit_id, conn=conn)
+        finally:
+            conn.execute("COMMIT")
+
+        self.lock = _RefreshingLock(self)
+
+    # ---- mutations (compare and swap on the unit version) ----
+
+    def set_shift(self, shift: Shift) -> None:
+        with self.lock:
+            self._stamp("shift", _SHIFT.dump_json(shift))
+            super().set_shift(shift)
+            self._db_version += 1
+
+    def set_patients(self, patients: list[Patient]) -> list[Order]:
+        with self.lock:
+            self._stamp("patients", _PATIENTS.dump_json(patients))
+            dropped = super().set_patients(patients)
+            self._db_version += 1
+            return dropped
+
+    def add_order(self, order: Order) -> None:
+        with self.lock:
+            self._stamp("add_orders", _ORDERS.dump_json([order]))
+            super().add_order(order)
+            self._db_version += 1
+
+    def add_orders(self, orders: list[Order]) -> None:
+        with self.lock:
+            self._stamp("add_orders", _ORDERS.dump_json(orders))
+            super().add_orders(orders)
+            self._db_version += 1
+
+    def remove_order(self, order_id: str) -> Optional[Order]:
+        with self.lock:
+            if not self.has_order(order_id):
+                return None
+            self._stamp("remove_order", order_id.encode())
+            removed = super().remove_order(order_id)
+            self._db_version += 1
+            return removed
+
+    def add_recurring(self, rec: RecurringOrder) -> None:
+        with self.lock:
+            self._stamp("add_recurring", _RECURRING.dump_json(rec))
+            super().add_recurring(rec)
+            self._db_version += 1
+
+    def remove_recurring(self, series_id: str) -> Optional[RecurringOrder]:
+        with self.lock:
+            if not self.has_recurring(series_id):
+                return None
+            self._stamp("remove_recurring", series_id.encode())
+            removed = super().remove_recurring(series_id)
+            self._db_version += 1
+            return removed
+
+    def complete_occurrence(self, order_id: str) -> Optional[Order]:
+        with self.lock:
+            if self.open_occurrence(order_id) is None:
+                return None
+            self._stamp("complete_occurrence", order_id.encode())
+            done = super().complete_occurrence(order_id)
+            self._db_version += 1
+            return done
+
+    def drop(self) -> None:
+        """
+        Wipes the unit for every worker: logged as a reset so the others clear too.
+        """
+        with self.lock:
+            self._stamp("reset", b"")
+            self._db_version += 1
+            super().drop()
+
+    # ---- sync ----
+
+    def current_version(self) -> int:
+        # taking the lock is what pulls in other workers' changes.
+        # the unit head, not the local counter: every worker agrees on it.
+        with self.lock:
+            return self._db_version
+
+    def version_scope(self) -> str:
+        # versions are unit heads, counted per unit: the unit is the scope
+        return hashlib.blake2s(self.unit_id.encode(), digest_size=4).hexdigest()
+
+    def snapshot(self, now: datetime) -> ContextSnapshot:
+        with self.lock:
+            return replace(super().snapshot(now), version=self._db_version)
+
+    def _stamp(self, op: str, payload: bytes) -> None:
+        """
+        Claims the next version for this unit and logs the change.
+
+        Runs inside the transaction the parent class commits together with
+        the row writes, so the version bump, the log entry and the data change
+        land atomically or not at all.
+        """
+        version = self._db_version
+        cur = self._conn.execute(_BUMP_HEAD, (self.unit_id, version))
+        if cur.rowcount != 1:
+            self._conn.rollback()
+            raise StateConflictError(
+                f"Unit '{self.unit_id}' was changed by another worker. Retry the request."
+            )
+
+        self._conn.execute(_INSERT_LOG, (self.unit_id, version + 1, op, payload))
+        if (version + 1) % 256 == 0:
+            self._conn.execute(_TRIM_LOG, (self.unit_id, version + 1 - _LOG_RETENTION))
+
+    def _refresh(self) -> None:
+        """
+        Catches up with changes other workers made since we last looked.
+        """
+        head = self._conn.execute(_SELECT_HEAD, (self.unit_id,)).fetchone()[0]
+        if head == self._db_version:
+            return
+
+        entries = self._conn.execute(_SELECT_LOG, (self.unit_id, self._db_version)).fetchall()
+        contiguous = (
+            head > self._db_version
+            and len(entries) == head - self._db_version
+            and entries[0][0] == self._db_version + 1
+        )
+
+        if not contiguous:
+            self._reload()
+            return
+
+        for version, op, payload in entries:
+            self._replay(op, payload)
+            self._db_version = version
+
+    def _replay(self, op: str, payload: bytes) -> None:
+        # The ShiftContext methods only touch memory. Going through them (and not
+        # our overrides) avoids writing back what another worker already wrote.
+        if op == "shift":
+            ShiftContext.set_shift(self, _SHIFT.validate_json(payload))
+        elif op == "patients":
+            ShiftContext.set_patients(self, _PATIENTS.validate_json(payload))
+        elif op == "add_orders":
+            ShiftContext.add_orders(self, _ORDERS.validate_json(payload))
+        elif op == "remove_order":
+            ShiftContext.remove_order(self, payload.decode())
+        elif op == "add_recurring":
+            ShiftContext.add_recurring(self, _RECURRING.validate_json(payload))
+        elif op == "remove_recurring":
+            ShiftContext.remove_recurring(self, payload.decode())
+        elif op == "complete_occurrence":
+            ShiftContext.complete_occurrence(self, payload.decode())
+        elif op == "reset":
+            self._clear_memory()
+        else:
+            raise ValueError(f"Unknown shared state op '{op}'.")
+
+    def _resync(self) -> None:
+        # Also rereads the head: the rolled back ops had moved _db_version on.
+        self._reload()
+
+    def _reload(self) -> None:
+        self._conn.execute("BEGIN")
+        try:
+            self._db_version = self._conn.execute(_SELECT_HEAD, (self.unit_id,)).fetchone()[0]
+            self._clear_memory()
+            self._load()
+        finally:
+            self._conn.execute("COMMIT")
+        self._bump()
+
@@ -0,0 +1,428 @@
+"""
+sqlite backed shift context (v1)
+
+why this exists:
+the in-memory store loses the whole shift on restart. restarting mid-shift
+should not mean re-posting every patient and order.
+
+how it works:
+SqliteShiftContext is a ShiftContext that writes every mutation through to a
+sqlite file. reads still come from the in-memory indexes, so replans are exactly
+as fast as before, and the db is only read once, at startup.
+
+performance choices:
+- WAL journal + synchronous=NORMAL: commits don't wait on a full fsync and
+  readers never block the writer
+- bulk order imports and patient cascades are one transaction with executemany
+- the SQL strings are module constants, so sqlite3's statement cache reuses the
+  prepared statements instead of re-parsing them
+- indexes on patient_id (cascade deletes) and due_at (time window queries)
+- warm start loads rows with Order.model_construct, skipping re-validation of
+  data we already validated before writing it
+- recurring orders are stored as their definition plus one row per completed
+  occurrence, never as expanded occurrences
+
+every row carries a unit_id, so each unit's context (shard) only loads and
+writes its own rows. each unit context gets its own connection; WAL lets the
+readers of one unit run while another unit writes.
+
+selected with settings.state_backend = "sqlite" (see app/core/state.py).
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from contextlib import closing, contextmanager, nullcontext
+from pathlib import Path
+from datetime import datetime
+from typing import ContextManager, Iterator, Optional
+
+from app.core.state import DEFAULT_UNIT_ID, ShiftContext
+from app.schemas.clinical import AcuityLevel, Order, OrderType, Patient, RecurringOrder, Shift
+from app.services.order_table import OrderTable
+from app.services.recurring import parse_occurrence_id
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shift (
+    unit_id TEXT PRIMARY KEY,
+    start_at TEXT NOT NULL,
+    end_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS patients (
+    unit_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    display_name TEXT NOT NULL,
+    acuity TEXT NOT NULL,
+    PRIMARY KEY (unit_id, id)
+);
+CREATE TABLE IF NOT EXISTS orders (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    unit_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    patient_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    description TEXT NOT NULL,
+    due_at TEXT NOT NULL,
+    duration_minutes INTEGER NOT NULL,
+    is_prn INTEGER NOT NULL,
+    is_stat INTEGER NOT NULL,
+    UNIQUE (unit_id, id)
+);
+CREATE INDEX IF NOT EXISTS ix_orders_patient_id ON orders (unit_id, patient_id);
+CREATE INDEX IF NOT EXISTS ix_orders_due_at ON orders (unit_id, due_at);
+CREATE TABLE IF NOT EXISTS recurring_orders (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    unit_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    patient_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    description TEXT NOT NULL,
+    first_due_at TEXT NOT NULL,
+    interval_minutes INTEGER NOT NULL,
+    count INTEGER,
+    ends_at TEXT,
+    duration_minutes INTEGER NOT NULL,
+    is_prn INTEGER NOT NULL,
+    is_stat INTEGER NOT NULL,
+    UNIQUE (unit_id, id)
+);
+CREATE TABLE IF NOT EXISTS recurring_done (
+    unit_id TEXT NOT NULL,
+    series_id TEXT NOT NULL,
+    occurrence INTEGER NOT NULL,
+    PRIMARY KEY (unit_id, series_id, occurrence)
+);
+"""
+
+_UPSERT_SHIFT = (
+    "INSERT INTO shift (unit_id, start_at, end_at) VALUES (?, ?, ?) "
+    "ON CONFLICT (unit_id) DO UPDATE SET start_at = excluded.start_at, end_at = excluded.end_at"
+)
+_DELETE_SHIFT = "DELETE FROM shift WHERE unit_id = ?"
+_DELETE_PATIENTS = "DELETE FROM patients WHERE unit_id = ?"
+_INSERT_PATIENT = (
+    "INSERT INTO patients (unit_id, id, position, display_name, acuity) VALUES (?, ?, ?, ?, ?)"
+)
+_DELETE_ORDERS = "DELETE FROM orders WHERE unit_id = ?"
+_DELETE_ORDERS_FOR_PATIENT = "DELETE FROM orders WHERE unit_id = ? AND patient_id = ?"
+_INSERT_ORDER = (
+    "INSERT INTO orders "
+    "(unit_id, id, patient_id, type, description, due_at, duration_minutes, is_prn, is_stat) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_DELETE_ORDER = "DELETE FROM orders WHERE unit_id = ? AND id = ?"
+_INSERT_RECURRING = (
+    "INSERT INTO recurring_orders "
+    "(unit_id, id, patient_id, type, description, first_due_at, interval_minutes, count, ends_at, "
+    "duration_minutes, is_prn, is_stat) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_DELETE_RECURRING = "DELETE FROM recurring_orders WHERE unit_id = ? AND id = ?"
+_DELETE_ALL_RECURRING = "DELETE FROM recurring_orders WHERE unit_id = ?"
+_DELETE_RECURRING_FOR_PATIENT = "DELETE FROM recurring_orders WHERE unit_id = ? AND patient_id = ?"
+_INSERT_DONE = "INSERT OR IGNORE INTO recurring_done (unit_id, series_id, occurrence) VALUES (?, ?, ?)"
+_DELETE_DONE = "DELETE FROM recurring_done WHERE unit_id = ? AND series_id = ?"
+_DELETE_ALL_DONE = "DELETE FROM recurring_done WHERE unit_id = ?"
+_DELETE_DONE_FOR_PATIENT = (
+    "DELETE FROM recurring_done WHERE unit_id = ? AND series_id IN "
+    "(SELECT id FROM recurring_orders WHERE unit_id = ? AND patient_id = ?)"
+)
+
+_SELECT_SHIFT = "SELECT start_at, end_at FROM shift WHERE unit_id = ?"
+_SELECT_PATIENTS = (
+    "SELECT id, display_name, acuity FROM patients WHERE unit_id = ? ORDER BY position"
+)
+_SELECT_ORDERS = (
+    "SELECT id, patient_id, type, description, due_at, duration_minutes, is_prn, is_stat "
+    "FROM orders WHERE unit_id = ? ORDER BY seq"
+)
+_SELECT_RECURRING = (
+    "SELECT id, patient_id, type, description, first_due_at, interval_minutes, count, ends_at, "
+    "duration_minutes, is_prn, is_stat "
+    "FROM recurring_orders WHERE unit_id = ? ORDER BY seq"
+)
+_SELECT_DONE = "SELECT series_id, occurrence FROM recurring_done WHERE unit_id = ?"
+_SELECT_HAS_UNIT = (
+    "SELECT EXISTS (SELECT 1 FROM shift WHERE unit_id = ?1) "
+    "OR EXISTS (SELECT 1 FROM patients WHERE unit_id = ?1) "
+    "OR EXISTS (SELECT 1 FROM orders WHERE unit_id = ?1) "
+    "OR EXISTS (SELECT 1 FROM recurring_orders WHERE unit_id = ?1)"
+)
+
+
+def _order_row(unit_id: str, o: Order) -> tuple:
+    return (
+        unit_id,
+        o.id,
+        o.patient_id,
+        o.type.value,
+        o.description,
+        o.due_at.isoformat(),
+        o.duration_minutes,
+        int(o.is_prn),
+        int(o.is_stat),
+    )
+
+
+def _recurring_row(unit_id: str, r: RecurringOrder) -> tuple:
+    return (
+        unit_id,
+        r.id,
+        r.patient_id,
+        r.type.value,
+        r.description,
+        r.first_due_at.isoformat(),
+        r.interval_minutes,
+        r.count,
+        r.ends_at.isoformat() if r.ends_at is not None else None,
+        r.duration_minutes,
+        int(r.is_prn),
+        int(r.is_stat),
+    )
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    Opens the db with the pragmas we want and makes sure the schema exists.
+    """
+    # check_same_thread=False because sync routes run on FastAPI's threadpool.
+    # Each context serializes its own use of the connection with its lock.
+    conn = sqlite3.connect(path, check_same_thread=False, cached_statements=64)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=OFF")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def has_unit(path: str, unit_id: str) -> bool:
+    """
+    Whether the db has any rows for `unit_id`, without loading them.
+
+    Uses its own short lived read-only connection: this is how read routes
+    decide whether a unit they have never seen is worth a context (and the
+    connection that comes with it). A missing db file or schema means no.
+    """
+    try:
+        conn = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+    except sqlite3.OperationalError:
+        return False
+    with closing(conn):
+        try:
+            return bool(conn.execute(_SELECT_HAS_UNIT, (unit_id,)).fetchone()[0])
+        except sqlite3.OperationalError:
+            return False
+
+
+class SqliteShiftContext(ShiftContext):
+    """
+    ShiftContext for one unit that persists every mutation to sqlite and
+    reloads it on startup.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        unit_id: str = DEFAULT_UNIT_ID,
+        conn: Optional[sqlite3.Connection] = None,
+    ) -> None:
+        super().__init__()
+        self.path = path
+        self.unit_id = unit_id
+        self._conn = conn if conn is not None else connect(path)
+        # inside transaction(): writes join the one db transaction it opened
+        self._batching = False
+        self._load()
+
+    # ---- mutations (write through) ----
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Every mutation inside commits as one sqlite transaction, or not at all.
+
+        If anything fails partway (a locked db, a constraint, a bug), sqlite
+        rolls back but the in-memory indexes still have the mutations that ran
+        before it, so the unit is reloaded from the db before the error goes on.
+        """
+        with self.lock:
+            if self._batching:
+                yield
+                return
+            try:
+                with self._conn:
+                    self._batching = True
+                    try:
+                        yield
+                    finally:
+                        self._batching = False
+            except BaseException:
+                self._resync()
+                raise
+
+    def _write(self) -> ContextManager[object]:
+        # A connection used as a context manager commits when the block ends,
+        # which inside a transaction() would commit its first part on its own.
+        return nullcontext() if self._batching else self._conn
+
+    def set_shift(self, shift: Shift) -> None:
+        with self.lock, self._write():
+            self._conn.execute(
+                _UPSERT_SHIFT,
+                (self.unit_id, shift.start_at.isoformat(), shift.end_at.isoformat()),
+            )
+            super().set_shift(shift)
+
+    def set_patients(self, patients: list[Patient]) -> list[Order]:
+        with self.lock, self._write():
+            removed_ids = self._patients.keys() - {p.id for p in patients}
+
+            self._conn.execute(_DELETE_PATIENTS, (self.unit_id,))
+            self._conn.executemany(
+                _INSERT_PATIENT,
+                [
+                    (self.unit_id, p.id, i, p.display_name, p.acuity.value)
+                    for i, p in enumerate(patients)
+                ],
+            )
+            self._conn.executemany(
+                _DELETE_ORDERS_FOR_PATIENT, [(self.unit_id, pid) for pid in removed_ids]
+            )
+            if self._recurring:
+                self._conn.executemany(
+                    _DELETE_DONE_FOR_PATIENT,
+                    [(self.unit_id, self.unit_id, pid) for pid in removed_ids],
+                )
+                self._conn.executemany(
+                    _DELETE_RECURRING_FOR_PATIENT, [(self.unit_id, pid) for pid in removed_ids]
+                )
+            return super().set_patients(patients)
+
+    def add_order(self, order: Order) -> None:
+        with self.lock, self._write():
+            self._conn.execute(_INSERT_ORDER, _order_row(self.unit_id, order))
+            super().add_order(order)
+
+    def add_orders(self, orders: list[Order]) -> None:
+        with self.lock, self._write():
+            self._conn.executemany(_INSERT_ORDER, [_order_row(self.unit_id, o) for o in orders])
+            super().add_orders(orders)
+
+    def remove_order(self, order_id: str) -> Optional[Order]:
+        with self.lock, self._write():
+            if not self.has_order(order_id):
+                return None
+            self._conn.execute(_DELETE_ORDER, (self.unit_id, order_id))
+            return super().remove_order(order_id)
+
+    def add_recurring(self, rec: RecurringOrder) -> None:
+        with self.lock, self._write():
+            self._conn.execute(_INSERT_RECURRING, _recurring_row(self.unit_id, rec))
+            super().add_recurring(rec)
+
+    def remove_recurring(self, series_id: str) -> Optional[RecurringOrder]:
+        with self.lock, self._write():
+            if not self.has_recurring(series_id):
+                return None
+            self._conn.execute(_DELETE_DONE, (self.unit_id, series_id))
+            self._conn.execute(_DELETE_RECURRING, (self.unit_id, series_id))
+            return super().remove_recurring(series_id)
+
+    def complete_occurrence(self, order_id: str) -> Optional[Order]:
+        with self.lock, self._write():
+            if self.open_occurrence(order_id) is None:
+                return None
+            series_id, index = parse_occurrence_id(order_id)
+            self._conn.execute(_INSERT_DONE, (self.unit_id, series_id, index))
+            return super().complete_occurrence(order_id)
+
+    def drop(self) -> None:
+        """
+        Wipes this unit's persisted shift and closes the db (POST /state/reset).
+        """
+        with self.lock, self._write():
+            self._conn.execute(_DELETE_SHIFT, (self.unit_id,))
+            self._conn.execute(_DELETE_PATIENTS, (self.unit_id,))
+            self._conn.execute(_DELETE_ORDERS, (self.unit_id,))
+            self._conn.execute(_DELETE_ALL_RECURRING, (self.unit_id,))
+            self._conn.execute(_DELETE_ALL_DONE, (self.unit_id,))
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # ---- warm start ----
+
+    def _resync(self) -> None:
+        """
+        Replaces the in-memory state with what the db has.
+        """
+        self._clear_memory()
+        self._load()
+        self._bump()
+
+    def _clear_memory(self) -> None:
+        self.shift = None
+        self._patients = {}
+        self._orders = OrderTable()
+        self._recurring = {}
+        self._recurring_done = {}
+        self._ranking.invalidate()
+        self._bump()
+
+    def _load(self) -> None:
+        """
+        Rebuilds the in-memory indexes from the db in one pass per table.
+
+        This is the "restart mid shift" path, so it avoids pydantic validation
+        (model_construct) and does not bump the version per row.
+        The priority index is built lazily by the first replan.
+        """
+        unit = (self.unit_id,)
+        row = self._conn.execute(_SELECT_SHIFT, unit).fetchone()
+        if row is not None:
+            self.shift = Shift.model_construct(
+                start_at=datetime.fromisoformat(row[0]),
+                end_at=datetime.fromisoformat(row[1]),
+            )
+
+        self._patients = {
+            pid: Patient.model_construct(id=pid, display_name=name, acuity=AcuityLevel(acuity))
+            for pid, name, acuity in self._conn.execute(_SELECT_PATIENTS, unit)
+        }
+
+        for oid, pid, otype, desc, due_at, duration, is_prn, is_stat in self._conn.execute(
+            _SELECT_ORDERS, unit
+        ):
+            self._index_order(
+                Order.model_construct(
+                    id=oid,
+                    patient_id=pid,
+                    type=OrderType(otype),
+                    description=desc,
+                    due_at=datetime.fromisoformat(due_at),
+                    duration_minutes=duration,
+                    is_prn=bool(is_prn),
+                    is_stat=bool(is_stat),
+                )
+            )
+
+        for (
+            rid, pid, otype, desc, first_due_at, interval, count, ends_at, duration, is_prn, is_stat
+        ) in self._conn.execute(_SELECT_RECURRING, unit):
+            self._recurring[rid] = RecurringOrder.model_construct(
+                id=rid,
+                patient_id=pid,
+                type=OrderType(otype),
+                description=desc,
+                first_due_at=datetime.fromisoformat(first_due_at),
+                interval_minutes=interval,
+                count=count,
+                ends_at=datetime.fromisoformat(ends_at) if ends_at is not None else None,
+                duration_minutes=duration,
+                is_prn=bool(is_prn),
+                is_stat=bool(is_stat),
+            )
+        for series_id, index in self._conn.execute(_SELECT_DONE, unit):
+            self._recurring_done.setdefault(series_id, set()).add(index)
@@ -10,12 +10,21 @@ this module creates a simple in-memory "shift context" that holds:
 - shift window
 - patients
 - orders
+- recurring orders (definitions only, see app/services/recurring.py)
 
 important limitations (v1):
-- in-memory only, so it resets when the server restarts
-- single global state (not per-user)
+- in-memory by default, so it resets when the server restarts
+  (set STATE_BACKEND=sqlite to persist it, see app/core/sqlite_store.py)
 - no auth
 
+multi-unit (shards):
+there is one context per unit (or nurse) id, so many shifts can run in one
+process without stepping on each other. each context has its own lock:
+- writes to different units never wait on each other
+- writes to the same unit are serialized, so concurrent adds/deletes can't lose updates
+- readers only hold the lock long enough to copy what they need (a snapshot),
+  the actual replan and serialization happen outside the lock
+
 this is intentionally a stepping stone.
 once the API feels right, we can replace this store with sqlite/postgres/etc
 without rewriting the scheduler logic.
@@ -23,10 +32,27 @@ without rewriting the scheduler logic.
 
 from __future__ import annotations
 
+import secrets
+import threading
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import Optional
+from datetime import datetime, timedelta
+from itertools import count
+from typing import Iterable, Iterator, Optional
 
-from app.schemas.clinical import Order, Patient, Shift
+from app.core.config import settings
+from app.schemas.clinical import Order, Patient, RecurringOrder, Shift
+from app.services.order_table import OrderTable
+from app.services.priority import PriorityIndex
+from app.services.recurring import (
+    expand,
+    expand_for_shift,
+    occurrence,
+    occurrence_range,
+    parse_occurrence_id,
+    shift_window,
+)
+from app.services.scheduler import ScoredOrder
 
 
 @dataclass
@@ -36,38 +62,468 @@ class ShiftContext:
 
     Think of this as:
     "what the nurse knows right now about their shift assignment"
+
+    Patients are kept in a hash index (patient id -> patient). Orders live in a
+    columnar OrderTable (app/services/order_table.py): interned ids and codes in
+    flat arrays, with pydantic Orders only built when something asks for one
+    (`orders`, get_order, an API response). Removing or changing a patient finds
+    their orders with one scan of the table's patient column.
+
+    Recurring orders are kept as definitions, plus the occurrence indexes that
+    were already completed. Their occurrences for the current shift only exist
+    as entries in the priority index, never in `_orders`.
+
+    Every write goes through the methods below so the indexes never drift apart.
+    The table keeps insertion order, so `orders` still comes back in the order things were added.
+
+    It also owns a PriorityIndex of scored orders, so replans do not have to
+    rescore the whole shift after every single order event.
+
+    `version` goes up on every mutation. Caches (see app/services/schedule_cache.py)
+    key on it, so anything computed from an older version is never served again.
+
+    `lock` guards every read and write. It is reentrant so routes can hold it
+    around a check-then-write sequence (has_order -> add_order) and still call
+    the methods below, which take it too.
     """
     shift: Optional[Shift] = None
-    patients: list[Patient] = field(default_factory=list)
-    orders: list[Order] = field(default_factory=list)
+    version: int = field(default_factory=lambda: next(_VERSIONS), init=False)
+    lock: threading.RLock = field(default_factory=threading.RLock, init=False, repr=False)
+    _patients: dict[str, Patient] = field(default_factory=dict, init=False, repr=False)
+    _orders: OrderTable = field(default_factory=OrderTable, init=False, repr=False)
+    _recurring: dict[str, RecurringOrder] = field(default_factory=dict, init=False, repr=False)
+    # series id -> occurrence indexes that were completed or discontinued
+    _recurring_done: dict[str, set[int]] = field(default_factory=dict, init=False, repr=False)
+    _ranking: PriorityIndex = field(default_factory=PriorityIndex, init=False, repr=False)
+
+    @property
+    def patients(self) -> list[Patient]:
+        with self.lock:
+            return list(self._patients.values())
+
+    @property
+    def orders(self) -> list[Order]:
+        with self.lock:
+            return list(self._orders)
+
+    @property
+    def recurring_orders(self) -> list[RecurringOrder]:
+        with self.lock:
+            return list(self._recurring.values())
 
     def patients_by_id(self) -> dict[str, Patient]:
-        return {p.id: p for p in self.patients}
+        with self.lock:
+            return dict(self._patients)
 
     def has_patient(self, patient_id: str) -> bool:
-        return any(p.id == patient_id for p in self.patients)
+        return patient_id in self._patients
+
+    def has_order(self, order_id: str) -> bool:
+        return order_id in self._orders
+
+    def get_order(self, order_id: str) -> Optional[Order]:
+        return self._orders.get(order_id)
+
+    def has_recurring(self, series_id: str) -> bool:
+        return series_id in self._recurring
+
+    def occurrence_series(self, order_id: str) -> Optional[str]:
+        """
+        The recurring series whose occurrence ids ("{id}@{k}") include `order_id`,
+        if there is one. A one-off order can't use such an id: the schedule and
+        DELETE /state/orders/{id} could not tell the two apart.
+        """
+        parsed = parse_occurrence_id(order_id)
+        if parsed is None or parsed[0] not in self._recurring:
+            return None
+        return parsed[0]
+
+    def order_ids_in_series(self, series_id: str) -> list[str]:
+        """
+        Ids of one-off orders that look like occurrences of `series_id`.
+        One scan over the order ids, only runs when a recurring order is added.
+        """
+        clashes = []
+        for order_id in self._orders.ids():
+            parsed = parse_occurrence_id(order_id)
+            if parsed is not None and parsed[0] == series_id:
+                clashes.append(order_id)
+        return clashes
+
+    def set_shift(self, shift: Shift) -> None:
+        with self.lock:
+            self.shift = shift
+            # A new window means a different set of recurring occurrences.
+            if self._recurring:
+                self._ranking.invalidate()
+            self._bump()
+
+    def set_patients(self, patients: list[Patient]) -> list[Order]:
+        """
+        Replaces the patient list and drops orders for patients that are gone.
+
+        Only the removed patients' orders are touched, everything else stays put.
+        Returns the orders that were dropped so callers can report or log them.
+        """
+        with self.lock:
+            new_patients = {p.id: p for p in patients}
+
+            dropped = self._orders.remove_patients(self._patients.keys() - new_patients.keys())
+            for order in dropped:
+                self._ranking.discard(order.id)
+            for rec in [r for r in self._recurring.values() if r.patient_id not in new_patients]:
+                self._drop_recurring(rec)
+
+            # A patient that stayed but changed (acuity, display name) changes the
+            # score or summary of their orders, so only those get rescored.
+            changed = [
+                p for pid, p in new_patients.items()
+                if pid in self._patients and self._patients[pid] != p
+            ]
+
+            self._patients = new_patients
+
+            if changed:
+                for order_id in self._orders.ids_for_patients(p.id for p in changed):
+                    order = self._orders.get(order_id)
+                    self._ranking.push(new_patients[order.patient_id], order)
+            for p in changed:
+                for rec in self._recurring.values():
+                    if rec.patient_id == p.id:
+                        self._index_occurrences(rec)
+
+            self._bump()
+            return dropped
+
+    def add_order(self, order: Order) -> None:
+        """
+        Indexes a new order.
+
+        Callers are expected to have checked has_patient / has_order first,
+        because that is where the API decides which error to return.
+        Hold `lock` around the check and the add to make them atomic.
+        """
+        with self.lock:
+            self._index_order(order)
+            self._bump()
+
+    def add_orders(self, orders: list[Order]) -> None:
+        """
+        Indexes a batch of already validated orders (bulk ingest).
+
+        For a batch bigger than what is already indexed, a full rescore on the next
+        replan is cheaper than pushing every order into the heap one at a time.
+        """
+        with self.lock:
+            if len(orders) > len(self._ranking):
+                self._ranking.invalidate()
+                # Nothing to push, the rescore reads the table.
+                self._orders.extend(orders)
+            else:
+                for order in orders:
+                    self._index_order(order)
+            self._bump()
+
+    def remove_order(self, order_id: str) -> Optional[Order]:
+        """
+        Removes an order by id. Returns the removed order, or None if it did not exist.
+        """
+        with self.lock:
+            order = self._orders.remove(order_id)
+            if order is None:
+                return None
+
+            self._ranking.discard(order_id)
+            self._bump()
+            return order
+
+    def add_recurring(self, rec: RecurringOrder) -> None:
+        """
+        Stores a recurring order definition and indexes its occurrences in the
+        current shift. Same contract as add_order: check has_patient and
+        has_recurring first, under `lock`.
+        """
+        with self.lock:
+            self._recurring[rec.id] = rec
+            self._index_occurrences(rec)
+            self._bump()
+
+    def remove_recurring(self, series_id: str) -> Optional[RecurringOrder]:
+        """
+        Discontinues a whole series. Returns it, or None if it did not exist.
+        """
+        with self.lock:
+            rec = self._recurring.get(series_id)
+            if rec is None:
+                return None
+            self._drop_recurring(rec)
+            self._bump()
+            return rec
+
+    def complete_occurrence(self, order_id: str) -> Optional[Order]:
+        """
+        Marks one occurrence of a recurring order as done, by its occurrence id.
+
+        Only occurrences inside the current shift window can be completed (those
+        are the ones anyone was shown). Returns the occurrence, or None if `order_id` is
+        not an open occurrence.
+        """
+        with self.lock:
+            order = self.open_occurrence(order_id)
+            if order is None:
+                return None
+
+            series_id, index = parse_occurrence_id(order_id)
+            self._recurring_done.setdefault(series_id, set()).add(index)
+            self._ranking.discard(order_id)
+            self._bump()
+            return order
+
+    def open_occurrence(self, order_id: str, shift: Optional[Shift] = None) -> Optional[Order]:
+        """
+        The recurring occurrence with this id, if it is due in `shift` (default:
+        the current shift) and not done yet. None for anything else.
+        """
+        shift = shift or self.shift
+        parsed = parse_occurrence_id(order_id)
+        if parsed is None or shift is None:
+            return None
+        series_id, index = parsed
+        rec = self._recurring.get(series_id)
+        if (
+            rec is None
+            or index in self._recurring_done.get(series_id, ())
+            or index not in occurrence_range(rec, *shift_window(shift))
+        ):
+            return None
+        return occurrence(rec, index)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Groups several mutations into one unit of work (POST /state/transaction).
+
+        In memory that is just holding the lock across them. Persistent stores
+        override it to also commit them to disk together.
+        """
+        with self.lock:
+            yield
+
+    def current_version(self) -> int:
+        """
+        Version of the state as of now. A plain read here, stores that sync with
+        other processes override it to catch up first.
+        """
+        return self.version
+
+    def version_scope(self) -> str:
+        """
+        What versions count within. Here that's this process (they come from
+        _VERSIONS), so a version seen before a restart never matches a new one.
+        Stores shared between processes override it.
+        """
+        return _PROCESS_SCOPE
 
+    def snapshot(self, now: datetime) -> ContextSnapshot:
+        """
+        Consistent read-only view for a replan at `now`.
 
-# Single global store (v1)
-# This is the simplest thing that works for local dev + teammates testing endpoints.
-_CONTEXT = ShiftContext()
+        Holds the lock only to refresh the priority index (if it is older than
+        settings.rescore_interval_seconds) and to copy it. Placement and
+        serialization then run on the copy, while writers carry on.
+        """
+        max_age = timedelta(seconds=settings.rescore_interval_seconds)
+        with self.lock:
+            if self._ranking.needs_rebuild(now, max_age):
+                self._ranking.rebuild(now, self._patients, self._orders, self._open_occurrences())
+            return ContextSnapshot(
+                version=self.version,
+                shift=self.shift,
+                ranked=self._ranking.iter_ranked(),
+                total=len(self._ranking),
+                next_due_us=self._ranking.next_due_us,
+            )
 
+    def drop(self) -> None:
+        """
+        Called by reset_context when this context is thrown away.
+        Nothing to clean up in memory, persistent stores wipe their storage here.
+        """
 
-def get_context() -> ShiftContext:
+    def _index_order(self, order: Order) -> None:
+        self._orders.add(order)
+
+        # Pushed with the Order we were given, the next full rescore turns
+        # it into a reference to its table row like every other order.
+        patient = self._patients.get(order.patient_id)
+        if patient is not None:
+            self._ranking.push(patient, order)
+
+    def _open_occurrences(self) -> Iterable[Order]:
+        if not self._recurring or self.shift is None:
+            return ()
+        self._prune_done(self.shift)
+        return expand_for_shift(self._recurring.values(), self.shift, self._recurring_done)
+
+    def _prune_done(self, shift: Shift) -> None:
+        """
+        Forgets completed occurrences due before the shift window (which reaches
+        OVERDUE_LOOKBACK back): expansion never gets to them again, and a long
+        running q15min series would otherwise keep every index it ever completed.
+        Persistent stores keep their rows, this only trims memory.
+        """
+        start, end = shift_window(shift)
+        for series_id in list(self._recurring_done):
+            rec = self._recurring.get(series_id)
+            if rec is None:
+                continue
+            first = occurrence_range(rec, start, end).start
+            done = self._recurring_done[series_id]
+            if min(done, default=first) < first:
+                done.difference_update([k for k in done if k < first])
+                if not done:
+                    del self._recurring_done[series_id]
+
+    def _occurrences(self, rec: RecurringOrder) -> Iterator[Order]:
+        if self.shift is None:
+            return iter(())
+        done = self._recurring_done.get(rec.id, frozenset())
+        return expand(rec, *shift_window(self.shift), done)
+
+    def _index_occurrences(self, rec: RecurringOrder) -> None:
+        patient = self._patients.get(rec.patient_id)
+        if patient is not None:
+            for order in self._occurrences(rec):
+                self._ranking.push(patient, order)
+
+    def _drop_recurring(self, rec: RecurringOrder) -> None:
+        for order in self._occurrences(rec):
+            self._ranking.discard(order.id)
+        del self._recurring[rec.id]
+        self._recurring_done.pop(rec.id, None)
+
+    def _bump(self) -> None:
+        self.version = next(_VERSIONS)
+
+
+@dataclass(frozen=True)
+class ContextSnapshot:
+    """
+    What a replan needs from a context, copied under its lock.
+    `ranked` yields scored orders in priority order, `total` is how many it holds.
+    """
+    version: int
+    shift: Optional[Shift]
+    ranked: Iterator[ScoredOrder]
+    total: int
+    # earliest due time (epoch us) after `now` among the ranked orders: past it
+    # that order's urgency steps up and the ranking no longer holds
+    next_due_us: Optional[int]
+
+
+# Versions come from one process wide counter instead of starting at 0 per context.
+# That way a reset context can never reuse a version an older context already had,
+# and a cache keyed on version can't hand out a schedule from before the reset.
+_VERSIONS = count(1)
+_PROCESS_SCOPE = secrets.token_hex(4)
+
+
+DEFAULT_UNIT_ID = "default"
+
+# One context per unit id (v1 shards).
+# Contexts are created on first use, so picking the sqlite backend doesn't open
+# a db at import time. The registry lock only guards creating/replacing contexts,
+# never the work done on them.
+_CONTEXTS: dict[str, ShiftContext] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _new_context(unit_id: str) -> ShiftContext:
+    """
+    Builds a context for the configured backend (settings.state_backend).
     """
-    Returns the singleton context object.
+    if settings.state_backend == "sqlite":
+        # imported here because the stores build on ShiftContext from this module
+        from app.core.sqlite_store import SqliteShiftContext
+
+        return SqliteShiftContext(settings.sqlite_path, unit_id=unit_id)
+    if settings.state_backend == "shared":
+        from app.core.shared_store import SharedShiftContext
+
+        return SharedShiftContext(settings.sqlite_path, unit_id=unit_id)
+    if settings.state_backend == "memory":
+        return ShiftContext()
+    raise ValueError(
+        f"Unknown state_backend '{settings.state_backend}'. Use 'memory', 'sqlite' or 'shared'."
+    )
+
+
+def get_context(unit_id: str = DEFAULT_UNIT_ID) -> ShiftContext:
+    """
+    Returns the context for one unit (or nurse).
 
     We keep it behind a function so:
     - later we can swap it for a DB-backed implementation
     - routers don't need to care where state comes from
+
+    With the sqlite backend the first call for a unit is the warm start that
+    loads that unit's shift back from disk.
+    """
+    ctx = _CONTEXTS.get(unit_id)
+    if ctx is not None:
+        return ctx
+
+    with _REGISTRY_LOCK:
+        ctx = _CONTEXTS.get(unit_id)
+        if ctx is None:
+            ctx = _new_context(unit_id)
+            _CONTEXTS[unit_id] = ctx
+        return ctx
+
+
+def peek_context(unit_id: str = DEFAULT_UNIT_ID) -> ShiftContext:
     """
-    return _CONTEXT
+    Context for routes that only read (or only delete) state.
+
+    Same as get_context for a unit that has state, in this process or on disk.
+    Any other unit gets an empty context that is not registered: unit ids
+    nobody ever wrote to (typos, scanners) then don't pile up contexts, and
+    with the sqlite backends the connection each context holds.
+    """
+    ctx = _CONTEXTS.get(unit_id)
+    if ctx is not None or _has_persisted_state(unit_id):
+        return get_context(unit_id)
+    return ShiftContext()
+
+
+def context_version(unit_id: str = DEFAULT_UNIT_ID) -> Optional[int]:
+    """
+    Version of the unit's context in this process, None if it has none yet.
+    A plain read: it never creates or syncs a context.
+    """
+    ctx = _CONTEXTS.get(unit_id)
+    return ctx.version if ctx is not None else None
+
+
+def _has_persisted_state(unit_id: str) -> bool:
+    if settings.state_backend in ("sqlite", "shared"):
+        from app.core.sqlite_store import has_unit
+
+        return has_unit(settings.sqlite_path, unit_id)
+    return False
 
 
-def reset_context() -> None:
+def reset_context(unit_id: str = DEFAULT_UNIT_ID) -> None:
     """
-    Resets the singleton context.
+    Resets one unit's context.
     Useful for demos, tests, and team iteration.
     """
-    global _CONTEXT
-    _CONTEXT = ShiftContext()
\ No newline at end of file
+    # nothing to reset, and no reason to create a context for it
+    if unit_id not in _CONTEXTS and not _has_persisted_state(unit_id):
+        return
+    # go through get_context so a persisted shift that was never loaded yet
+    # still gets wiped
+    old = get_context(unit_id)
+    with _REGISTRY_LOCK, old.lock:
+        old.drop()
+        _CONTEXTS[unit_id] = _new_context(unit_id)
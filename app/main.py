@@ -1,6 +1,20 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 from app.api.router import api_router
+from app.core import metrics
 from app.core.config import settings
+from app.core.shared_store import StateConflictError
 
 app = FastAPI(title = settings.app_name)
-app.include_router(api_router)
\ No newline at end of file
+app.include_router(api_router)
+
+# Only wrap requests when metrics are on, so disabled metrics cost nothing per request.
+if metrics.ENABLED:
+    app.add_middleware(metrics.ServerTimingMiddleware)
+
+
+@app.exception_handler(StateConflictError)
+def state_conflict_handler(request: Request, exc: StateConflictError) -> JSONResponse:
+    # Another worker wrote to the same unit between our read and our write
+    # (shared state backend). Nothing was applied, so retrying is safe.
+    return JSONResponse(status_code=status.HTTP_409_CONFLICT, content={"detail": str(exc)})
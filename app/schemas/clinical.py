@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from datetime import datetime
 from enum import Enum
+from typing import Any, Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -30,6 +32,32 @@ class Order(BaseModel):
     is_stat: bool = False
 
 
+class RecurringOrder(BaseModel):
+    """
+    One order that repeats on a fixed interval (q1h neuro checks, q4h vitals).
+
+    It is stored and sent as this single definition and only turned into plain
+    Orders for the shift being scheduled (see app/services/recurring.py).
+    Occurrence k is due at first_due_at + k * interval_minutes and gets the
+    order id "{id}@{k}".
+
+    `count` and `ends_at` both end the series, whichever comes first.
+    With neither, it repeats until it is discontinued.
+    """
+    id: str
+    patient_id: str
+    type: OrderType
+    description: str
+    first_due_at: datetime
+    interval_minutes: int = Field(ge=5, le=1440)
+    count: Optional[int] = Field(default=None, ge=1)
+    # no occurrence is due at or after this
+    ends_at: Optional[datetime] = None
+    duration_minutes: int = Field(default=10, ge=1, le=240)
+    is_prn: bool = False
+    is_stat: bool = False
+
+
 class Patient(BaseModel):
     id: str
     display_name: str
@@ -45,18 +73,11 @@ class ScheduleRequest(BaseModel):
     shift: Shift
     patients: list[Patient]
     orders: list[Order]
+    # expanded into orders for this shift only (and the hour before it), see RecurringOrder
+    recurring_orders: list[RecurringOrder] = Field(default_factory=list)
 
 
 class ScheduledTask(BaseModel):
-    order_id: str
-    patient_id: str
-    starts_at: datetime
-    ends_at: datetime
-    priority_score: float
-    rationale: str
-
-
-class ScheduleResponse(BaseModel):
     order_id: str
     patient_id: str
     patient_display_name: str
@@ -71,7 +92,59 @@ class ScheduleResponse(BaseModel):
 
     # structured explanation meant for transparency and debugging
     score_breakdown: ScoreBreakdown
-    
+
+
+class ScheduleResponse(BaseModel):
+    generated_at: datetime
+    tasks: list[ScheduledTask]
+    notes: list[str] = Field(default_factory=list)
+
+    # how many scored orders did not make it onto the timeline (shift full)
+    unscheduled_count: int = 0
+
+
+class ScheduleDiff(BaseModel):
+    # What changed between the schedule the client has (`since`) and the current one
+    # (`version`). Both are schedule versions, the same strings as the replan ETag.
+    version: str
+    since: str
+    generated_at: datetime
+
+    # true when `since` is unknown or too old to diff against: `added` then holds
+    # the whole timeline and the client should replace what it has
+    full: bool = False
+
+    # every task the client has that is not in added/moved/removed now starts
+    # (and ends) this many seconds later: a live timeline starts at "now"
+    offset_seconds: float = 0.0
+
+    # tasks that are new, or whose slot changed by more than offset_seconds
+    added: list[ScheduledTask] = Field(default_factory=list)
+    moved: list[ScheduledTask] = Field(default_factory=list)
+    # order ids that are no longer on the timeline
+    removed: list[str] = Field(default_factory=list)
+
+    notes: list[str] = Field(default_factory=list)
+    unscheduled_count: int = 0
+
+
+class BatchScheduleRequest(BaseModel):
+    # Each item is a ScheduleRequest. They are validated one by one on the
+    # workers so a single malformed item is reported instead of rejecting the batch.
+    requests: list[dict[str, Any]]
+
+
+class BatchScheduleResult(BaseModel):
+    # position of the item in the request, results always come back in order
+    index: int
+    schedule: Optional[ScheduleResponse] = None
+    error: Optional[str] = None
+
+
+class BatchScheduleResponse(BaseModel):
+    results: list[BatchScheduleResult]
+
+
 class ScoreBreakdown(BaseModel):
     """
     Structured explanation of why an order was prioritized.
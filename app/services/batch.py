@@ -0,0 +1,145 @@
+"""
+batch scheduling (v1)
+
+why this exists:
+/schedule/generate handles one ScheduleRequest per call. at shift change we want
+schedules for every nurse on a unit (or the whole hospital) in one go.
+
+how it works:
+- each item is validated and scheduled on a worker from a shared pool
+  (processes by default, since scheduling is CPU bound and python threads share the GIL)
+- results come back in the same order the items were sent
+- a bad item gets an error entry, it does not fail the rest of the batch
+- the route awaits the pool, so a running batch holds no server thread
+
+worker processes are started with forkserver (spawn where that is missing), not
+fork: forking a server that already runs threads (anyio's threadpool, the replan
+pool, sqlite connections) copies locks some other thread held at that moment,
+and a worker can then hang on its first import or log call.
+the flip side: workers import the parent's main module, so a script that calls
+run_batch needs the usual `if __name__ == "__main__":` guard. servers started
+with uvicorn already have it.
+
+guard rails:
+- the pool size is fixed (settings.batch_max_workers), so batches can never use
+  more than that many cores no matter how many arrive
+- only settings.batch_max_concurrent batches may run at once, extra ones are
+  turned away instead of queueing up behind each other
+- the threadpool that serves interactive requests never runs or waits on batch
+  work, it only serializes the finished response
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Optional
+
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.core.errors import describe_validation_error
+from app.schemas.clinical import (
+    BatchScheduleResult,
+    ScheduleRequest,
+    ScheduleResponse,
+)
+from app.services.scheduler import generate_schedule
+
+
+class BatchCapacityError(RuntimeError):
+    """
+    Raised when too many batches are already running.
+    The route turns this into a 503 so the client can retry later.
+    """
+
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+_batch_slots = threading.BoundedSemaphore(settings.batch_max_concurrent)
+
+
+def get_executor() -> Executor:
+    """
+    Returns the shared batch pool, creating it on first use.
+
+    Lazy so that importing the app (tests, swagger, the stateful endpoints)
+    never starts worker processes nobody asked for.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            if settings.batch_executor == "process":
+                methods = multiprocessing.get_all_start_methods()
+                _executor = ProcessPoolExecutor(
+                    max_workers=settings.batch_max_workers,
+                    mp_context=multiprocessing.get_context(
+                        "forkserver" if "forkserver" in methods else "spawn"
+                    ),
+                )
+            elif settings.batch_executor == "thread":
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.batch_max_workers,
+                    thread_name_prefix="careshift-batch",
+                )
+            else:
+                raise ValueError(
+                    f"Unknown batch_executor '{settings.batch_executor}'. Use 'process' or 'thread'."
+                )
+        return _executor
+
+
+def _schedule_one(payload: dict[str, Any]) -> tuple[Optional[ScheduleResponse], Optional[str]]:
+    """
+    Validates and schedules one batch item on a worker.
+
+    Module level (not a closure) so it can be pickled for the process pool.
+    Any error is returned instead of raised, so one bad item stays one bad item.
+    """
+    try:
+        req = ScheduleRequest.model_validate(payload)
+        return generate_schedule(req), None
+    except ValidationError as e:
+        return None, describe_validation_error(e)
+    except Exception as e:  # noqa: BLE001 - report, don't crash the batch
+        return None, f"{type(e).__name__}: {e}"
+
+
+def _schedule_chunk(
+    payloads: list[dict[str, Any]],
+) -> list[tuple[Optional[ScheduleResponse], Optional[str]]]:
+    return [_schedule_one(payload) for payload in payloads]
+
+
+async def run_batch(items: list[dict[str, Any]]) -> list[BatchScheduleResult]:
+    """
+    Schedules every item on the shared pool and returns results in input order.
+
+    Raises BatchCapacityError if settings.batch_max_concurrent batches are
+    already running.
+    """
+    if not _batch_slots.acquire(blocking=False):
+        raise BatchCapacityError("Too many batch schedules are running. Try again shortly.")
+
+    try:
+        executor = get_executor()
+        loop = asyncio.get_running_loop()
+
+        # Process pools pay a pickling round trip per task, so hand out work in
+        # chunks (what executor.map(chunksize=...) does, but awaitable).
+        workers = settings.batch_max_workers
+        chunksize = max(1, len(items) // (workers * 4))
+        chunks = [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+
+        done = await asyncio.gather(
+            *(loop.run_in_executor(executor, _schedule_chunk, chunk) for chunk in chunks)
+        )
+        outcomes = (outcome for chunk in done for outcome in chunk)
+        return [
+            BatchScheduleResult(index=i, schedule=schedule, error=error)
+            for i, (schedule, error) in enumerate(outcomes)
+        ]
+    finally:
+        _batch_slots.release()
@@ -0,0 +1,171 @@
+"""
+debounced broadcaster for pushed schedule updates (v1)
+
+why this exists:
+clients that want to stay current poll /state/replan. with N clients polling M
+times each that is N x M requests, most of them for a schedule that did not
+change, and a replan every time the cache bucket rolls over.
+
+with GET /state/subscribe (Server-Sent Events) the server pushes instead:
+- a mutation marks the unit as changed
+- changes are merged for a short debounce window (a bulk import, a patient list
+  swap and a few deletes in a row are one burst)
+- after the window, one replan runs and its serialized result is sent to every
+  subscriber of that unit, so the work is per burst, not per client
+
+a unit nobody subscribes to costs nothing: changed() returns right away.
+
+slow subscribers never hold anyone up. each one has a one slot mailbox and a newer
+schedule replaces one it has not read yet, they only ever need the latest.
+
+changes made by other worker processes (shared backend) or just time passing
+(urgency depends on now) don't go through changed() here, so every subscribed
+unit also gets a periodic refresh.
+
+everything runs on the event loop, so the bookkeeping needs no lock.
+
+a compute that raises is logged and counts as "nothing to send": the next change
+or refresh tries again, and neither the flush nor any subscriber stream dies of it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Hashable, Optional
+
+# (event id, payload). The id is what an SSE client sends back as Last-Event-ID.
+Event = tuple[str, bytes]
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class _Topic:
+    subscribers: set[asyncio.Queue[Event]] = field(default_factory=set)
+    # the pending flush, if a change burst is being collected or published
+    flush: Optional[asyncio.Task[None]] = None
+    # a change came in while the flush was already computing
+    dirty: bool = False
+    refresher: Optional[asyncio.Task[None]] = None
+    last_id: Optional[str] = None
+
+
+class DebouncedBroadcaster:
+    """
+    Merges change notifications per key and pushes one computed event to every
+    subscriber of that key.
+
+    `compute(key)` builds the event for the current state, or returns None when
+    there is nothing to send (no shift set yet, overloaded). Events with the same
+    id as the last one sent are dropped, so a no-op change pushes nothing.
+    """
+
+    def __init__(
+        self,
+        compute: Callable[[Hashable], Awaitable[Optional[Event]]],
+        debounce_seconds: float,
+        heartbeat_seconds: float,
+        refresh_seconds: float,
+    ) -> None:
+        self._compute = compute
+        self.debounce_seconds = debounce_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.refresh_seconds = refresh_seconds
+        self._topics: dict[Hashable, _Topic] = {}
+
+    def subscribers(self, key: Hashable) -> int:
+        topic = self._topics.get(key)
+        return len(topic.subscribers) if topic is not None else 0
+
+    def changed(self, key: Hashable) -> None:
+        """
+        Marks `key` as changed. Must be called on the event loop.
+        """
+        topic = self._topics.get(key)
+        if topic is None or not topic.subscribers:
+            return
+        if topic.flush is None:
+            topic.flush = asyncio.create_task(self._flush(key, topic))
+        else:
+            topic.dirty = True
+
+    async def stream(self, key: Hashable, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        Server-Sent Events for one subscriber: the current event right away
+        (unless the client already has it), then every new one, with a comment
+        line every heartbeat so proxies keep the connection open.
+        """
+        topic = self._topics.get(key)
+        if topic is None:
+            topic = self._topics[key] = _Topic()
+            topic.refresher = asyncio.create_task(self._refresh(key))
+
+        mailbox: asyncio.Queue[Event] = asyncio.Queue(maxsize=1)
+        topic.subscribers.add(mailbox)
+        try:
+            sent = last_event_id
+            event = await self._try_compute(key)
+            if event is not None and event[0] != sent:
+                sent = event[0]
+                yield _format(event)
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(mailbox.get(), self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                # a burst that ended where this subscriber started is not news to it
+                if event[0] != sent:
+                    sent = event[0]
+                    yield _format(event)
+        finally:
+            topic.subscribers.discard(mailbox)
+            if not topic.subscribers:
+                self._close(key, topic)
+
+    async def _flush(self, key: Hashable, topic: _Topic) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self.debounce_seconds)
+                # Changes from here on may not be in what compute() reads,
+                # they get their own round.
+                topic.dirty = False
+                event = await self._try_compute(key)
+                if event is not None and event[0] != topic.last_id:
+                    topic.last_id = event[0]
+                    for mailbox in topic.subscribers:
+                        if mailbox.full():
+                            mailbox.get_nowait()
+                        mailbox.put_nowait(event)
+                if not topic.dirty:
+                    return
+        finally:
+            topic.flush = None
+
+    async def _try_compute(self, key: Hashable) -> Optional[Event]:
+        try:
+            return await self._compute(key)
+        except Exception:
+            logger.exception("Computing the pushed update for %r failed.", key)
+            return None
+
+    async def _refresh(self, key: Hashable) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            self.changed(key)
+
+    def _close(self, key: Hashable, topic: _Topic) -> None:
+        for task in (topic.flush, topic.refresher):
+            if task is not None:
+                task.cancel()
+        if self._topics.get(key) is topic:
+            del self._topics[key]
+
+
+def _format(event: Event) -> bytes:
+    event_id, data = event
+    # data is compact JSON, so it has no newlines and fits one data: line
+    return b"event: schedule\nid: " + event_id.encode() + b"\ndata: " + data + b"\n\n"
@@ -0,0 +1,286 @@
+"""
+columnar order store for the stateful shift (v1)
+
+why this exists:
+ShiftContext used to keep one pydantic Order per order. each of those carries its
+own instance dict, fields-set bookkeeping, a timezone aware datetime and its own
+id / patient_id / description strings. at 100k+ orders across a hospital that per
+object overhead is most of the process memory, and most of it repeats: a handful
+of patients per nurse, a few hundred distinct descriptions ("Vitals check").
+
+OrderTable keeps the same data as parallel arrays, one slot per order:
+- patient id:  interned, stored as a small int code
+- type:        enum code (position in OrderType)
+- due time:    int64 microseconds since the unix epoch, plus a code for its tzinfo
+- duration:    uint16 minutes
+- STAT / PRN:  bits in one flags byte
+- description: code into a side table of distinct descriptions
+
+pydantic Orders only exist at the edges: view() builds one for an API response,
+and scoring reads the columns directly (see score_table in app/services/scheduler.py),
+only turning the orders that make it onto the timeline into Orders.
+
+deletes set a flag instead of shifting arrays, and the table is compacted once
+dead rows outnumber live ones. compaction builds new column objects instead of
+rewriting the old ones, and rows are only ever appended, so anything holding on
+to an OrderColumns (a replan iterating outside the context lock) keeps reading
+the data it was handed.
+"""
+
+from __future__ import annotations
+
+from array import array
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Iterable, Iterator, Optional
+
+from app.schemas.clinical import Order, OrderType
+
+# position in this tuple is the type code stored in the table
+ORDER_TYPES: tuple[OrderType, ...] = tuple(OrderType)
+_TYPE_CODES = {t: i for i, t in enumerate(ORDER_TYPES)}
+
+FLAG_STAT = 1
+FLAG_PRN = 2
+FLAG_DEAD = 4
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+# Don't compact tiny tables, rebuilding them costs more than the dead rows.
+_MIN_DEAD_TO_COMPACT = 64
+
+
+def to_epoch_us(dt: datetime) -> int:
+    """
+    Microseconds since the unix epoch. Naive datetimes are taken as UTC.
+    """
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - _EPOCH) // _ONE_MICROSECOND
+
+
+class _Interned:
+    """
+    Append-only lookup tables shared by every generation of columns.
+    Codes are never reused or removed, so old columns can always be decoded.
+    """
+
+    def __init__(self) -> None:
+        self.patient_ids: list[str] = []
+        self.patient_codes: dict[str, int] = {}
+        self.descriptions: list[str] = []
+        self.description_codes: dict[str, int] = {}
+        # None stands for naive datetimes
+        self.tzinfos: list[Optional[tzinfo]] = []
+        self.tz_codes: dict[Optional[tzinfo], int] = {}
+
+    def patient(self, patient_id: str) -> int:
+        code = self.patient_codes.get(patient_id)
+        if code is None:
+            code = self.patient_codes[patient_id] = len(self.patient_ids)
+            self.patient_ids.append(patient_id)
+        return code
+
+    def description(self, text: str) -> int:
+        code = self.description_codes.get(text)
+        if code is None:
+            code = self.description_codes[text] = len(self.descriptions)
+            self.descriptions.append(text)
+        return code
+
+    def tz(self, tz: Optional[tzinfo]) -> int:
+        code = self.tz_codes.get(tz)
+        if code is None:
+            code = self.tz_codes[tz] = len(self.tzinfos)
+            self.tzinfos.append(tz)
+        return code
+
+
+class OrderColumns:
+    """
+    One generation of the table's columns. Row i of every column is one order.
+    """
+    __slots__ = (
+        "interned",
+        "ids",
+        "patient_codes",
+        "type_codes",
+        "due_us",
+        "tz_codes",
+        "durations",
+        "description_codes",
+        "flags",
+    )
+
+    def __init__(self, interned: _Interned) -> None:
+        self.interned = interned
+        self.ids: list[str] = []
+        self.patient_codes = array("I")
+        self.type_codes = array("B")
+        self.due_us = array("q")
+        self.tz_codes = array("H")
+        self.durations = array("H")
+        self.description_codes = array("I")
+        self.flags = array("B")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def extend(self, orders: Iterable[Order]) -> Iterator[str]:
+        """
+        Appends the orders and yields each id as its row is written. Lazy on
+        purpose: OrderTable consumes it to fill its id -> row map in the same pass.
+        """
+        interned = self.interned
+        patient, description, tz = interned.patient, interned.description, interned.tz
+        # Bulk ingest runs this per order, bound methods keep the attribute lookups out of the loop.
+        ids, patient_codes, type_codes = self.ids.append, self.patient_codes.append, self.type_codes.append
+        due_us, tz_codes, durations = self.due_us.append, self.tz_codes.append, self.durations.append
+        description_codes, flags = self.description_codes.append, self.flags.append
+        for o in orders:
+            due_at = o.due_at
+            ids(o.id)
+            patient_codes(patient(o.patient_id))
+            type_codes(_TYPE_CODES[o.type])
+            due_us(to_epoch_us(due_at))
+            tz_codes(tz(due_at.tzinfo))
+            durations(o.duration_minutes)
+            description_codes(description(o.description))
+            flags((FLAG_STAT if o.is_stat else 0) | (FLAG_PRN if o.is_prn else 0))
+            yield o.id
+
+    def alive(self, row: int) -> bool:
+        return not self.flags[row] & FLAG_DEAD
+
+    def patient_id(self, row: int) -> str:
+        return self.interned.patient_ids[self.patient_codes[row]]
+
+    def due_at(self, row: int) -> datetime:
+        due = _EPOCH + timedelta(microseconds=self.due_us[row])
+        tz = self.interned.tzinfos[self.tz_codes[row]]
+        if tz is None:
+            return due.replace(tzinfo=None)
+        return due if tz is timezone.utc else due.astimezone(tz)
+
+    def view(self, row: int) -> Order:
+        """
+        The order in `row` as a pydantic Order (a new object on every call).
+        """
+        flags = self.flags[row]
+        return Order(
+            id=self.ids[row],
+            patient_id=self.patient_id(row),
+            type=ORDER_TYPES[self.type_codes[row]],
+            description=self.interned.descriptions[self.description_codes[row]],
+            due_at=self.due_at(row),
+            duration_minutes=self.durations[row],
+            is_prn=bool(flags & FLAG_PRN),
+            is_stat=bool(flags & FLAG_STAT),
+        )
+
+
+class OrderTable:
+    """
+    The orders of one shift context, stored column wise. Keeps insertion order.
+
+    Not thread safe on its own: ShiftContext only touches it under its lock.
+    """
+
+    def __init__(self) -> None:
+        self._interned = _Interned()
+        self.columns = OrderColumns(self._interned)
+        self._rows: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, order_id: str) -> bool:
+        return order_id in self._rows
+
+    def __iter__(self) -> Iterator[Order]:
+        """
+        Every live order as a pydantic Order, in insertion order.
+        """
+        cols = self.columns
+        return (cols.view(row) for row in range(len(cols)) if cols.alive(row))
+
+    def ids(self) -> Iterator[str]:
+        """
+        Ids of every live order, without building any Order.
+        """
+        return iter(self._rows)
+
+    def get(self, order_id: str) -> Optional[Order]:
+        row = self._rows.get(order_id)
+        return self.columns.view(row) if row is not None else None
+
+    def patient_id(self, order_id: str) -> Optional[str]:
+        row = self._rows.get(order_id)
+        return self.columns.patient_id(row) if row is not None else None
+
+    def add(self, order: Order) -> None:
+        self.extend((order,))
+
+    def extend(self, orders: Iterable[Order]) -> None:
+        rows = self._rows
+        for row, order_id in enumerate(self.columns.extend(orders), len(self.columns)):
+            rows[order_id] = row
+
+    def remove(self, order_id: str) -> Optional[Order]:
+        """
+        Removes an order and returns it (as a view), or None if it is not here.
+        """
+        row = self._rows.pop(order_id, None)
+        if row is None:
+            return None
+        order = self.columns.view(row)
+        self._kill(row)
+        return order
+
+    def ids_for_patients(self, patient_ids: Iterable[str]) -> list[str]:
+        """
+        Ids of the live orders of these patients, in insertion order.
+        One scan over the patient column, this only runs when the patient list changes.
+        """
+        codes = {
+            self._interned.patient_codes[pid]
+            for pid in patient_ids
+            if pid in self._interned.patient_codes
+        }
+        if not codes:
+            return []
+        cols = self.columns
+        return [
+            cols.ids[row]
+            for row, code in enumerate(cols.patient_codes)
+            if code in codes and cols.alive(row)
+        ]
+
+    def remove_patients(self, patient_ids: Iterable[str]) -> list[Order]:
+        """
+        Removes every order of these patients and returns them.
+        """
+        return [self.remove(order_id) for order_id in self.ids_for_patients(patient_ids)]
+
+    def _kill(self, row: int) -> None:
+        cols = self.columns
+        # The flag is the only thing ever written in place. Readers of an older
+        # generation decide liveness from their own copy of the priority index,
+        # so this never changes what they see.
+        cols.flags[row] |= FLAG_DEAD
+        dead = len(cols) - len(self._rows)
+        if dead >= _MIN_DEAD_TO_COMPACT and dead > len(self._rows):
+            self._compact()
+
+    def _compact(self) -> None:
+        old = self.columns
+        new = OrderColumns(self._interned)
+        live = [row for row in range(len(old)) if old.alive(row)]
+
+        new.ids = [old.ids[row] for row in live]
+        for name in ("patient_codes", "type_codes", "due_us", "tz_codes", "durations", "description_codes", "flags"):
+            column = getattr(old, name)
+            setattr(new, name, array(column.typecode, [column[row] for row in live]))
+
+        self.columns = new
+        self._rows = {order_id: row for row, order_id in enumerate(new.ids)}
@@ -0,0 +1,210 @@
+"""
+free time index for gap filling placement (v1)
+
+why this exists:
+the original placement loop is a single cursor. it puts tasks back to back in
+priority order and stops at the first task that would run past the shift end,
+even when shorter, lower priority tasks would still fit. it also ignores due
+times completely, a med due at 14:00 can land at 08:05.
+
+the "gaps" placement mode (see ScheduleStream in app/services/scheduler.py)
+instead keeps the free time of the shift in an index and, for each task in
+priority order:
+- tries to start it at its due time (overdue tasks: as soon as possible)
+- if that slot is taken, uses the free slot whose start is closest to the due time
+- if it fits nowhere, skips it and moves on to the next task
+
+how the index works:
+time is counted in whole minutes from the start of the placement window. task
+durations are whole minutes too, so this loses nothing compared to the cursor,
+which also only ever starts tasks a whole number of minutes after the window start.
+
+it is a segment tree over those minutes. every node knows, for its range:
+- pref: free minutes at the start of the range
+- suf:  free minutes at the end of the range
+- best: the longest free run anywhere in the range
+which is enough to find the nearest free run of at least d minutes before or
+after a point, and to mark a task's minutes as taken, both in O(log minutes).
+no scanning over gaps, so it stays fast with thousands of tasks in a long shift.
+
+minutes are only ever taken, never freed, which keeps updates cheap: taking a
+range zeroes the O(log n) nodes that cover it, and a zeroed node only passes
+that on to its children when something later walks below it.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+
+class FreeTimeline:
+    """
+    Free minutes in [0, minutes), with nearest fit search.
+    """
+
+    def __init__(self, minutes: int) -> None:
+        self.minutes = max(0, minutes)
+        size = 1
+        while size < self.minutes:
+            size *= 2
+        self._size = size
+
+        # Heap layout: node 1 is the root, node i has children 2i and 2i+1,
+        # leaves are size..2*size-1. Padding leaves past `minutes` start out taken.
+        self._pref = [0] * (2 * size)
+        self._suf = [0] * (2 * size)
+        self._best = [0] * (2 * size)
+
+        # Everything starts free, so each level is "length" for nodes inside
+        # [0, minutes), 0 past it, and at most one node straddling the end that
+        # needs a real pull. Filled with slices, this gets built once per
+        # schedule and a python loop over every node would dominate small ones.
+        length, first = 1, size
+        while first >= 1:
+            full = self.minutes // length
+            for arr in (self._pref, self._suf, self._best):
+                arr[first:first + full] = [length] * full
+            if length > 1 and full < first and self.minutes % length:
+                self._pull(first + full, length)
+            length, first = length * 2, first // 2
+
+    @property
+    def longest_free(self) -> int:
+        return self._best[1]
+
+    def nearest_fit(self, target: int, duration: int) -> Optional[int]:
+        """
+        Start minute of a free run of `duration` minutes, as close to `target` as possible.
+
+        Ties go to the earlier start: doing something a bit early is usually
+        better than doing it a bit late. None if nothing that long is free.
+        """
+        if duration <= 0 or duration > self._best[1]:
+            return None
+        target = min(max(target, 0), self.minutes - duration)
+
+        after = self._first_fit_from(target, duration)
+        if after == target:
+            return target
+        before = self._last_fit_until(target, duration)
+
+        if before is None:
+            return after
+        if after is None or target - before <= after - target:
+            return before
+        return after
+
+    def occupy(self, start: int, duration: int) -> None:
+        """
+        Marks [start, start + duration) as taken. The range must be free.
+        """
+        self._occupy(1, 0, self._size, start, start + duration)
+
+    # ---- tree internals ----
+
+    def _pull(self, node: int, length: int) -> None:
+        left, right = 2 * node, 2 * node + 1
+        half = length // 2
+        pref, suf, best = self._pref, self._suf, self._best
+        pref[node] = pref[left] if pref[left] < half else half + pref[right]
+        suf[node] = suf[right] if suf[right] < half else half + suf[left]
+        best[node] = max(best[left], best[right], suf[left] + pref[right])
+
+    def _push(self, node: int) -> None:
+        # A node with no free minute means its whole range is taken,
+        # which its children may not know yet.
+        if self._best[node] == 0:
+            for child in (2 * node, 2 * node + 1):
+                self._pref[child] = self._suf[child] = self._best[child] = 0
+
+    def _occupy(self, node: int, lo: int, hi: int, start: int, end: int) -> None:
+        if end <= lo or hi <= start:
+            return
+        if start <= lo and hi <= end:
+            self._pref[node] = self._suf[node] = self._best[node] = 0
+            return
+        self._push(node)
+        mid = (lo + hi) // 2
+        self._occupy(2 * node, lo, mid, start, end)
+        self._occupy(2 * node + 1, mid, hi, start, end)
+        self._pull(node, hi - lo)
+
+    def _cover(self, start: int, end: int) -> list[tuple[int, int, int]]:
+        """
+        The O(log n) nodes that exactly cover [start, end), left to right,
+        as (node, lo, length).
+        """
+        nodes: list[tuple[int, int, int]] = []
+
+        def walk(node: int, lo: int, length: int) -> None:
+            if end <= lo or lo + length <= start:
+                return
+            if start <= lo and lo + length <= end:
+                nodes.append((node, lo, length))
+                return
+            self._push(node)
+            half = length // 2
+            walk(2 * node, lo, half)
+            walk(2 * node + 1, lo + half, half)
+
+        walk(1, 0, self._size)
+        return nodes
+
+    def _first_fit_from(self, target: int, duration: int) -> Optional[int]:
+        """
+        Earliest start >= target with `duration` free minutes.
+        Walks the covering nodes left to right, carrying the free run that
+        reaches the current boundary.
+        """
+        pref, suf, best = self._pref, self._suf, self._best
+        run = 0
+        for node, lo, length in self._cover(target, self.minutes):
+            if run + pref[node] >= duration:
+                return lo - run
+            if best[node] >= duration:
+                return self._leftmost_in(node, lo, length, duration)
+            run = run + length if pref[node] == length else suf[node]
+        return None
+
+    def _last_fit_until(self, target: int, duration: int) -> Optional[int]:
+        """
+        Latest start <= target with `duration` free minutes.
+        Mirror of _first_fit_from: walks right to left over [0, target + duration).
+        """
+        pref, suf, best = self._pref, self._suf, self._best
+        run = 0
+        for node, lo, length in reversed(self._cover(0, target + duration)):
+            if suf[node] + run >= duration:
+                return lo + length + run - duration
+            if best[node] >= duration:
+                return self._rightmost_in(node, lo, length, duration)
+            run = run + length if suf[node] == length else pref[node]
+        return None
+
+    def _leftmost_in(self, node: int, lo: int, length: int, duration: int) -> int:
+        # Caller guarantees best[node] >= duration.
+        pref, suf, best = self._pref, self._suf, self._best
+        while length > 1:
+            half = length // 2
+            left, right = 2 * node, 2 * node + 1
+            if best[left] >= duration:
+                node, length = left, half
+            elif suf[left] + pref[right] >= duration:
+                return lo + half - suf[left]
+            else:
+                node, lo, length = right, lo + half, half
+        return lo
+
+    def _rightmost_in(self, node: int, lo: int, length: int, duration: int) -> int:
+        # Caller guarantees best[node] >= duration. Returns the latest start.
+        pref, suf, best = self._pref, self._suf, self._best
+        while length > 1:
+            half = length // 2
+            left, right = 2 * node, 2 * node + 1
+            if best[right] >= duration:
+                node, lo, length = right, lo + half, half
+            elif suf[left] + pref[right] >= duration:
+                return lo + half + pref[right] - duration
+            else:
+                node, length = left, half
+        return lo + length - duration
@@ -0,0 +1,173 @@
+"""
+persistent priority index for the stateful shift (v1)
+
+why this exists:
+POST /state/replan used to rebuild a ScheduleRequest from the whole context and
+call generate_schedule, which rescored and resorted every order even if only one
+order changed since the last replan.
+
+this module keeps scored orders in a binary heap that lives next to the state:
+- adding an order scores just that order and pushes it, O(log n)
+- deleting an order marks it dead (lazy deletion), O(1), and the heap gets
+  compacted once dead entries outnumber live ones
+- replan walks the heap in priority order and only redoes timeline placement
+
+the catch is time:
+urgency depends on "now", so scores drift as the shift goes on.
+all scores in the index are computed against the same reference time (scored_at).
+_compute_urgency changes in two ways (see _compute_urgency):
+- slowly: at most 1/30 per minute along the curve, so we do a full rescore once
+  the index is older than a configurable interval. within that interval a replan
+  can lag a fresh score by a tiny amount, which is the trade we are making on purpose.
+- in one step: an order jumps from 2.5 to 3.0 the moment it becomes overdue, which
+  can reorder the plan right away. so the index also remembers the earliest due
+  time that was still ahead when it was scored, and rescores once now passes it.
+"""
+
+from __future__ import annotations
+
+import heapq
+from datetime import datetime, timedelta
+from itertools import count
+from typing import Iterable, Iterator, Optional
+
+from app.schemas.clinical import Order, Patient
+from app.services.order_table import OrderTable, to_epoch_us
+from app.services.scheduler import ScoredOrder, score_order, score_table
+
+# (negative score, due time in epoch microseconds, insertion sequence, order id)
+# same key the sort in score_orders uses, plus the sequence so ties keep insertion
+# order exactly like a stable sort does, and the heap never compares further.
+# The due time is an int so entries for orders scored straight from the order
+# table (app/services/order_table.py) never need the Order built.
+_HeapEntry = tuple[float, int, int, str]
+
+
+class PriorityIndex:
+    """
+    Heap of scored orders, kept in sync with ShiftContext mutations.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[_HeapEntry] = []
+        # order id -> (the heap entry that is currently valid, its scored order)
+        self._live: dict[str, tuple[_HeapEntry, ScoredOrder]] = {}
+        self._seq = count()
+        self.scored_at: Optional[datetime] = None
+        # earliest due time (epoch us) of an order that was not overdue yet at
+        # scored_at. Not lowered back when that order goes away, that only
+        # costs one rescore earlier than needed.
+        self.next_due_us: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def needs_rebuild(self, now: datetime, max_age: timedelta) -> bool:
+        """
+        True when the index was never built, its scores are too old to trust, or
+        an order it scored as not yet due has become overdue since.
+        """
+        if self.scored_at is None:
+            return True
+        age = now - self.scored_at
+        if age < timedelta(0) or age > max_age:
+            return True
+        return self.next_due_us is not None and to_epoch_us(now) >= self.next_due_us
+
+    def invalidate(self) -> None:
+        """
+        Forces a full rescore on the next replan.
+        """
+        self._heap = []
+        self._live = {}
+        self.scored_at = None
+        self.next_due_us = None
+
+    def rebuild(
+        self,
+        now: datetime,
+        patients_by_id: dict[str, Patient],
+        orders: OrderTable,
+        extra: Iterable[Order] = (),
+    ) -> None:
+        """
+        Rescores every order in the table, then `extra` (recurring occurrences), against `now`.
+
+        score_table already returns the orders sorted by the heap key, and a
+        sorted list is a valid heap, so there is no heapify step. It reads the
+        table's columns directly (numpy for big units) and leaves every order a
+        row in the table until placement actually needs it.
+        """
+        self._heap = []
+        self._live = {}
+        self._seq = count()
+        self.scored_at = now
+        self.next_due_us = None
+
+        # ties in score_table keep input order, so handing out sequence numbers
+        # in ranked order still agrees with insertion order for tied orders
+        for item in score_table(now, patients_by_id, orders, extra):
+            self._heap.append(self._store(item))
+
+    def push(self, patient: Patient, order: Order) -> None:
+        """
+        Scores one order against the index reference time and pushes it, O(log n).
+
+        If the index has not been built yet there is nothing to keep in sync,
+        the next replan will do a full build anyway.
+        """
+        if self.scored_at is None:
+            return
+
+        # Rescoring an order that is already indexed keeps its sequence number,
+        # so it keeps its place among tied orders just like a full rebuild would.
+        previous = self._live.pop(order.id, None)
+        seq = previous[0][2] if previous is not None else None
+
+        entry = self._store(score_order(self.scored_at, patient, order), seq)
+        heapq.heappush(self._heap, entry)
+
+    def discard(self, order_id: str) -> None:
+        """
+        Drops an order from the index. The heap entry is removed lazily.
+        """
+        if self._live.pop(order_id, None) is None:
+            return
+
+        # Compact once more than half of the heap is dead weight,
+        # so memory and replan cost stay proportional to live orders.
+        if len(self._heap) > 2 * len(self._live) + 32:
+            self._heap = [entry for entry, _ in self._live.values()]
+            heapq.heapify(self._heap)
+
+    def iter_ranked(self) -> Iterator[ScoredOrder]:
+        """
+        Yields live scored orders in priority order (highest first).
+
+        Works on a copy of the heap and the live table, taken right away (not
+        lazily), so the caller can keep iterating after releasing the context
+        lock while writers keep changing the index. Copies are flat C level
+        copies, and each order the caller actually consumes costs O(log n).
+        """
+        return self._drain(list(self._heap), dict(self._live))
+
+    @staticmethod
+    def _drain(
+        heap: list[_HeapEntry],
+        live: dict[str, tuple[_HeapEntry, ScoredOrder]],
+    ) -> Iterator[ScoredOrder]:
+        while heap:
+            entry = heapq.heappop(heap)
+            current = live.get(entry[3])
+            if current is not None and current[0] is entry:
+                yield current[1]
+
+    def _store(self, item: ScoredOrder, seq: Optional[int] = None) -> _HeapEntry:
+        order_id = item.order_id
+        if seq is None:
+            seq = next(self._seq)
+        entry = (-item.score, item.due_key, seq, order_id)
+        self._live[order_id] = (entry, item)
+        if item.minutes_until_due > 0 and (self.next_due_us is None or item.due_key < self.next_due_us):
+            self.next_due_us = item.due_key
+        return entry
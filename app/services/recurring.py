@@ -0,0 +1,145 @@
+"""
+recurring order expansion (v1)
+
+why this exists:
+feeds send recurring meds and assessments (q1h neuro checks, q4h vitals) as
+hundreds of separate pre-expanded orders per patient. every one of them has to be
+parsed, validated, stored and persisted, even the ones due days after the shift.
+
+a RecurringOrder (app/schemas/clinical.py) is one row instead. it is only turned
+into plain Orders here, lazily, and only for the occurrences due inside the shift
+being scheduled. so ingest and state size follow the number of definitions, and
+scoring only ever sees what could actually be scheduled this shift.
+
+how it works:
+occurrence k of a series is due at first_due_at + k * interval. the first and last
+index inside a window are found with one division each, no walking the series
+from its start (a q1h order that started last week costs the same as a new one).
+
+the window is the shift plus a lookback before its start (OVERDUE_LOOKBACK), so an
+occurrence that came due shortly before the shift and was never completed still
+surfaces as overdue work instead of quietly falling between two shifts.
+
+occurrence ids are "{series id}@{k}", so the same occurrence always has the same
+id across replans, and completing one (DELETE /state/orders/{id}) can be recorded
+as "index k of this series is done" instead of storing the occurrence itself.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import AbstractSet, Iterable, Iterator, Mapping, Optional
+
+from app.schemas.clinical import Order, RecurringOrder, ScheduleRequest, Shift
+
+OCCURRENCE_SEPARATOR = "@"
+
+# How far before the shift start open occurrences are still picked up.
+# _compute_urgency stops climbing 60 minutes past due, anything missed before
+# that belongs to the previous shift's handoff, not to a q15min series
+# repeating the same check a dozen times at the top of this plan.
+OVERDUE_LOOKBACK = timedelta(minutes=60)
+
+
+def occurrence_id(series_id: str, index: int) -> str:
+    return f"{series_id}{OCCURRENCE_SEPARATOR}{index}"
+
+
+def parse_occurrence_id(order_id: str) -> Optional[tuple[str, int]]:
+    """
+    (series id, occurrence index) for an id made by occurrence_id, None otherwise.
+
+    Only the exact spelling occurrence_id produces counts: plain ascii digits, no
+    leading zeros. "vit@01" or "vit@١" would otherwise name occurrence 1 too,
+    and one occurrence would answer to several order ids.
+    """
+    series_id, sep, index = order_id.rpartition(OCCURRENCE_SEPARATOR)
+    if not sep or not series_id or not (index.isascii() and index.isdigit()) or str(int(index)) != index:
+        return None
+    return series_id, int(index)
+
+
+def shift_window(shift: Shift) -> tuple[datetime, datetime]:
+    """
+    [start, end) of the occurrences that belong to `shift`: its own window,
+    plus OVERDUE_LOOKBACK before it for the ones still open from just before.
+    """
+    return shift.start_at - OVERDUE_LOOKBACK, shift.end_at
+
+
+def occurrence_range(rec: RecurringOrder, start: datetime, end: datetime) -> range:
+    """
+    Indexes of the occurrences due in [start, end).
+    """
+    step = timedelta(minutes=rec.interval_minutes)
+    if rec.ends_at is not None:
+        end = min(end, rec.ends_at)
+    if end <= rec.first_due_at:
+        return range(0)
+
+    # ceil((t - first_due_at) / step), with timedelta floor division
+    first = 0 if start <= rec.first_due_at else -((rec.first_due_at - start) // step)
+    stop = -((rec.first_due_at - end) // step)
+    if rec.count is not None:
+        stop = min(stop, rec.count)
+    return range(first, max(first, stop))
+
+
+def expand(
+    rec: RecurringOrder,
+    start: datetime,
+    end: datetime,
+    done: AbstractSet[int] = frozenset(),
+) -> Iterator[Order]:
+    """
+    Yields the occurrences of one series due in [start, end), skipping the
+    indexes in `done` (occurrences already completed or discontinued).
+    """
+    for k in occurrence_range(rec, start, end):
+        if k not in done:
+            yield occurrence(rec, k)
+
+
+def occurrence(rec: RecurringOrder, index: int) -> Order:
+    """
+    Occurrence `index` of a series as a plain Order.
+    """
+    return Order(
+        id=occurrence_id(rec.id, index),
+        patient_id=rec.patient_id,
+        type=rec.type,
+        description=rec.description,
+        due_at=rec.first_due_at + index * timedelta(minutes=rec.interval_minutes),
+        duration_minutes=rec.duration_minutes,
+        is_prn=rec.is_prn,
+        is_stat=rec.is_stat,
+    )
+
+
+def expand_for_shift(
+    recs: Iterable[RecurringOrder],
+    shift: Shift,
+    done_by_series: Optional[Mapping[str, AbstractSet[int]]] = None,
+) -> Iterator[Order]:
+    """
+    Occurrences of every series that fall inside the shift window (see
+    shift_window), lazily.
+    """
+    done_by_series = done_by_series or {}
+    start, end = shift_window(shift)
+    return chain.from_iterable(
+        expand(rec, start, end, done_by_series.get(rec.id, frozenset()))
+        for rec in recs
+    )
+
+
+def request_orders(req: ScheduleRequest) -> Iterable[Order]:
+    """
+    A request's one-off orders followed by its recurring occurrences for the shift.
+    Hands back `req.orders` itself when nothing recurs, so callers that check
+    for a list (the numpy scoring path) don't copy it.
+    """
+    if not req.recurring_orders:
+        return req.orders
+    return chain(req.orders, expand_for_shift(req.recurring_orders, req.shift))
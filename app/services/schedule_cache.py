@@ -0,0 +1,158 @@
+"""
+schedule caches (v1)
+
+why this exists:
+dashboards poll /state/replan every few seconds. most of those polls happen
+when nothing in the shift context has changed and only a few seconds passed.
+
+urgency moves in two ways while nothing changes: along the curve, at most 1/30
+per minute, and in one step of +0.5 when an order becomes overdue. the slope
+barely moves scores over a short window, the step can reorder the plan at any
+moment. so we cache the computed schedule per (context version, time bucket):
+- any mutation bumps the context version, so stale plans are never served
+- the time bucket (settings.replan_cache_bucket_seconds) bounds how old a plan gets
+- a plan also expires at the next due time among its orders, whatever the bucket
+  says (see _lookup in app/api/routes/state.py)
+- a bounded LRU keeps memory flat no matter how long the server runs
+
+the stateless POST /schedule/generate has no context version, integration
+clients just post the same ScheduleRequest again on every screen refresh. with
+settings.generate_cache_enabled its results are cached per (request digest,
+time bucket) instead:
+- request_digest hashes the validated request, re-serialized, so key order,
+  whitespace and equivalent spellings of the same value don't matter
+- freshness follows the urgency curve, which moves in two ways:
+  - along the curve: urgency_bucket_seconds picks the longest bucket in which
+    that slope moves no order's urgency by more than a given amount
+  - in one step of +0.5 when an order becomes overdue: each entry also expires
+    at the request's next due time (next_due_us), whatever the bucket says
+- entries are the serialized response bytes, bounded by total size, so a hit
+  skips scoring, placement and serialization
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+from pydantic import TypeAdapter
+
+from app.schemas.clinical import ScheduleRequest
+from app.services.order_table import to_epoch_us
+from app.services.recurring import request_orders
+from app.services.scheduler import URGENCY_MAX_SLOPE_PER_MINUTE
+
+V = TypeVar("V")
+
+_REQUEST_ADAPTER = TypeAdapter(ScheduleRequest)
+
+
+def time_bucket(now: datetime, bucket_seconds: float) -> int:
+    """
+    Quantizes a timestamp so every call within the same window gets the same bucket.
+    """
+    return int(now.timestamp() // bucket_seconds)
+
+
+def urgency_bucket_seconds(max_urgency_drift: float) -> float:
+    """
+    Longest time bucket in which the slope of _compute_urgency moves no order's
+    urgency by more than `max_urgency_drift`.
+
+    That covers the gradual part of the curve only: the step an order takes
+    when it becomes overdue is bounded by next_due_us, not by any bucket width.
+    """
+    return max_urgency_drift / URGENCY_MAX_SLOPE_PER_MINUTE * 60.0
+
+
+def next_due_us(req: ScheduleRequest, now: datetime) -> Optional[int]:
+    """
+    Earliest due time after `now` among the request's orders, recurring
+    occurrences included, as epoch microseconds. A plan computed at `now` has
+    that order ranked as not yet due, so it is stale from that moment on.
+    """
+    now_us = to_epoch_us(now)
+    return min((due for o in request_orders(req) if (due := to_epoch_us(o.due_at)) > now_us), default=None)
+
+
+def request_digest(req: ScheduleRequest) -> str:
+    """
+    Content hash of a schedule request. Requests that validate to the same
+    values get the same digest, whatever their JSON looked like.
+    """
+    return hashlib.blake2b(_REQUEST_ADAPTER.dump_json(req), digest_size=16).hexdigest()
+
+
+class LRUCache(Generic[V]):
+    """
+    Tiny thread safe LRU cache with hit/miss counters.
+
+    Sync route handlers run in FastAPI's threadpool, so access goes through a lock.
+
+    With `max_bytes`, entries are also evicted until the sizes `weigh` reports
+    add up to at most that. A single value bigger than max_bytes is not kept.
+
+    `get` can be given an `is_fresh` check: an entry that fails it is dropped
+    and counts as a miss.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: Optional[int] = None,
+        weigh: Optional[Callable[[V], int]] = None,
+    ) -> None:
+        if max_bytes is not None and weigh is None:
+            raise ValueError("max_bytes needs a weigh function.")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._weigh = weigh
+        self._entries: OrderedDict[Hashable, V] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, is_fresh: Optional[Callable[[V], bool]] = None) -> Optional[V]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None and is_fresh is not None and not is_fresh(value):
+                self._pop(key)
+                value = None
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: V) -> None:
+        with self._lock:
+            self._pop(key)
+            if self.max_bytes is not None:
+                size = self._weigh(value)
+                if size > self.max_bytes:
+                    return
+                self.nbytes += size
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self.nbytes > self.max_bytes
+            ):
+                self._pop(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def _pop(self, key: Hashable) -> None:
+        # Caller holds the lock.
+        value = self._entries.pop(key, None)
+        if value is not None and self._weigh is not None:
+            self.nbytes -= self._weigh(value)
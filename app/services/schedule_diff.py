@@ -0,0 +1,55 @@
+"""
+schedule diffs (v1)
+
+why this exists:
+bedside tablets poll /state/replan over weak wifi. most of the time only one or
+two orders changed, but the full response repeats every task on the timeline.
+
+diff_schedules compares two schedules by order id:
+- added:   on the new timeline, not on the old one
+- moved:   on both, but its slot changed
+- removed: on the old timeline, not on the new one
+
+during a live shift a sequential timeline starts at "now", so between two replans
+every task slides by however much time passed, even if nothing changed. comparing
+wall clock times would list every task as moved. so the caller passes that slide
+(`offset`, the difference between the two timeline starts) and a task only counts
+as moved when its slot changed by anything else. clients move the tasks that are
+not listed by the same offset (ScheduleDiff.offset_seconds).
+
+a task that kept its slot is not sent again, even if its score or summary text
+drifted (the "due in ~Xm" part changes every minute). the slot is what the nurse
+acts on, and the next full replan refreshes the rest.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from app.schemas.clinical import ScheduledTask, ScheduleResponse
+
+
+def diff_schedules(
+    old: ScheduleResponse,
+    new: ScheduleResponse,
+    offset: timedelta = timedelta(0),
+) -> tuple[list[ScheduledTask], list[ScheduledTask], list[str]]:
+    """
+    Returns (added, moved, removed) going from `old` to `new`, where a task
+    that kept its slot sits `offset` later on the new timeline.
+    added and moved keep timeline order, removed keeps the old timeline order.
+    """
+    old_by_id = {task.order_id: task for task in old.tasks}
+    new_ids = {task.order_id for task in new.tasks}
+
+    added: list[ScheduledTask] = []
+    moved: list[ScheduledTask] = []
+    for task in new.tasks:
+        before = old_by_id.get(task.order_id)
+        if before is None:
+            added.append(task)
+        elif before.starts_at + offset != task.starts_at or before.ends_at + offset != task.ends_at:
+            moved.append(task)
+
+    removed = [order_id for order_id in old_by_id if order_id not in new_ids]
+    return added, moved, removed
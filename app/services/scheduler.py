@@ -24,10 +24,13 @@ deterministic rules based scoring approach before touching ML.
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import heapq
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Iterable
+from typing import Callable, Iterable, Iterator, Mapping, Optional
 
+from app.core import metrics
+from app.core.config import settings
 from app.schemas.clinical import (
     AcuityLevel,
     Order,
@@ -37,8 +40,27 @@ from app.schemas.clinical import (
     ScheduleResponse,
     ScheduledTask,
     ScoreBreakdown,
+    Shift,
 )
 
+from app.services.optimizer import improve_schedule
+from app.services.order_table import (
+    FLAG_DEAD,
+    FLAG_PRN,
+    FLAG_STAT,
+    ORDER_TYPES,
+    OrderColumns,
+    OrderTable,
+    to_epoch_us,
+)
+from app.services.placement import FreeTimeline
+from app.services.recurring import request_orders
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the pure python scoring path always works
+    np = None
+
 
 # -------------------------
 # Scoring weights (v1)
@@ -72,19 +94,118 @@ TYPE_WEIGHT: dict[OrderType, float] = {
     OrderType.lab: 1.1,
 }
 
+# Above this many orders, score_orders switches to the columnar (numpy) path.
+# Below it the per order python loop is actually faster because building the
+# arrays has a fixed cost that small requests never pay back.
+VECTORIZE_MIN_ORDERS = 2000
+
 
-@dataclass(frozen=True)
 class ScoredOrder:
     """
-    Small wrapper object so we can keep the order plus its computed score plus
-    an explanation string all together.
+    Small record that keeps an order together with its computed score.
 
     This makes later steps (sorting and scheduling) cleaner and easier to test.
+
+    Why __slots__ and not a dataclass holding a ScoreBreakdown:
+    most scored orders never make it onto the timeline once the shift is full.
+    So we only keep the raw numbers here, and build the human readable summary
+    and the pydantic breakdown on demand, which in practice means only for
+    tasks that actually get placed.
+
+    The same goes for the order itself when it was scored straight from the
+    stateful order table (score_table): it stays a row in the table until
+    something reads `order`.
     """
-    order: Order
-    score: float
-    summary: str
-    breakdown: ScoreBreakdown
+    __slots__ = ("_order", "_columns", "_row", "patient", "score", "minutes_until_due", "urgency")
+
+    def __init__(
+        self,
+        order: Order,
+        patient: Patient,
+        score: float,
+        minutes_until_due: float,
+        urgency: float,
+    ) -> None:
+        self._order: Optional[Order] = order
+        self._columns: Optional[OrderColumns] = None
+        self._row = -1
+        self.patient = patient
+        self.score = score
+        self.minutes_until_due = minutes_until_due
+        self.urgency = urgency
+
+    @classmethod
+    def from_row(
+        cls,
+        columns: OrderColumns,
+        row: int,
+        patient: Patient,
+        score: float,
+        minutes_until_due: float,
+        urgency: float,
+    ) -> ScoredOrder:
+        item = cls.__new__(cls)
+        item._order = None
+        item._columns = columns
+        item._row = row
+        item.patient = patient
+        item.score = score
+        item.minutes_until_due = minutes_until_due
+        item.urgency = urgency
+        return item
+
+    @property
+    def order(self) -> Order:
+        if self._order is None:
+            self._order = self._columns.view(self._row)
+        return self._order
+
+    @property
+    def order_id(self) -> str:
+        if self._order is not None:
+            return self._order.id
+        return self._columns.ids[self._row]
+
+    @property
+    def due_key(self) -> int:
+        """
+        Due time as epoch microseconds, for ordering without building the Order.
+        """
+        if self._columns is not None:
+            return self._columns.due_us[self._row]
+        return to_epoch_us(self._order.due_at)
+
+    def __repr__(self) -> str:
+        return f"ScoredOrder(order_id={self.order_id!r}, score={self.score!r})"
+
+    @property
+    def summary(self) -> str:
+        # Human readable summary:
+        # This is the part a nurse or teammate should be able to skim without decoding a bunch of key=value pairs.
+        # Example: "procedure for Patient A (acuity: critical, due in ~84m, STAT)"
+        o = self.order
+        p = self.patient
+        return (
+            f"{o.type.value} for {p.display_name} "
+            f"(acuity: {p.acuity.value}, due in ~{self.minutes_until_due:.0f}m"
+            f"{', STAT' if o.is_stat else ''}"
+            f"{', PRN' if o.is_prn else ''})"
+        )
+
+    @property
+    def breakdown(self) -> ScoreBreakdown:
+        # Structured breakdown:
+        # This keeps the decision explainable and debuggable.
+        # If a teammate wants to tune weights later, this makes it way easier to see what contributed to the score.
+        o = self.order
+        return ScoreBreakdown(
+            acuity=self.patient.acuity.value,
+            order_type=o.type.value,
+            due_in_minutes=round(self.minutes_until_due, 1),
+            urgency=round(self.urgency, 2),
+            is_stat=o.is_stat,
+            is_prn=o.is_prn,
+        )
 
 
 def _minutes_until(now: datetime, due_at: datetime) -> float:
@@ -99,6 +220,12 @@ def _minutes_until(now: datetime, due_at: datetime) -> float:
     return (due_at - now).total_seconds() / 60.0
 
 
+# Steepest slope of _compute_urgency, in urgency per minute (the overdue ramp),
+# used by the /schedule/generate cache to size its time buckets. It says nothing
+# about the step from 2.5 to 3.0 at the due time, that needs its own bound.
+URGENCY_MAX_SLOPE_PER_MINUTE = 1.0 / 30.0
+
+
 def _compute_urgency(minutes_until_due: float) -> float:
     """
     Converts time until due into an urgency factor.
@@ -146,73 +273,299 @@ def score_orders(
     - In v1, if an order references an unknown patient, I skip it.
       Another valid choice would be raising an error and rejecting the request.
       Skipping is more forgiving for demo mode.
+    - Large batches (VECTORIZE_MIN_ORDERS and up) are scored column wise with numpy
+      when it is installed. Scores and ordering are identical either way.
+    """
+    return _score_all(now, patients_by_id, orders, rank=True)
+
+
+def _score_all(
+    now: datetime,
+    patients_by_id: dict[str, Patient],
+    orders: Iterable[Order],
+    rank: bool,
+) -> list[ScoredOrder]:
+    """
+    Shared body of score_orders.
+
+    With rank=False the scored orders come back in input order, for callers
+    (the heap selection in generate_schedule) that do their own ordering.
     """
+    if np is not None:
+        # We need the length to pick a path, so materialize generators once.
+        orders = orders if isinstance(orders, list) else list(orders)
+        if len(orders) >= VECTORIZE_MIN_ORDERS:
+            scored = _score_orders_vectorized(now, patients_by_id, orders, rank)
+            metrics.count("orders_scored", len(scored))
+            return scored
+
     scored: list[ScoredOrder] = []
 
-    for o in orders:
-        p = patients_by_id.get(o.patient_id)
-        if p is None:
-            # In real life, this would be data quality problem.
-            # For demo mode, I skip rather than crash the whole schedule.
-            continue
+    with metrics.stage("score"):
+        for o in orders:
+            p = patients_by_id.get(o.patient_id)
+            if p is None:
+                # In real life, this would be data quality problem.
+                # For demo mode, I skip rather than crash the whole schedule.
+                continue
+
+            scored.append(score_order(now, p, o))
+
+    if rank:
+        # Sort order:
+        # 1) highest score first
+        # 2) if scores tie, earlier due time first
+        with metrics.stage("sort"):
+            scored.sort(key=lambda x: (-x.score, x.order.due_at))
+
+    metrics.count("orders_scored", len(scored))
+    return scored
+
+
+def score_order(now: datetime, p: Patient, o: Order) -> ScoredOrder:
+    """
+    Scores a single order for a known patient.
+
+    This is the v1 formula in one place. score_orders runs it in a loop, and the
+    incremental priority index (app/services/priority.py) calls it directly
+    when one order is added so it does not have to rescore the whole shift.
+    """
+    acuity_factor = ACUITY_WEIGHT[p.acuity]
+    type_factor = TYPE_WEIGHT[o.type]
+
+    mins = _minutes_until(now, o.due_at)
+    urgency = _compute_urgency(mins)
+
+    # STAT should float to the top.
+    # I keep this as an additive bonus so it can break ties even when other factors are close.
+    stat_bonus = 1.5 if o.is_stat else 0.0
+
+    # PRN is tricky. Some PRNs are critical, some are not.
+    # For v1 I apply a small penalty, not a big one, because I do not want to bury PRNs.
+    prn_penalty = 0.4 if o.is_prn else 0.0
+
+    # Score formula (v1)
+    # Bigger score means more important.
+    score = (acuity_factor * type_factor * urgency) + stat_bonus - prn_penalty
+
+    return ScoredOrder(o, p, score, mins, urgency)
+
 
-        acuity_factor = ACUITY_WEIGHT[p.acuity]
-        type_factor = TYPE_WEIGHT[o.type]
+# Lookup tables for the columnar path.
+# Enums are packed as small integer codes and the weights are read back with a
+# single array gather instead of one dict lookup per order.
+_ACUITY_CODES: dict[AcuityLevel, int] = {level: i for i, level in enumerate(AcuityLevel)}
+_TYPE_CODES: dict[OrderType, int] = {t: i for i, t in enumerate(OrderType)}
+_ONE_MICROSECOND = timedelta(microseconds=1)
 
-        mins = _minutes_until(now, o.due_at)
-        urgency = _compute_urgency(mins)
 
-        # STAT should float to the top.
-        # I keep this as an additive bonus so it can break ties even when other factors are close.
-        stat_bonus = 1.5 if o.is_stat else 0.0
+def _score_orders_vectorized(
+    now: datetime,
+    patients_by_id: dict[str, Patient],
+    orders: list[Order],
+    rank: bool,
+) -> list[ScoredOrder]:
+    """
+    Same formula as the loop in score_orders, computed for the whole batch at once.
+
+    The orders are packed into columns (acuity code, type code, due offset,
+    STAT flag, PRN flag), then urgency and score are plain array math.
+
+    Keeping results identical to the python loop matters more than raw speed here:
+    - due offsets are exact integer microseconds, so minutes come out bit for bit
+      the same as timedelta.total_seconds() / 60
+    - the score is evaluated in the same operation order as the scalar formula
+    - lexsort is stable, so ties keep input order exactly like list.sort does
+    """
+    with metrics.stage("score"):
+        kept: list[tuple[Order, Patient]] = []
+        acuity_codes: list[int] = []
+        type_codes: list[int] = []
+        offsets_us: list[int] = []
+        stat_flags: list[bool] = []
+        prn_flags: list[bool] = []
+
+        for o in orders:
+            p = patients_by_id.get(o.patient_id)
+            if p is None:
+                # same rule as the python path: unknown patients are skipped
+                continue
+            kept.append((o, p))
+            acuity_codes.append(_ACUITY_CODES[p.acuity])
+            type_codes.append(_TYPE_CODES[o.type])
+            offsets_us.append((o.due_at - now) // _ONE_MICROSECOND)
+            stat_flags.append(o.is_stat)
+            prn_flags.append(o.is_prn)
+
+        if not kept:
+            return []
+
+        acuity_table = np.array([ACUITY_WEIGHT[level] for level in AcuityLevel])
+        type_table = np.array([TYPE_WEIGHT[t] for t in OrderType])
+
+        acuity_factor = acuity_table[np.array(acuity_codes, dtype=np.intp)]
+        type_factor = type_table[np.array(type_codes, dtype=np.intp)]
+        offsets = np.array(offsets_us, dtype=np.int64)
+        mins = offsets / 1e6 / 60.0
+
+        # Mirrors _compute_urgency branch for branch.
+        urgency = np.where(
+            mins <= 0,
+            3.0 + np.minimum(np.abs(mins) / 30.0, 2.0),
+            np.maximum(0.2, 2.5 - (mins / 120.0)),
+        )
 
-        # PRN is tricky. Some PRNs are critical, some are not.
-        # For v1 I apply a small penalty, not a big one, because I do not want to bury PRNs.
-        prn_penalty = 0.4 if o.is_prn else 0.0
+        stat_bonus = np.where(np.array(stat_flags, dtype=bool), 1.5, 0.0)
+        prn_penalty = np.where(np.array(prn_flags, dtype=bool), 0.4, 0.0)
 
-        # Score formula (v1)
-        # Bigger score means more important.
         score = (acuity_factor * type_factor * urgency) + stat_bonus - prn_penalty
 
-        # Human readable summary:
-        # This is the part a nurse or teammate should be able to skim without decoding a bunch of key=value pairs.
-        # Example: "procedure for Patient A (acuity: critical, due in ~84m, STAT)"
-        summary = (
-            f"{o.type.value} for {p.display_name} "
-            f"(acuity: {p.acuity.value}, due in ~{mins:.0f}m"
-            f"{', STAT' if o.is_stat else ''}"
-            f"{', PRN' if o.is_prn else ''})"
+        scored = [
+            ScoredOrder(o, p, value, minutes, urg)
+            for (o, p), value, minutes, urg in zip(kept, score.tolist(), mins.tolist(), urgency.tolist())
+        ]
+
+    if rank:
+        # lexsort uses the last key as the primary one:
+        # highest score first, then earliest due time.
+        with metrics.stage("sort"):
+            ranking = np.lexsort((offsets, -score))
+            scored = [scored[i] for i in ranking.tolist()]
+    return scored
+
+
+def score_table(
+    now: datetime,
+    patients_by_id: dict[str, Patient],
+    table: OrderTable,
+    extra: Iterable[Order] = (),
+) -> list[ScoredOrder]:
+    """
+    score_orders for the live rows of an OrderTable followed by `extra` orders
+    (recurring occurrences), reading the table's columns directly.
+
+    Same scores and the same ranking as score_orders over the table's orders in
+    insertion order plus `extra`, without building an Order per row: the
+    results point at their row and only build one when `order` is read.
+    """
+    cols = table.columns
+    extra_scored = _score_all(now, patients_by_id, extra, rank=False)
+
+    # patient code -> patient, None where the patient is unknown
+    patients = [patients_by_id.get(pid) for pid in cols.interned.patient_ids]
+    now_us = to_epoch_us(now)
+
+    if np is not None and len(table) >= VECTORIZE_MIN_ORDERS:
+        scored, scores, due = _score_columns_vectorized(now_us, patients, cols)
+        metrics.count("orders_scored", len(scored))
+        with metrics.stage("sort"):
+            scores = np.concatenate([scores, [item.score for item in extra_scored]])
+            due = np.concatenate([due, np.array([item.due_key for item in extra_scored], dtype=np.int64)])
+            scored.extend(extra_scored)
+            ranking = np.lexsort((due, -scores))
+            return [scored[i] for i in ranking.tolist()]
+
+    scored = []
+    with metrics.stage("score"):
+        flags, codes, type_codes, due_us = cols.flags, cols.patient_codes, cols.type_codes, cols.due_us
+        for row in range(len(cols)):
+            p = patients[codes[row]]
+            if p is None or not cols.alive(row):
+                continue
+
+            # same operations, in the same order, as score_order
+            mins = (due_us[row] - now_us) / 1e6 / 60.0
+            urgency = _compute_urgency(mins)
+            f = flags[row]
+            stat_bonus = 1.5 if f & FLAG_STAT else 0.0
+            prn_penalty = 0.4 if f & FLAG_PRN else 0.0
+            score = (
+                ACUITY_WEIGHT[p.acuity] * TYPE_WEIGHT[ORDER_TYPES[type_codes[row]]] * urgency
+            ) + stat_bonus - prn_penalty
+            scored.append(ScoredOrder.from_row(cols, row, p, score, mins, urgency))
+    metrics.count("orders_scored", len(scored))
+
+    scored.extend(extra_scored)
+    with metrics.stage("sort"):
+        scored.sort(key=lambda x: (-x.score, x.due_key))
+    return scored
+
+
+def _score_columns_vectorized(
+    now_us: int,
+    patients: list[Optional[Patient]],
+    cols: OrderColumns,
+) -> tuple[list[ScoredOrder], np.ndarray, np.ndarray]:
+    """
+    The score_table formula as array math over the table columns.
+    Returns the scored rows (in row order) with their scores and due times.
+    """
+    with metrics.stage("score"):
+        # np.array copies, so no view keeps a buffer export on the table's arrays
+        # (an exported array.array can't grow, and the table appends to them).
+        codes = np.array(cols.patient_codes, dtype=np.intp)
+        flags = np.array(cols.flags, dtype=np.uint8)
+
+        acuity_table = np.array([ACUITY_WEIGHT[level] for level in AcuityLevel])
+        type_table = np.array([TYPE_WEIGHT[t] for t in ORDER_TYPES])
+        known = np.array([p is not None for p in patients], dtype=bool)
+        acuity_by_code = np.array(
+            [_ACUITY_CODES[p.acuity] if p is not None else 0 for p in patients], dtype=np.intp
         )
 
-        # Structured breakdown:
-        # This keeps the decision explainable and debuggable.
-        # If a teammate wants to tune weights later, this makes it way easier to see what contributed to the score.
-        breakdown = ScoreBreakdown(
-            acuity=p.acuity.value,
-            order_type=o.type.value,
-            due_in_minutes=round(mins, 1),
-            urgency=round(urgency, 2),
-            is_stat=o.is_stat,
-            is_prn=o.is_prn,
+        rows = np.flatnonzero(known[codes] & ((flags & FLAG_DEAD) == 0))
+        codes = codes[rows]
+        flags = flags[rows]
+
+        acuity_factor = acuity_table[acuity_by_code[codes]]
+        type_factor = type_table[np.array(cols.type_codes, dtype=np.intp)[rows]]
+        due = np.array(cols.due_us, dtype=np.int64)[rows]
+        mins = (due - now_us) / 1e6 / 60.0
+
+        # Mirrors _compute_urgency branch for branch.
+        urgency = np.where(
+            mins <= 0,
+            3.0 + np.minimum(np.abs(mins) / 30.0, 2.0),
+            np.maximum(0.2, 2.5 - (mins / 120.0)),
         )
 
-        scored.append(
-            ScoredOrder(
-                order=o,
-                score=score,
-                summary=summary,
-                breakdown=breakdown,
+        stat_bonus = np.where(flags & FLAG_STAT, 1.5, 0.0)
+        prn_penalty = np.where(flags & FLAG_PRN, 0.4, 0.0)
+
+        score = (acuity_factor * type_factor * urgency) + stat_bonus - prn_penalty
+
+        scored = [
+            ScoredOrder.from_row(cols, row, patients[code], value, minutes, urg)
+            for row, code, value, minutes, urg in zip(
+                rows.tolist(), codes.tolist(), score.tolist(), mins.tolist(), urgency.tolist()
             )
-        )
+        ]
+    return scored, score, due
 
-    # Sort order:
-    # 1) highest score first
-    # 2) if scores tie, earlier due time first
-    scored.sort(key=lambda x: (-x.score, x.order.due_at))
-    return scored
 
+def _iter_by_priority_heap(scored: list[ScoredOrder]) -> Iterator[ScoredOrder]:
+    """
+    Yields scored orders in the same order score_orders would sort them, lazily.
 
-def generate_schedule(req: ScheduleRequest) -> ScheduleResponse:
+    heapify is O(n) and each pop is O(log n), so when the shift fills up after
+    k tasks we pay O(n + k log n) instead of sorting the whole backlog.
+    The input index is part of the key, which makes ties come out in input
+    order, same as the stable sort.
+    """
+    with metrics.stage("sort"):
+        heap = [(-item.score, item.order.due_at, i) for i, item in enumerate(scored)]
+        heapq.heapify(heap)
+    while heap:
+        yield scored[heapq.heappop(heap)[2]]
+
+
+def generate_schedule(
+    req: ScheduleRequest,
+    selection: Optional[str] = None,
+    placement: Optional[str] = None,
+    optimize_ms: Optional[float] = None,
+    now: Optional[datetime] = None,
+) -> ScheduleResponse:
     """
     Generates a schedule for a single shift.
 
@@ -236,93 +589,351 @@ def generate_schedule(req: ScheduleRequest) -> ScheduleResponse:
     Why keep it simple right now
     Because I want a clean baseline that is testable and explainable.
     Then we can layer complexity deliberately instead of building a spaghetti algorithm.
+
+    Selection modes
+    - "sort": score everything and sort the whole list (the original v1 behavior)
+    - "heap": heapify the scores and pop orders only until the shift is full
+    Both produce exactly the same schedule. The default comes from
+    settings.schedule_selection.
+
+    Placement modes (see ScheduleStream)
+    - "sequential": back to back from the start, stop when the shift is full (v1)
+    - "gaps": place each task near its due time, fill leftover gaps with tasks that fit
+    The default comes from settings.schedule_placement.
+
+    Optimizer
+    With optimize_ms > 0 (default settings.schedule_optimize_ms), the sequential
+    schedule is then reordered by local search for up to that many milliseconds,
+    trading a little score order for less lateness and fewer patient switches
+    (see app/services/optimizer.py). Same tasks, different order.
+
+    Clock
+    `now` defaults to the current UTC time. Passing it makes a run reproducible,
+    and lets the shift simulator (app/services/simulation.py) plan at simulated times.
     """
-    now = datetime.now(timezone.utc)
+    placement = placement or settings.schedule_placement
+    result = stream_schedule(req, selection, placement, now).collect()
+    return _optimize(result, placement, optimize_ms, lambda: {o.id: o for o in request_orders(req)})
 
-    # Build quick lookup for patient info (acuity, name, etc).
-    patients_by_id = {p.id: p for p in req.patients}
 
-    scored = score_orders(now=now, patients_by_id=patients_by_id, orders=req.orders)
+def timeline_start(shift: Shift, now: datetime) -> datetime:
+    """
+    Where sequential placement starts: now during a live shift, the shift start before it.
+    """
+    return shift.start_at if now < shift.start_at else now
 
-    shift_start = req.shift.start_at
-    shift_end = req.shift.end_at
 
-   # cursor is "where we are" in the timeline when placing tasks.
-#
-# we want behavior that makes sense for both:
-# - a live, in-progress shift (start at now, because we can't schedule in the past)
-# - a future shift (start at shift_start, because that's what the request asked for)
-#
-# this keeps demos intuitive and keeps real-world behavior reasonable.
-    cursor = shift_start if now < shift_start else now
-
-    tasks: list[ScheduledTask] = []
-    notes: list[str] = []
-
-    # Basic validation.
-    # If shift times are invalid, fail fast.
-    if shift_end <= shift_start:
-        return ScheduleResponse(
-            generated_at=now,
-            tasks=[],
-            notes=["Invalid shift window: end_at must be after start_at."],
-        )
+def plan_ranked(
+    shift: Shift,
+    ranked: Iterable[ScoredOrder],
+    now: datetime,
+    total: int,
+    placement: Optional[str] = None,
+    optimize_ms: Optional[float] = None,
+) -> ScheduleResponse:
+    """
+    generate_schedule for orders that are already scored and ranked (the
+    stateful replans, from a ShiftContext snapshot): placement, then the
+    optimizer when optimize_ms (default settings.schedule_optimize_ms) asks for it.
+    """
+    if optimize_ms is None:
+        optimize_ms = settings.schedule_optimize_ms
+
+    # The optimizer needs the Orders of the placed tasks. Scored orders only
+    # build those on demand, so remember the ones placement went through.
+    seen: dict[str, ScoredOrder] = {}
+    if optimize_ms > 0:
+        ranked = _remember(ranked, seen)
+
+    stream = ScheduleStream(shift=shift, ranked=ranked, now=now, total=total, placement=placement)
+    result = stream.collect()
+    return _optimize(
+        result,
+        stream.placement,
+        optimize_ms,
+        lambda: {t.order_id: seen[t.order_id].order for t in result.tasks},
+    )
 
-    # If we are already past the shift end, there is nothing to schedule.
-    if cursor >= shift_end:
-        return ScheduleResponse(
-            generated_at=now,
-            tasks=[],
-            notes=["Shift window has already ended relative to current time."],
-        )
 
-    for item in scored:
-        o = item.order
+def _remember(ranked: Iterable[ScoredOrder], seen: dict[str, ScoredOrder]) -> Iterator[ScoredOrder]:
+    for item in ranked:
+        seen[item.order_id] = item
+        yield item
 
-        # If we have no more room in the shift, stop.
-        if cursor >= shift_end:
-            notes.append("Shift is full. Remaining tasks could not be scheduled.")
-            break
 
-        # For v1, we do not try to place tasks exactly at due time.
-        # We are creating a prioritized plan, not a strict timed calendar.
-        # The nurse can still adjust the timeline.
-        #
-        # That said, we still respect the shift window boundaries.
-        start = cursor
-        end = start + timedelta(minutes=o.duration_minutes)
-
-        # If placing this task would exceed the shift, stop.
-        # Another approach would be "truncate" or "place partially" but that is not realistic here.
-        if end > shift_end:
-            notes.append(
-                "A task would exceed shift end. Stopping schedule generation."
-            )
-            break
-
-               # We want the response to be readable without needing to cross-reference IDs,
-        # so we include the patient display name too.
-        patient = patients_by_id.get(o.patient_id)
-
-        tasks.append(
-            ScheduledTask(
-                order_id=o.id,
-                patient_id=o.patient_id,
-                patient_display_name=patient.display_name if patient else "Unknown patient",
-                starts_at=start,
-                ends_at=end,
-                priority_score=item.score,
-                summary=item.summary,
-                score_breakdown=item.breakdown,
-            )
-        )
+def _optimize(
+    result: ScheduleResponse,
+    placement: str,
+    optimize_ms: Optional[float],
+    orders_by_id: Callable[[], Mapping[str, Order]],
+) -> ScheduleResponse:
+    """
+    Runs the local search optimizer on a placed schedule if optimize_ms > 0.
+    `orders_by_id` is only called when it actually runs.
+    """
+    if optimize_ms is None:
+        optimize_ms = settings.schedule_optimize_ms
+    if optimize_ms <= 0:
+        return result
+    if placement != "sequential":
+        # Gap placement already anchors tasks on due times and leaves holes
+        # the optimizer's back to back model can't represent.
+        result.notes.append("Optimizer skipped: it only reorders sequential schedules.")
+        return result
+    with metrics.stage("optimize"):
+        return improve_schedule(result, orders_by_id(), optimize_ms / 1000)
+
+
+def stream_schedule(
+    req: ScheduleRequest,
+    selection: Optional[str] = None,
+    placement: Optional[str] = None,
+    now: Optional[datetime] = None,
+) -> ScheduleStream:
+    """
+    Same as generate_schedule, but hands back tasks lazily as they get placed.
 
-        # Move the cursor forward.
-        cursor = end
+    Scoring happens up front, placement happens as the caller iterates
+    `stream.tasks`. The streaming (NDJSON) endpoints use this to send the
+    first task before the rest of the timeline exists.
+    """
+    now = now or datetime.now(timezone.utc)
+    selection = selection or settings.schedule_selection
+
+    # Build quick lookup for patient info (acuity, name, etc).
+    patients_by_id = {p.id: p for p in req.patients}
 
-    return ScheduleResponse(
-        generated_at=now,
-        tasks=tasks,
-        notes=notes,
+    # Recurring orders are expanded here, straight into scoring, never stored as a list.
+    orders = request_orders(req)
+
+    if selection == "heap":
+        scored = _score_all(now, patients_by_id, orders, rank=False)
+        ranked: Iterable[ScoredOrder] = _iter_by_priority_heap(scored)
+    elif selection == "sort":
+        scored = score_orders(now=now, patients_by_id=patients_by_id, orders=orders)
+        ranked = scored
+    else:
+        raise ValueError(f"Unknown selection mode '{selection}'.")
+
+    return ScheduleStream(
+        shift=req.shift,
+        ranked=ranked,
+        now=now,
+        total=len(scored),
+        placement=placement,
     )
 
+
+class ScheduleStream:
+    """
+    A schedule whose tasks are placed lazily, one per iteration step.
+
+    This is the placement half of generate_schedule. It is its own thing so the
+    stateful replan endpoint can feed it orders from the persistent priority
+    index instead of rescoring everything, and so the NDJSON endpoints can
+    send tasks while they are being placed.
+
+    `ranked` must already be in priority order (highest first). It is consumed
+    lazily and we stop pulling from it as soon as the shift is full, so lazy
+    sources (heaps) never pay for orders that could not fit anyway.
+    `total` is how many orders `ranked` holds, so we can report how many were
+    left unscheduled without draining it.
+
+    `notes` fills up while iterating, and `unscheduled_count` is only final once
+    `tasks` is exhausted. collect() does that and returns a normal ScheduleResponse.
+
+    `placement` picks how tasks land on the timeline (default settings.schedule_placement):
+    - "sequential": the v1 cursor, back to back in priority order, stops at the
+      first task that does not fit
+    - "gaps": each task goes at (or as close as possible to) its due time, tasks
+      that fit nowhere are skipped and the next one is tried
+      (see app/services/placement.py). Tasks are still placed, and streamed, in
+      priority order, collect() sorts them by start time.
+    """
+    __slots__ = ("generated_at", "notes", "total", "placed", "placement", "tasks")
+
+    def __init__(
+        self,
+        shift: Shift,
+        ranked: Iterable[ScoredOrder],
+        now: datetime,
+        total: int,
+        placement: Optional[str] = None,
+    ) -> None:
+        placement = placement or settings.schedule_placement
+        if placement not in ("sequential", "gaps"):
+            raise ValueError(f"Unknown placement mode '{placement}'.")
+
+        self.generated_at = now
+        self.placement = placement
+        self.notes: list[str] = []
+        self.total = total
+        self.placed = 0
+        self.tasks: Iterator[ScheduledTask] = self._place(shift, ranked, now)
+        if metrics.ENABLED:
+            self.tasks = self._timed(self.tasks)
+
+    @property
+    def unscheduled_count(self) -> int:
+        return self.total - self.placed
+
+    def collect(self) -> ScheduleResponse:
+        tasks = list(self.tasks)
+        if self.placement == "gaps":
+            tasks.sort(key=lambda task: task.starts_at)
+        # The tasks are ScheduledTask instances we just built, so skip validation
+        # walking the whole list again. (Not for the tasks themselves: for small flat
+        # models pydantic-core validation is faster than the pure python
+        # model_construct, see benchmarks/bench_serialization.py.)
+        return ScheduleResponse.model_construct(
+            generated_at=self.generated_at,
+            tasks=tasks,
+            notes=self.notes,
+            unscheduled_count=self.unscheduled_count,
+        )
+
+    def _timed(self, tasks: Iterator[ScheduledTask]) -> Iterator[ScheduledTask]:
+        """
+        Times placement (the "place" stage) without counting time the consumer
+        spends between tasks, which for NDJSON is serializing and sending them.
+        """
+        elapsed = 0.0
+        try:
+            while True:
+                started = time.perf_counter()
+                task = next(tasks, None)
+                elapsed += time.perf_counter() - started
+                if task is None:
+                    return
+                yield task
+        finally:
+            metrics.record("place", elapsed)
+            metrics.count("tasks_placed", self.placed)
+
+    def _place(
+        self,
+        shift: Shift,
+        ranked: Iterable[ScoredOrder],
+        now: datetime,
+    ) -> Iterator[ScheduledTask]:
+        notes = self.notes
+        shift_start = shift.start_at
+        shift_end = shift.end_at
+
+        # cursor is "where we are" in the timeline when placing tasks.
+        #
+        # we want behavior that makes sense for both:
+        # - a live, in-progress shift (start at now, because we can't schedule in the past)
+        # - a future shift (start at shift_start, because that's what the request asked for)
+        #
+        # this keeps demos intuitive and keeps real-world behavior reasonable.
+        cursor = timeline_start(shift, now)
+
+        # Basic validation.
+        # If shift times are invalid, fail fast.
+        if shift_end <= shift_start:
+            notes.append("Invalid shift window: end_at must be after start_at.")
+            return
+
+        # If we are already past the shift end, there is nothing to schedule.
+        if cursor >= shift_end:
+            notes.append("Shift window has already ended relative to current time.")
+            metrics.count("orders_dropped_capacity", self.total)
+            return
+
+        if self.placement == "gaps":
+            yield from self._fill_gaps(ranked, cursor, shift_end)
+            return
+
+        for item in ranked:
+            o = item.order
+
+            # If we have no more room in the shift, stop.
+            if cursor >= shift_end:
+                notes.append("Shift is full. Remaining tasks could not be scheduled.")
+                metrics.count("orders_dropped_capacity", self.total - self.placed)
+                break
+
+            # For v1, we do not try to place tasks exactly at due time.
+            # We are creating a prioritized plan, not a strict timed calendar.
+            # The nurse can still adjust the timeline.
+            #
+            # That said, we still respect the shift window boundaries.
+            start = cursor
+            end = start + timedelta(minutes=o.duration_minutes)
+
+            # If placing this task would exceed the shift, stop.
+            # Another approach would be "truncate" or "place partially" but that is not realistic here.
+            if end > shift_end:
+                notes.append(
+                    "A task would exceed shift end. Stopping schedule generation."
+                )
+                metrics.count("orders_dropped_capacity", self.total - self.placed)
+                break
+
+            task = _scheduled_task(item, start, end)
+            self.placed += 1
+            yield task
+
+            # Move the cursor forward.
+            cursor = end
+
+    def _fill_gaps(
+        self,
+        ranked: Iterable[ScoredOrder],
+        window_start: datetime,
+        shift_end: datetime,
+    ) -> Iterator[ScheduledTask]:
+        notes = self.notes
+
+        # Free time in whole minutes from window_start. Starts are always a whole
+        # number of minutes in, like with the cursor, so nothing is lost but the
+        # last partial minute of the shift, which no task could use anyway.
+        timeline = FreeTimeline((shift_end - window_start) // _ONE_MINUTE)
+        skipped = 0
+
+        for item in ranked:
+            if timeline.longest_free == 0:
+                notes.append("Shift is full. Remaining tasks could not be scheduled.")
+                break
+
+            o = item.order
+            # Overdue tasks get a negative target, which the timeline clamps to "now".
+            target = round((o.due_at - window_start) / _ONE_MINUTE)
+            offset = timeline.nearest_fit(target, o.duration_minutes)
+            if offset is None:
+                # No gap is long enough for this one, a shorter task may still fit.
+                skipped += 1
+                continue
+
+            timeline.occupy(offset, o.duration_minutes)
+            start = window_start + timedelta(minutes=offset)
+            end = start + timedelta(minutes=o.duration_minutes)
+
+            task = _scheduled_task(item, start, end)
+            self.placed += 1
+            yield task
+
+        if skipped:
+            notes.append(f"{skipped} task(s) did not fit in any remaining gap.")
+        metrics.count("orders_dropped_capacity", self.total - self.placed)
+
+
+_ONE_MINUTE = timedelta(minutes=1)
+
+
+def _scheduled_task(item: ScoredOrder, start: datetime, end: datetime) -> ScheduledTask:
+    # We want the response to be readable without needing to cross-reference IDs,
+    # so we include the patient display name too.
+    # The summary and breakdown are only built here, for tasks that made it in.
+    o = item.order
+    return ScheduledTask(
+        order_id=o.id,
+        patient_id=o.patient_id,
+        patient_display_name=item.patient.display_name,
+        starts_at=start,
+        ends_at=end,
+        priority_score=item.score,
+        summary=item.summary,
+        score_breakdown=item.breakdown,
+    )
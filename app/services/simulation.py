@@ -0,0 +1,213 @@
+"""
+shift simulator (v1)
+
+why this exists:
+the only way to see how a scoring or placement change plays out over a whole
+shift used to be running the API for 12 real hours. this replays a shift as a
+timeline of events against a ShiftContext, with a simulated clock, as fast as
+the scheduler can go (thousands of events per second).
+
+events:
+- arrive:      a new order shows up (POST /state/orders)
+- discontinue: an order is cancelled (DELETE /state/orders/{id})
+- complete:    someone finished an order outside the plan
+- tick:        nothing happens, but we replan (use it to force a replan at a time)
+
+after each event (events at the same instant count as one) the context is
+replanned at the event's time, exactly like /state/replan would at that moment.
+
+follow_plan=True closes the loop: a simulated nurse always works on the first
+task of the latest plan, is busy for its duration, then picks the next one.
+that is what makes scoring changes show up in the numbers: better priorities
+mean less lateness and fewer orders left over at the end of the shift.
+
+what gets recorded (SimulationReport):
+- lateness of every completed order (start minus due, 0 if on time)
+- the largest unscheduled_count any replan reported
+- how many orders were still open when the shift ended
+"""
+
+from __future__ import annotations
+
+import heapq
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from app.core.state import ShiftContext
+from app.schemas.clinical import Order, Patient, RecurringOrder, ScheduleResponse, Shift
+from app.services.scheduler import plan_ranked
+
+EVENT_KINDS = ("arrive", "discontinue", "complete", "tick")
+
+# Internal: the simulated nurse finished the task they were working on.
+_FINISH = "_finish"
+# Internal: the simulated nurse is idle and the first planned task starts later.
+_WAKE = "_wake"
+
+
+@dataclass(frozen=True)
+class SimEvent:
+    """
+    One thing that happens during a simulated shift.
+    `order` is needed for "arrive", `order_id` for "discontinue" and "complete".
+    """
+    at: datetime
+    kind: str
+    order: Optional[Order] = None
+    order_id: Optional[str] = None
+
+
+@dataclass
+class SimulationReport:
+    events: int = 0
+    replans: int = 0
+    arrived: int = 0
+    discontinued: int = 0
+    completed: int = 0
+    # events that referenced unknown patients or orders, or duplicate order ids
+    rejected: int = 0
+    # per completed order: minutes between due time and when work on it started (0 if on time)
+    lateness_minutes: list[float] = field(default_factory=list)
+    max_unscheduled: int = 0
+    # orders still open (or in progress) when the shift ended
+    left_over: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def summary(self) -> dict[str, float]:
+        late = sorted(self.lateness_minutes)
+        return {
+            "events": self.events,
+            "replans": self.replans,
+            "arrived": self.arrived,
+            "discontinued": self.discontinued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "late": sum(1 for m in late if m > 0),
+            "mean_lateness_min": round(sum(late) / len(late), 1) if late else 0.0,
+            "p90_lateness_min": round(late[int(len(late) * 0.9)], 1) if late else 0.0,
+            "max_lateness_min": round(late[-1], 1) if late else 0.0,
+            "max_unscheduled": self.max_unscheduled,
+            "left_over": self.left_over,
+            "events_per_second": round(self.events_per_second),
+        }
+
+
+class ShiftSimulator:
+    """
+    Replays events against a private ShiftContext (never one of the API's units).
+
+    `placement` is passed to plan_ranked, None means settings.schedule_placement.
+    `recurring_orders` are in place from the start, their occurrences come due on their own.
+    """
+
+    def __init__(
+        self,
+        shift: Shift,
+        patients: list[Patient],
+        follow_plan: bool = True,
+        placement: Optional[str] = None,
+        recurring_orders: Iterable[RecurringOrder] = (),
+    ) -> None:
+        self.shift = shift
+        self.follow_plan = follow_plan
+        self.placement = placement
+        self.ctx = ShiftContext()
+        self.ctx.set_shift(shift)
+        self.ctx.set_patients(patients)
+        for rec in recurring_orders:
+            self.ctx.add_recurring(rec)
+
+    def run(self, events: Iterable[SimEvent]) -> SimulationReport:
+        report = SimulationReport()
+        started = time.perf_counter()
+
+        # (time, sequence, event). The sequence keeps events at the same time in
+        # the order they were given and makes sure events are never compared.
+        queue = [(e.at, i, e) for i, e in enumerate(events)]
+        heapq.heapify(queue)
+        seq = len(queue)
+
+        working_on: Optional[tuple[Order, datetime]] = None
+        # wake-ups already queued, so an idle nurse gets one per time, not one per replan
+        wakes: set[datetime] = set()
+
+        while queue and queue[0][0] <= self.shift.end_at:
+            now = queue[0][0]
+            while queue and queue[0][0] == now:
+                _, _, event = heapq.heappop(queue)
+                if event.kind == _FINISH:
+                    order, start = working_on
+                    working_on = None
+                    self._record_done(report, order, start)
+                elif event.kind == _WAKE:
+                    wakes.discard(event.at)
+                else:
+                    report.events += 1
+                    self._apply(report, event)
+
+            plan = self._replan(now)
+            report.replans += 1
+            report.max_unscheduled = max(report.max_unscheduled, plan.unscheduled_count)
+
+            if self.follow_plan and working_on is None and plan.tasks:
+                task = plan.tasks[0]
+                if task.starts_at > now:
+                    # Gap placement can plan the first task later than now: wake up then.
+                    if task.starts_at not in wakes:
+                        wakes.add(task.starts_at)
+                        heapq.heappush(queue, (task.starts_at, seq, SimEvent(task.starts_at, _WAKE)))
+                else:
+                    working_on = (self._take(task.order_id), now)
+                    done = now + (task.ends_at - task.starts_at)
+                    heapq.heappush(queue, (done, seq, SimEvent(done, _FINISH)))
+                seq += 1
+
+        # From the priority index, so open occurrences of recurring orders count too.
+        open_orders = self.ctx.snapshot(self.shift.end_at).total
+        report.left_over = open_orders + (1 if working_on is not None else 0)
+        report.elapsed_seconds = time.perf_counter() - started
+        return report
+
+    def _apply(self, report: SimulationReport, event: SimEvent) -> None:
+        ctx = self.ctx
+        if event.kind == "arrive":
+            order = event.order
+            if order is None or not ctx.has_patient(order.patient_id) or ctx.has_order(order.id):
+                report.rejected += 1
+                return
+            ctx.add_order(order)
+            report.arrived += 1
+        elif event.kind == "discontinue":
+            if self._take(event.order_id) is None:
+                report.rejected += 1
+                return
+            report.discontinued += 1
+        elif event.kind == "complete":
+            order = self._take(event.order_id)
+            if order is None:
+                report.rejected += 1
+                return
+            # Only the completion time is known, assume work started one duration earlier.
+            self._record_done(report, order, event.at - timedelta(minutes=order.duration_minutes))
+        elif event.kind != "tick":
+            raise ValueError(f"Unknown event kind '{event.kind}'. Use one of {EVENT_KINDS}.")
+
+    def _take(self, order_id: str) -> Optional[Order]:
+        # A one-off order, or one occurrence of a recurring order (like DELETE /state/orders/{id}).
+        return self.ctx.remove_order(order_id) or self.ctx.complete_occurrence(order_id)
+
+    @staticmethod
+    def _record_done(report: SimulationReport, order: Order, start: datetime) -> None:
+        report.completed += 1
+        report.lateness_minutes.append(max(0.0, (start - order.due_at) / timedelta(minutes=1)))
+
+    def _replan(self, now: datetime) -> ScheduleResponse:
+        # Same as /state/replan at `now`, without the cache.
+        snap = self.ctx.snapshot(now)
+        return plan_ranked(snap.shift, snap.ranked, now, snap.total, placement=self.placement)
@@ -0,0 +1,74 @@
+"""
+single-flight execution for expensive, repeatable work (v1)
+
+why this exists:
+when a bunch of clients hit /state/replan at the same moment, they all want the
+same answer (same context version, same time bucket). running generate_schedule
+once per client just burns threadpool slots on identical work.
+
+SingleFlight merges concurrent calls with the same key into one computation,
+and every waiting caller gets the same result.
+
+it also owns where that computation runs:
+- a dedicated, small executor, so CPU bound replans never take the threadpool
+  slots FastAPI uses for health checks and mutations
+- a cap on pending computations (running + queued). past the cap new work is
+  refused with OverloadedError, which the route turns into a 503, instead of
+  building an ever growing queue during a replan storm
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+from concurrent.futures import Executor
+from typing import Callable, Generic, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class OverloadedError(RuntimeError):
+    """
+    Too many computations are already pending. Retry later.
+    """
+
+
+class SingleFlight(Generic[T]):
+    """
+    Runs `fn` at most once per key at a time, on a bounded executor.
+
+    Meant to be used from the event loop only, so the bookkeeping needs no lock.
+    """
+
+    def __init__(self, executor: Executor, max_pending: int) -> None:
+        self._executor = executor
+        self.max_pending = max_pending
+        self._inflight: dict[Hashable, asyncio.Future[T]] = {}
+
+    @property
+    def pending(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: Hashable, fn: Callable[[], T]) -> tuple[T, bool]:
+        """
+        Returns (result, shared) where shared is True if we joined a computation
+        another caller had already started.
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            # shield: one caller going away must not cancel the work for the others
+            return await asyncio.shield(future), True
+
+        if len(self._inflight) >= self.max_pending:
+            raise OverloadedError("Too many schedule computations in progress. Try again shortly.")
+
+        # run in a copy of our context like run_in_threadpool does, so request
+        # scoped state (Server-Timing stages) reaches the caller that started it
+        context = contextvars.copy_context()
+        future = asyncio.get_running_loop().run_in_executor(self._executor, context.run, fn)
+        self._inflight[key] = future
+        # cleanup on completion (not in a finally) so it also happens if the
+        # first caller is cancelled while others are still waiting
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        return await asyncio.shield(future), False
@@ -0,0 +1,159 @@
+"""
+synthetic EHR workload generator
+
+why this exists:
+/demo/payload makes 2 patients and 2 orders, which is perfect for trying the API
+and useless for finding out how the scheduler behaves with a full unit.
+
+this builds ScheduleRequests of any size out of the same Patient / Order / Shift
+schemas the API uses, with knobs for the things that change scheduler behavior:
+- how many patients and orders
+- acuity mix and order type mix
+- how many orders are STAT or PRN
+- how many orders are already overdue when the shift starts
+
+everything is driven by a seeded random generator, so the same spec always gives
+the same workload (important for benchmarks that compare runs over time).
+
+simulated data only, nothing here is or resembles real patient data.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Optional
+
+from app.schemas.clinical import (
+    AcuityLevel,
+    Order,
+    OrderType,
+    Patient,
+    ScheduleRequest,
+    Shift,
+)
+
+if TYPE_CHECKING:
+    from app.services.simulation import SimEvent
+
+# Rough, made up duration ranges (minutes) per order type.
+_DURATION_RANGE: dict[OrderType, tuple[int, int]] = {
+    OrderType.medication: (5, 15),
+    OrderType.procedure: (15, 60),
+    OrderType.lab: (5, 10),
+    OrderType.assessment: (10, 20),
+}
+
+
+@dataclass
+class WorkloadSpec:
+    """
+    Knobs for one synthetic workload. Mix weights don't need to sum to 1.
+    """
+    patients: int = 10
+    orders: int = 100
+    acuity_mix: dict[AcuityLevel, float] = field(
+        default_factory=lambda: {
+            AcuityLevel.low: 0.3,
+            AcuityLevel.medium: 0.4,
+            AcuityLevel.high: 0.2,
+            AcuityLevel.critical: 0.1,
+        }
+    )
+    type_mix: dict[OrderType, float] = field(
+        default_factory=lambda: {
+            OrderType.medication: 0.45,
+            OrderType.assessment: 0.25,
+            OrderType.lab: 0.2,
+            OrderType.procedure: 0.1,
+        }
+    )
+    stat_ratio: float = 0.05
+    prn_ratio: float = 0.1
+    overdue_fraction: float = 0.1
+    shift_hours: float = 12.0
+    seed: int = 0
+
+
+def generate_workload(spec: WorkloadSpec, now: Optional[datetime] = None) -> ScheduleRequest:
+    """
+    Builds a valid ScheduleRequest for `spec`.
+
+    The shift starts at `now` (default: current UTC time). Overdue orders are due
+    up to 3 hours before that, the rest are spread across the shift.
+    """
+    if spec.patients < 1:
+        raise ValueError("A workload needs at least one patient.")
+
+    rnd = random.Random(spec.seed)
+    now = now or datetime.now(timezone.utc)
+    shift = Shift(start_at=now, end_at=now + timedelta(hours=spec.shift_hours))
+    shift_minutes = spec.shift_hours * 60
+
+    acuity_levels = list(spec.acuity_mix)
+    acuities = rnd.choices(acuity_levels, weights=[spec.acuity_mix[a] for a in acuity_levels], k=spec.patients)
+    patients = [
+        Patient(id=f"p{i}", display_name=f"Patient {i}", acuity=acuity)
+        for i, acuity in enumerate(acuities)
+    ]
+
+    order_types = list(spec.type_mix)
+    types = rnd.choices(order_types, weights=[spec.type_mix[t] for t in order_types], k=spec.orders)
+
+    orders: list[Order] = []
+    for i, order_type in enumerate(types):
+        if rnd.random() < spec.overdue_fraction:
+            due_at = now - timedelta(minutes=rnd.uniform(1, 180))
+        else:
+            due_at = now + timedelta(minutes=rnd.uniform(0, shift_minutes))
+
+        low, high = _DURATION_RANGE[order_type]
+        orders.append(
+            Order(
+                id=f"o{i}",
+                patient_id=patients[rnd.randrange(spec.patients)].id,
+                type=order_type,
+                description=f"Synthetic {order_type.value} {i}",
+                due_at=due_at,
+                duration_minutes=rnd.randint(low, high),
+                is_stat=rnd.random() < spec.stat_ratio,
+                is_prn=rnd.random() < spec.prn_ratio,
+            )
+        )
+
+    return ScheduleRequest(shift=shift, patients=patients, orders=orders)
+
+
+def generate_shift_events(
+    spec: WorkloadSpec,
+    now: Optional[datetime] = None,
+    discontinue_fraction: float = 0.05,
+    max_lead_minutes: float = 120.0,
+) -> tuple[ScheduleRequest, list[SimEvent]]:
+    """
+    Turns a workload into a timeline for the shift simulator (app/services/simulation.py).
+
+    Each order arrives up to `max_lead_minutes` before it is due (never before
+    the shift starts, so overdue orders are all there at the start), and a
+    `discontinue_fraction` of them are cancelled somewhere between 10 minutes and
+    4 hours after they arrive.
+
+    Returns the workload (for its shift and patients) and the events, sorted by time.
+    """
+    from app.services.simulation import SimEvent
+
+    req = generate_workload(spec, now)
+    rnd = random.Random(spec.seed + 1)
+    start = req.shift.start_at
+
+    events: list[SimEvent] = []
+    for order in req.orders:
+        arrives = max(start, order.due_at - timedelta(minutes=rnd.uniform(0, max_lead_minutes)))
+        events.append(SimEvent(at=arrives, kind="arrive", order=order))
+        if rnd.random() < discontinue_fraction:
+            cancelled = arrives + timedelta(minutes=rnd.uniform(10, 240))
+            events.append(SimEvent(at=cancelled, kind="discontinue", order_id=order.id))
+
+    events.sort(key=lambda e: e.at)
+    return req, events
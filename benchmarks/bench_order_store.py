@@ -0,0 +1,84 @@
+"""
+order store benchmark
+
+compares the per order memory of keeping pydantic Orders in a dict (what
+ShiftContext used to do) with the columnar OrderTable, and how long a full
+rescore takes from each (score_orders over Orders vs score_table over columns).
+
+run it from the repo root:
+
+    python -m benchmarks.bench_order_store --orders 100000
+
+uses simulated data only. memory is measured with tracemalloc, so it counts
+python allocations made while building the store, not the process RSS.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from app.schemas.clinical import Order, ScheduleRequest
+from app.services.order_table import OrderTable
+from app.services.scheduler import score_orders, score_table
+from app.services.synthetic import WorkloadSpec, generate_workload
+
+
+def _measure(build: Callable[[], Any]) -> tuple[Any, int]:
+    gc.collect()
+    tracemalloc.start()
+    store = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return store, size
+
+
+def _build_dict(req: ScheduleRequest) -> dict[str, Order]:
+    # Fresh Orders, like the ones the API validates from a request body.
+    return {o.id: Order.model_validate(o.model_dump()) for o in req.orders}
+
+
+def _build_table(req: ScheduleRequest) -> OrderTable:
+    # Built from the same kind of fresh Orders, which are dropped right after.
+    table = OrderTable()
+    table.extend(Order.model_validate(o.model_dump()) for o in req.orders)
+    return table
+
+
+def _best_of(runs: int, fn: Callable[[], Any]) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--patients", type=int, default=400)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    req = generate_workload(WorkloadSpec(patients=args.patients, orders=args.orders), now=now)
+    patients = {p.id: p for p in req.patients}
+    n = len(req.orders)
+
+    orders, dict_bytes = _measure(lambda: _build_dict(req))
+    table, table_bytes = _measure(lambda: _build_table(req))
+    print(f"dict[str, Order] {dict_bytes / n:>8.0f} B/order   {dict_bytes / 2**20:>8.1f} MiB")
+    print(f"OrderTable       {table_bytes / n:>8.0f} B/order   {table_bytes / 2**20:>8.1f} MiB")
+
+    from_orders = _best_of(args.runs, lambda: score_orders(now, patients, orders.values()))
+    from_table = _best_of(args.runs, lambda: score_table(now, patients, table))
+    print(f"full rescore: score_orders {from_orders * 1000:.1f} ms   score_table {from_table * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+scheduler benchmark suite
+
+times each stage of a /schedule/generate call separately, on synthetic workloads
+from app/services/synthetic.py:
+
+- validate:  ScheduleRequest.model_validate_json on the raw request bytes
+- score:     score_orders (scoring + full sort)
+- schedule:  generate_schedule (scoring + selection + placement)
+- serialize: ScheduleResponse.model_dump_json
+
+usage, from the repo root:
+
+    # measure and save a baseline for this machine
+    python -m benchmarks.bench_scheduler --save benchmarks/baseline.json
+
+    # after a change: measure again and fail if a stage got slower than the tolerance
+    python -m benchmarks.bench_scheduler --compare benchmarks/baseline.json --tolerance 0.25
+
+baselines are machine specific, so they are not committed (see .gitignore).
+each stage reports the best of --repeat runs, which is the least noisy number.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+from app.schemas.clinical import ScheduleRequest, ScheduleResponse
+from app.services.scheduler import generate_schedule, score_orders
+from app.services.synthetic import WorkloadSpec, generate_workload
+
+DEFAULT_SIZES = [10, 100, 1_000, 10_000, 100_000]
+STAGES = ["validate", "score", "schedule", "serialize"]
+
+
+def _best_of(repeat: int, fn: Callable[[], object]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(size: int, repeat: int) -> dict[str, float]:
+    """
+    Seconds per stage for one workload size.
+    """
+    req = generate_workload(WorkloadSpec(patients=max(1, size // 20), orders=size, seed=size))
+    raw = req.model_dump_json()
+    patients_by_id = {p.id: p for p in req.patients}
+    now = datetime.now(timezone.utc)
+    response = generate_schedule(req)
+
+    return {
+        "validate": _best_of(repeat, lambda: ScheduleRequest.model_validate_json(raw)),
+        "score": _best_of(repeat, lambda: score_orders(now, patients_by_id, req.orders)),
+        "schedule": _best_of(repeat, lambda: generate_schedule(req)),
+        "serialize": _best_of(repeat, lambda: ScheduleResponse.model_dump_json(response)),
+    }
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float,
+    min_delta: float,
+) -> list[str]:
+    """
+    Returns one message per (size, stage) that regressed beyond the tolerance.
+
+    Slowdowns smaller than `min_delta` seconds are ignored, otherwise the
+    10-order workloads flag timer noise as +60% regressions.
+    """
+    regressions = []
+    for size, stages in results.items():
+        for stage, seconds in stages.items():
+            before = baseline.get(size, {}).get(stage)
+            if before is None:
+                continue
+            if seconds > before * (1 + tolerance) and seconds - before > min_delta:
+                regressions.append(
+                    f"{size:>7} orders  {stage:<9} {before * 1000:9.2f} ms -> {seconds * 1000:9.2f} ms "
+                    f"(+{(seconds / before - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", metavar="PATH", help="write results as a baseline JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON file to check against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    results: dict[str, dict[str, float]] = {}
+    print(f"{'orders':>7}  " + "  ".join(f"{stage:>12}" for stage in STAGES))
+    for size in args.sizes:
+        # big workloads are slow to build and to run, fewer repeats is plenty
+        repeat = args.repeat if size < 50_000 else max(1, args.repeat // 2)
+        stages = measure(size, repeat)
+        results[str(size)] = stages
+        print(f"{size:>7}  " + "  ".join(f"{stages[s] * 1000:9.2f} ms" for s in STAGES))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms / 1000)
+        if regressions:
+            print(f"\nregressions beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print(f"\nno stage regressed beyond {args.tolerance:.0%}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
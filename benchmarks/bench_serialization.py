@@ -0,0 +1,124 @@
+"""
+response serialization benchmark
+
+compares, per placed task, what a schedule response costs to build and send:
+
+- before: the response built with full validation, then returned through
+  response_model, so FastAPI validates everything again and serializes it
+  (its own serialize_response, then json.dumps like JSONResponse does)
+- after:  the response wrapper built with model_construct around the tasks,
+  serialized once to bytes through the cached TypeAdapter in app/api/responses.py
+
+it also times building the tasks themselves with model_construct. on pydantic 2.x
+that is slower than validating them (model_construct is pure python, validation
+runs in pydantic-core), which is why the scheduler only skips validation for the
+ScheduleResponse wrapper.
+
+usage, from the repo root:
+
+    python -m benchmarks.bench_serialization --tasks 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import time
+from typing import Callable
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.api.responses import SCHEDULE_ADAPTER
+from app.schemas.clinical import ScheduledTask, ScheduleResponse, ScoreBreakdown
+from app.services.scheduler import generate_schedule
+from app.services.synthetic import WorkloadSpec, generate_workload
+
+
+def _best_of(repeat: int, fn: Callable[[], object]) -> float:
+    # GC off while timing (like timeit), otherwise a collection triggered by
+    # thousands of new models lands in whichever variant happens to run next.
+    best = float("inf")
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=5000, help="roughly how many tasks to place")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Assessments and labs average about 11 minutes, so give the shift enough
+    # hours for every order to fit and every order to become a task.
+    spec = WorkloadSpec(patients=50, orders=args.tasks, shift_hours=args.tasks * 20 / 60)
+    schedule = generate_schedule(generate_workload(spec))
+    rows = [task.model_dump() for task in schedule.tasks]
+    n = len(rows)
+
+    def validated_tasks() -> list[ScheduledTask]:
+        return [
+            ScheduledTask(**{**row, "score_breakdown": ScoreBreakdown(**row["score_breakdown"])})
+            for row in rows
+        ]
+
+    def constructed_tasks() -> list[ScheduledTask]:
+        return [
+            ScheduledTask.model_construct(
+                **{**row, "score_breakdown": ScoreBreakdown.model_construct(**row["score_breakdown"])}
+            )
+            for row in rows
+        ]
+
+    def build_before() -> ScheduleResponse:
+        return ScheduleResponse(
+            generated_at=schedule.generated_at, tasks=validated_tasks(), notes=[], unscheduled_count=0
+        )
+
+    def build_after() -> ScheduleResponse:
+        return ScheduleResponse.model_construct(
+            generated_at=schedule.generated_at, tasks=validated_tasks(), notes=[], unscheduled_count=0
+        )
+
+    field = create_model_field(name="Response_schedule", type_=ScheduleResponse, mode="serialization")
+
+    def fastapi_serialize() -> bytes:
+        content = asyncio.run(serialize_response(field=field, response_content=schedule))
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+    def adapter_serialize() -> bytes:
+        return SCHEDULE_ADAPTER.dump_json(schedule)
+
+    assert json.loads(fastapi_serialize()) == json.loads(adapter_serialize())
+
+    timings = {
+        "build (before)": _best_of(args.repeat, build_before),
+        "build (after)": _best_of(args.repeat, build_after),
+        "serialize (response_model)": _best_of(args.repeat, fastapi_serialize),
+        "serialize (TypeAdapter)": _best_of(args.repeat, adapter_serialize),
+        "tasks only, validated": _best_of(args.repeat, validated_tasks),
+        "tasks only, model_construct": _best_of(args.repeat, constructed_tasks),
+    }
+
+    print(f"{n} tasks")
+    for name, seconds in timings.items():
+        print(f"  {name:<28} {seconds * 1000:9.2f} ms   {seconds / n * 1e6:7.2f} us/task")
+
+    before = timings["build (before)"] + timings["serialize (response_model)"]
+    after = timings["build (after)"] + timings["serialize (TypeAdapter)"]
+    print(f"  {'before, total':<28} {before / n * 1e6:7.2f} us/task")
+    print(f"  {'after, total':<28} {after / n * 1e6:7.2f} us/task   ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
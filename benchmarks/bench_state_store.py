@@ -0,0 +1,77 @@
+"""
+state store benchmark
+
+compares mutation throughput of the in-memory ShiftContext and the sqlite
+backed one, plus how long a warm restart (reloading everything from disk) takes.
+
+run it from the repo root:
+
+    python -m benchmarks.bench_state_store --orders 20000
+
+uses simulated data only, and a throwaway db in a temp directory.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+from app.core.sqlite_store import SqliteShiftContext
+from app.core.state import ShiftContext
+from app.schemas.clinical import Order, Patient
+from app.services.synthetic import WorkloadSpec, generate_workload
+
+
+def _run(label: str, ctx: ShiftContext, patients: list[Patient], orders: list[Order]) -> None:
+    ctx.set_patients(patients)
+
+    start = time.perf_counter()
+    for o in orders:
+        ctx.add_order(o)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for o in orders:
+        ctx.remove_order(o.id)
+    deletes = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ctx.add_orders(orders)
+    bulk = time.perf_counter() - start
+
+    n = len(orders)
+    print(
+        f"{label:<8} add_order {n / single:>10,.0f}/s   "
+        f"remove_order {n / deletes:>10,.0f}/s   "
+        f"add_orders (bulk) {n / bulk:>10,.0f}/s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--patients", type=int, default=200)
+    args = parser.parse_args()
+
+    workload = generate_workload(WorkloadSpec(patients=args.patients, orders=args.orders))
+    patients, orders = workload.patients, workload.orders
+
+    _run("memory", ShiftContext(), patients, orders)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        ctx = SqliteShiftContext(path)
+        _run("sqlite", ctx, patients, orders)
+        ctx.close()
+
+        start = time.perf_counter()
+        warm = SqliteShiftContext(path)
+        elapsed = time.perf_counter() - start
+        print(f"warm restart: loaded {len(warm.orders):,} orders in {elapsed * 1000:.1f} ms")
+        warm.close()
+
+
+if __name__ == "__main__":
+    main()
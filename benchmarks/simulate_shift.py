@@ -0,0 +1,54 @@
+"""
+simulated shift runs
+
+replays a synthetic shift (app/services/synthetic.py) through the shift
+simulator (app/services/simulation.py) with a simulated nurse following the
+plan, once per placement mode, and prints lateness / left over orders side by side.
+
+use it to check what a scoring or placement change does to a whole shift:
+run it before and after the change with the same seed.
+
+    python -m benchmarks.simulate_shift --patients 5 --orders 60 --seed 3
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from app.services.simulation import ShiftSimulator
+from app.services.synthetic import WorkloadSpec, generate_shift_events
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=5)
+    parser.add_argument("--orders", type=int, default=60)
+    parser.add_argument("--hours", type=float, default=12.0)
+    parser.add_argument("--overdue", type=float, default=0.05, help="fraction of orders already overdue at shift start")
+    parser.add_argument("--discontinue", type=float, default=0.05, help="fraction of orders cancelled after arriving")
+    parser.add_argument("--placement", nargs="+", default=["sequential", "gaps"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    spec = WorkloadSpec(
+        patients=args.patients,
+        orders=args.orders,
+        shift_hours=args.hours,
+        overdue_fraction=args.overdue,
+        seed=args.seed,
+    )
+    req, events = generate_shift_events(spec, discontinue_fraction=args.discontinue)
+
+    summaries = {
+        placement: ShiftSimulator(req.shift, req.patients, placement=placement).run(events).summary()
+        for placement in args.placement
+    }
+
+    print(f"{len(events)} events, {args.orders} orders, {args.patients} patients, {args.hours:g}h shift\n")
+    print(f"{'':<20}" + "".join(f"{p:>14}" for p in summaries))
+    for key in next(iter(summaries.values())):
+        print(f"{key:<20}" + "".join(f"{s[key]:>14}" for s in summaries.values()))
+
+
+if __name__ == "__main__":
+    main()
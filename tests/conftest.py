@@ -0,0 +1,43 @@
+"""
+shared test fixtures. run the suite from the repo root:
+
+    python -m pytest -q
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routes import state as state_routes
+from app.main import app
+
+START = datetime(2026, 1, 5, 7, 0, tzinfo=timezone.utc)
+
+
+class Clock:
+    """
+    What /state routes see as now in tests that use `client`.
+    """
+    now = START + timedelta(hours=1)
+
+
+class _FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return Clock.now
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """
+    TestClient on a unit of its own, with the /state routes on Clock.now.
+    """
+    monkeypatch.setattr(state_routes, "datetime", _FrozenDatetime)
+    Clock.now = START + timedelta(hours=1)
+    c = TestClient(app)
+    c.headers["X-Unit-Id"] = f"test-{uuid.uuid4().hex[:12]}"
+    return c
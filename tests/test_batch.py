@@ -0,0 +1,38 @@
+"""
+batch scheduling ([user-006]).
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services import batch
+
+
+def test_batch_keeps_order_and_isolates_bad_items(monkeypatch):
+    monkeypatch.setattr(settings, "batch_executor", "thread")
+    monkeypatch.setattr(batch, "_executor", None)
+    client = TestClient(app)
+    payload = client.get("/demo/payload").json()
+
+    resp = client.post("/schedule/generate/batch", json={"requests": [payload, {"bad": 1}, payload]})
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert results[0]["schedule"] is not None and results[2]["schedule"] is not None
+    assert results[1]["schedule"] is None and "Field required" in results[1]["error"]
+
+
+def test_process_pool_does_not_fork_the_server(monkeypatch):
+    monkeypatch.setattr(settings, "batch_executor", "process")
+    monkeypatch.setattr(batch, "_executor", None)
+    executor = batch.get_executor()
+    try:
+        assert isinstance(executor, ProcessPoolExecutor)
+        assert executor._mp_context.get_start_method() in ("forkserver", "spawn")
+    finally:
+        executor.shutdown()
@@ -0,0 +1,54 @@
+"""
+pushed schedule updates ([user-022]).
+"""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import timedelta
+
+from app.api.routes import state as state_routes
+from app.services.broadcast import DebouncedBroadcaster
+from tests.conftest import START
+
+
+def test_failed_compute_keeps_the_broadcaster_alive():
+    calls = 0
+
+    async def compute(key):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise RuntimeError("replan blew up")
+        return str(calls), b"{}"
+
+    async def run() -> list[bytes]:
+        feed = DebouncedBroadcaster(compute, debounce_seconds=0.01, heartbeat_seconds=5, refresh_seconds=60)
+        stream = feed.stream("u")
+        received = [await anext(stream)]  # initial event, compute #1
+
+        feed.changed("u")  # compute #2 raises
+        await asyncio.sleep(0.05)
+        feed.changed("u")  # compute #3 still gets through
+        received.append(await asyncio.wait_for(anext(stream), 1))
+        await stream.aclose()
+        return received
+
+    received = asyncio.run(run())
+    assert [r.split(b"\n")[1] for r in received] == [b"id: 1", b"id: 3"]
+
+
+def test_rejected_transaction_notifies_nobody(client, monkeypatch):
+    client.post("/state/shift", json={
+        "start_at": START.isoformat(),
+        "end_at": (START + timedelta(hours=12)).isoformat(),
+    })
+    notified = []
+    monkeypatch.setattr(state_routes._feed, "changed", notified.append)
+
+    bad = {"operations": [{"op": "delete_order", "order_id": "nope"}]}
+    assert client.post("/state/transaction", json=bad).status_code == 422
+    assert notified == []
+
+    client.post("/state/patients", json=[{"id": "p1", "display_name": "A", "acuity": "low"}])
+    assert notified == [client.headers["X-Unit-Id"]]
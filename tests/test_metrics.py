@@ -0,0 +1,32 @@
+"""
+request validation timing ([user-015]).
+
+the "validate" stage is recorded by the /schedule/generate route, not by the
+schema: building a ScheduleRequest anywhere else (batch workers, scripts,
+benchmarks) must not add to it.
+"""
+
+from __future__ import annotations
+
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+from app.main import app
+from app.schemas.clinical import ScheduleRequest
+
+
+def _validate_count() -> int:
+    return metrics.registry.stages.get("validate", (None, 0.0, 0))[2]
+
+
+def test_validate_stage_is_recorded_per_request_not_per_model(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    client = TestClient(app)
+    payload = client.get("/demo/payload").json()
+
+    before = _validate_count()
+    ScheduleRequest.model_validate(payload)
+    assert _validate_count() == before
+
+    assert client.post("/schedule/generate", json=payload).status_code == 200
+    assert _validate_count() == before + 1
@@ -0,0 +1,46 @@
+"""
+free time index for gap placement ([user-018]).
+
+FreeTimeline answers nearest-fit queries from a segment tree. These check it
+against a plain list of free minutes.
+"""
+
+from __future__ import annotations
+
+import random
+from typing import Optional
+
+import pytest
+
+from app.services.placement import FreeTimeline
+
+
+def _brute_nearest_fit(free: list[bool], target: int, duration: int) -> Optional[int]:
+    minutes = len(free)
+    if duration <= 0 or duration > minutes:
+        return None
+    target = min(max(target, 0), minutes - duration)
+    fits = [s for s in range(minutes - duration + 1) if all(free[s:s + duration])]
+    if not fits:
+        return None
+    # closest to the target, earlier start on a tie
+    return min(fits, key=lambda s: (abs(s - target), s))
+
+
+@pytest.mark.parametrize("minutes", [1, 7, 64, 100, 721])
+def test_nearest_fit_matches_brute_force(minutes):
+    rng = random.Random(minutes)
+    timeline = FreeTimeline(minutes)
+    free = [True] * minutes
+
+    for _ in range(300):
+        target = rng.randint(-10, minutes + 10)
+        duration = rng.randint(1, 30)
+        expected = _brute_nearest_fit(free, target, duration)
+        assert timeline.nearest_fit(target, duration) == expected
+        assert timeline.longest_free == max(
+            (len(run) for run in "".join("x" if f else " " for f in free).split()), default=0
+        )
+        if expected is not None:
+            timeline.occupy(expected, duration)
+            free[expected:expected + duration] = [False] * duration
@@ -0,0 +1,98 @@
+"""
+recurring orders ([user-021]).
+
+- occurrence ids only parse in the spelling occurrence_id makes
+- a shift sees the occurrences due in its window, which reaches OVERDUE_LOOKBACK back
+- deleting an occurrence removes that one occurrence for good
+- completed occurrences before the window are forgotten
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pytest
+
+from app.core.state import ShiftContext
+from app.schemas.clinical import Patient, RecurringOrder, Shift
+from app.services.recurring import occurrence_id, parse_occurrence_id
+from tests.conftest import START
+
+
+@pytest.mark.parametrize("order_id", ["vit@01", "vit@00", "vit@١", "vit@²", "vit@+1", "vit@", "@1"])
+def test_only_canonical_occurrence_ids_parse(order_id):
+    assert parse_occurrence_id(order_id) is None
+
+
+def test_occurrence_ids_round_trip():
+    for index in (0, 1, 10, 1234):
+        assert parse_occurrence_id(occurrence_id("a@b", index)) == ("a@b", index)
+
+
+def test_completed_occurrences_before_the_window_are_forgotten():
+    ctx = ShiftContext()
+    ctx.set_patients([Patient(id="p1", display_name="A", acuity="medium")])
+    ctx.add_recurring(RecurringOrder(
+        id="vit",
+        patient_id="p1",
+        type="assessment",
+        description="q15min checks",
+        first_due_at=START,
+        interval_minutes=15,
+    ))
+
+    # First shift: complete occurrences 0..3 (07:00 - 07:45).
+    ctx.set_shift(Shift(start_at=START, end_at=START + timedelta(hours=4)))
+    for k in range(4):
+        assert ctx.complete_occurrence(f"vit@{k}") is not None
+
+    # Next shift starts at 11:00, the window reaches back to 10:00 (index 12).
+    ctx.set_shift(Shift(start_at=START + timedelta(hours=4), end_at=START + timedelta(hours=8)))
+    ctx.snapshot(START + timedelta(hours=4))
+    assert "vit" not in ctx._recurring_done
+
+    # Completions inside the window are kept.
+    assert ctx.complete_occurrence("vit@13") is not None
+    ctx.snapshot(START + timedelta(hours=4, minutes=30))
+    assert ctx._recurring_done["vit"] == {13}
+    assert "vit@13" not in {item.order.id for item in ctx.snapshot(START + timedelta(hours=5)).ranked}
+
+
+def _replanned_ids(client) -> list[str]:
+    return sorted(t["order_id"] for t in client.post("/state/replan").json()["tasks"])
+
+
+def _series_client(client):
+    client.post("/state/shift", json={
+        "start_at": START.isoformat(),
+        "end_at": (START + timedelta(hours=3)).isoformat(),
+    })
+    client.post("/state/patients", json=[{"id": "p1", "display_name": "A", "acuity": "medium"}])
+    # q30min since 05:00: index 2 is 06:00, the first one inside the lookback
+    resp = client.post("/state/recurring-orders", json={
+        "id": "vit",
+        "patient_id": "p1",
+        "type": "assessment",
+        "description": "q30min checks",
+        "first_due_at": (START - timedelta(hours=2)).isoformat(),
+        "interval_minutes": 30,
+    })
+    assert resp.status_code == 201
+    return client
+
+
+def test_shift_sees_occurrences_in_its_window(client):
+    _series_client(client)
+    # 06:00 .. 09:30: the lookback hour plus the 3 hour shift, end exclusive
+    assert _replanned_ids(client) == sorted(f"vit@{k}" for k in range(2, 10))
+
+
+def test_deleting_an_occurrence_removes_only_that_one(client):
+    _series_client(client)
+    assert client.delete("/state/orders/vit@4").status_code == 204
+    assert client.delete("/state/orders/vit@4").status_code == 404
+    # outside the window, or not canonical: not an order of this shift
+    assert client.delete("/state/orders/vit@1").status_code == 404
+    assert client.delete("/state/orders/vit@05").status_code == 404
+
+    assert _replanned_ids(client) == sorted(f"vit@{k}" for k in (2, 3, 5, 6, 7, 8, 9))
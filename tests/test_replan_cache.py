@@ -0,0 +1,53 @@
+"""
+replan cache freshness ([user-009]).
+
+within one time bucket a cached plan is still stale once one of its orders
+becomes due: the urgency step reorders the plan, so it has to be recomputed
+and tagged with a new ETag.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from tests.conftest import START, Clock
+
+
+def _setup(client) -> None:
+    client.post("/state/shift", json={
+        "start_at": START.isoformat(),
+        "end_at": (START + timedelta(hours=12)).isoformat(),
+    })
+    client.post("/state/patients", json=[{"id": "p1", "display_name": "A", "acuity": "medium"}])
+    client.post("/state/orders", json={
+        "id": "soon",
+        "patient_id": "p1",
+        "type": "assessment",
+        "description": "due in a few seconds",
+        "due_at": (Clock.now + timedelta(seconds=5)).isoformat(),
+    })
+
+
+def test_polls_within_a_bucket_hit_the_cache(client):
+    _setup(client)
+    first = client.post("/state/replan")
+    Clock.now += timedelta(seconds=2)
+    again = client.post("/state/replan", headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+
+
+def test_plan_expires_when_an_order_becomes_due(client):
+    _setup(client)
+    first = client.post("/state/replan")
+    assert first.headers["x-cache"] == "MISS"
+
+    # Same time bucket, but the order is now due.
+    Clock.now += timedelta(seconds=6)
+    after = client.post("/state/replan", headers={"If-None-Match": first.headers["etag"]})
+    assert after.status_code == 200
+    assert after.headers["x-cache"] == "MISS"
+    assert after.headers["etag"] != first.headers["etag"]
+
+    # The old plan is still there to diff against.
+    diff = client.post("/state/replan", params={"since": first.headers["etag"]}).json()
+    assert diff["full"] is False
@@ -0,0 +1,55 @@
+"""
+replan diffs during a live shift ([user-017]).
+
+a live timeline starts at "now", so between two polls every task slides by the
+time that passed. the diff has to report that as offset_seconds, not as every
+task having moved.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from tests.conftest import START, Clock
+
+
+def _order(order_id: str, due_minutes: int) -> dict:
+    return {
+        "id": order_id,
+        "patient_id": "p1",
+        "type": "assessment",
+        "description": order_id,
+        "due_at": (START + timedelta(minutes=due_minutes)).isoformat(),
+        "duration_minutes": 10,
+    }
+
+
+def test_one_insert_is_one_added_and_nothing_moved(client):
+    client.post("/state/shift", json={
+        "start_at": START.isoformat(),
+        "end_at": (START + timedelta(hours=12)).isoformat(),
+    })
+    client.post("/state/patients", json=[{"id": "p1", "display_name": "A", "acuity": "medium"}])
+    for i in range(5):
+        client.post("/state/orders", json=_order(f"o{i}", 180 + 60 * i))
+
+    first = client.post("/state/replan")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    # A few minutes later, one more order, due after everything else.
+    Clock.now += timedelta(minutes=7)
+    client.post("/state/orders", json=_order("late", 600))
+
+    diff = client.post("/state/replan", params={"since": etag}).json()
+    assert diff["full"] is False
+    assert [t["order_id"] for t in diff["added"]] == ["late"]
+    assert diff["moved"] == []
+    assert diff["removed"] == []
+    assert diff["offset_seconds"] == 7 * 60
+
+
+def test_if_none_match_star_without_shift_is_422(client):
+    # [user-017] there is no schedule to match yet
+    resp = client.post("/state/replan", headers={"If-None-Match": "*"})
+    assert resp.status_code == 422
@@ -0,0 +1,82 @@
+"""
+scoring and selection equivalences.
+
+- [user-001] the numpy path of score_orders scores and ranks exactly like the loop
+- [user-024] score_table over an OrderTable ranks like score_orders over its orders
+- [user-003] the incremental PriorityIndex ranks like a full rescore
+- [user-004] heap selection builds the same schedule as a full sort
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services import scheduler
+from app.services.order_table import OrderTable
+from app.services.priority import PriorityIndex
+from app.services.scheduler import generate_schedule, score_orders, score_table
+from app.services.synthetic import WorkloadSpec, generate_workload
+
+NOW = datetime(2026, 1, 5, 7, 0, tzinfo=timezone.utc)
+
+
+def _workload(orders: int, seed: int = 0):
+    req = generate_workload(WorkloadSpec(patients=40, orders=orders, seed=seed), now=NOW)
+    return req, {p.id: p for p in req.patients}
+
+
+def _ranking(scored) -> list[tuple[str, float]]:
+    return [(item.order.id, item.score) for item in scored]
+
+
+def _assert_same_ranking(got, expected) -> None:
+    assert [order_id for order_id, _ in got] == [order_id for order_id, _ in expected]
+    assert [score for _, score in got] == pytest.approx([score for _, score in expected], abs=1e-9)
+
+
+def test_vectorized_scoring_matches_the_loop(monkeypatch):
+    pytest.importorskip("numpy")
+    req, patients = _workload(3000)
+
+    vectorized = score_orders(NOW, patients, req.orders)
+    monkeypatch.setattr(scheduler, "np", None)
+    loop = score_orders(NOW, patients, req.orders)
+
+    _assert_same_ranking(_ranking(vectorized), _ranking(loop))
+
+
+@pytest.mark.parametrize("orders", [200, 3000])
+def test_score_table_matches_score_orders(orders):
+    req, patients = _workload(orders, seed=1)
+    table = OrderTable()
+    table.extend(req.orders)
+
+    _assert_same_ranking(_ranking(score_table(NOW, patients, table)), _ranking(score_orders(NOW, patients, req.orders)))
+
+
+def test_priority_index_matches_a_full_rescore():
+    req, patients = _workload(500, seed=2)
+    initial, pushed = req.orders[:400], req.orders[400:]
+    table = OrderTable()
+    table.extend(initial)
+
+    index = PriorityIndex()
+    index.rebuild(NOW, patients, table)
+    for order in pushed:
+        index.push(patients[order.patient_id], order)
+    removed = {o.id for o in req.orders[::7]}
+    for order_id in removed:
+        index.discard(order_id)
+
+    remaining = [o for o in initial + pushed if o.id not in removed]
+    _assert_same_ranking(_ranking(index.iter_ranked()), _ranking(score_orders(NOW, patients, remaining)))
+
+
+@pytest.mark.parametrize("placement", ["sequential", "gaps"])
+def test_heap_selection_matches_sort(placement):
+    req, _ = _workload(1500, seed=3)
+    by_heap = generate_schedule(req, selection="heap", placement=placement, optimize_ms=0, now=NOW)
+    by_sort = generate_schedule(req, selection="sort", placement=placement, optimize_ms=0, now=NOW)
+    assert by_heap == by_sort
@@ -0,0 +1,66 @@
+"""
+all-or-nothing writes through the API.
+
+- [user-008] POST /state/orders/bulk with one bad row adds nothing
+- [user-023] POST /state/transaction with one bad operation applies nothing
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from tests.conftest import START
+
+
+def _order(order_id: str, patient_id: str = "p1") -> dict:
+    return {
+        "id": order_id,
+        "patient_id": patient_id,
+        "type": "lab",
+        "description": order_id,
+        "due_at": (START + timedelta(hours=2)).isoformat(),
+    }
+
+
+def _setup(client) -> None:
+    client.post("/state/shift", json={
+        "start_at": START.isoformat(),
+        "end_at": (START + timedelta(hours=12)).isoformat(),
+    })
+    client.post("/state/patients", json=[{"id": "p1", "display_name": "A", "acuity": "low"}])
+    client.post("/state/orders", json=_order("a"))
+
+
+def _order_ids(client) -> list[str]:
+    return [o["id"] for o in client.get("/state").json()["orders"]]
+
+
+def test_bulk_with_a_bad_row_adds_nothing(client):
+    _setup(client)
+    rows = [_order("b"), _order("c", patient_id="nobody"), {"id": "d"}, _order("a")]
+
+    resp = client.post("/state/orders/bulk", json=rows)
+    assert resp.status_code == 422
+    assert [e["index"] for e in resp.json()["errors"]] == [1, 2, 3]
+    assert _order_ids(client) == ["a"]
+
+    assert client.post("/state/orders/bulk", json=rows[:1]).status_code == 201
+    assert _order_ids(client) == ["a", "b"]
+
+
+def test_transaction_with_a_bad_operation_applies_nothing(client):
+    _setup(client)
+    txn = {"operations": [
+        {"op": "add_order", "order": _order("b")},
+        {"op": "delete_order", "order_id": "a"},
+        {"op": "delete_order", "order_id": "a"},
+    ]}
+
+    resp = client.post("/state/transaction", json=txn)
+    assert resp.status_code == 422
+    assert [e["index"] for e in resp.json()["errors"]] == [2]
+    assert _order_ids(client) == ["a"]
+
+    txn["operations"].pop()
+    assert client.post("/state/transaction", json=txn).json()["applied"] == 2
+    assert _order_ids(client) == ["b"]
@@ -0,0 +1,125 @@
+"""
+persistent shift contexts.
+
+- [user-010] a sqlite context reopened on the same file has the same state
+- [user-023] a transaction (or bulk add) that fails partway leaves memory and disk
+  at the state from before it, and the context keeps working
+- [user-012] a write from a worker that missed another worker's change is
+  refused with StateConflictError (409 from the API), nothing is applied
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import state
+from app.core.config import settings
+from app.core.shared_store import SharedShiftContext, StateConflictError
+from app.core.sqlite_store import SqliteShiftContext
+from app.main import app
+from app.schemas.clinical import Order, Patient, RecurringOrder, Shift
+from tests.conftest import START
+
+NOW = START + timedelta(hours=1)
+
+
+def _order(order_id: str, minutes: int = 30) -> Order:
+    return Order(id=order_id, patient_id="p1", type="lab", description=order_id, due_at=NOW + timedelta(minutes=minutes))
+
+
+def _fill(ctx) -> None:
+    ctx.set_shift(Shift(start_at=START, end_at=START + timedelta(hours=12)))
+    ctx.set_patients([Patient(id="p1", display_name="A", acuity="high")])
+    ctx.add_orders([_order("a", 10), _order("b", 90)])
+    ctx.add_recurring(RecurringOrder(
+        id="vit", patient_id="p1", type="assessment", description="q1h",
+        first_due_at=START, interval_minutes=60,
+    ))
+    ctx.complete_occurrence("vit@1")
+
+
+def _state(ctx) -> tuple:
+    ranked = [(item.order.id, item.score) for item in ctx.snapshot(NOW).ranked]
+    return ctx.shift, ctx.patients, ctx.orders, ctx.recurring_orders, ranked
+
+
+@pytest.mark.parametrize("cls", [SqliteShiftContext, SharedShiftContext])
+def test_reopened_context_has_the_same_state(tmp_path, cls):
+    path = str(tmp_path / "state.db")
+    ctx = cls(path, unit_id="u")
+    _fill(ctx)
+    before = _state(ctx)
+    ctx.close()
+
+    assert _state(cls(path, unit_id="u")) == before
+
+
+@pytest.mark.parametrize("cls", [SqliteShiftContext, SharedShiftContext])
+def test_failed_transaction_leaves_memory_and_disk_as_before(tmp_path, cls):
+    path = str(tmp_path / "state.db")
+    ctx = cls(path, unit_id="u")
+    _fill(ctx)
+    before = _state(ctx)
+
+    with pytest.raises(sqlite3.IntegrityError):
+        with ctx.transaction():
+            ctx.add_order(_order("c"))
+            ctx.remove_order("a")
+            ctx.add_order(_order("c"))  # primary key clash on disk
+
+    assert _state(ctx) == before
+    assert _state(cls(path, unit_id="u")) == before
+
+    ctx.add_order(_order("d"))
+    assert [o.id for o in cls(path, unit_id="u").orders] == ["a", "b", "d"]
+
+
+@pytest.mark.parametrize("cls", [SqliteShiftContext, SharedShiftContext])
+def test_failed_bulk_add_applies_nothing(tmp_path, cls):
+    path = str(tmp_path / "state.db")
+    ctx = cls(path, unit_id="u")
+    _fill(ctx)
+    before = _state(ctx)
+
+    with pytest.raises(sqlite3.IntegrityError):
+        ctx.add_orders([_order("c"), _order("d"), _order("a")])
+
+    assert _state(ctx) == before
+    assert _state(cls(path, unit_id="u")) == before
+
+
+def test_stale_shared_write_is_refused(tmp_path):
+    path = str(tmp_path / "state.db")
+    worker_a = SharedShiftContext(path, unit_id="u")
+    worker_b = SharedShiftContext(path, unit_id="u")
+    _fill(worker_a)
+
+    with worker_a.lock:  # synced here, then worker b writes before a does
+        worker_b.add_order(_order("from-b"))
+        with pytest.raises(StateConflictError):
+            worker_a.add_order(_order("from-a"))
+
+    # a catches up on its next lock, without its own write
+    assert [o.id for o in worker_a.orders] == ["a", "b", "from-b"]
+    assert [o.id for o in SharedShiftContext(path, unit_id="u").orders] == ["a", "b", "from-b"]
+
+
+def test_stale_shared_write_is_a_409(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "state_backend", "shared")
+    monkeypatch.setattr(settings, "sqlite_path", str(tmp_path / "state.db"))
+    monkeypatch.setattr(state, "_CONTEXTS", {})
+    client = TestClient(app)
+    headers = {"X-Unit-Id": "icu"}
+    client.post("/state/patients", json=[{"id": "p1", "display_name": "A", "acuity": "low"}], headers=headers)
+
+    # This worker stops seeing the others, another one writes.
+    monkeypatch.setattr(state.get_context("icu"), "_refresh", lambda: None)
+    SharedShiftContext(settings.sqlite_path, unit_id="icu").add_order(_order("other"))
+
+    resp = client.post("/state/orders", json=_order("mine").model_dump(mode="json"), headers=headers)
+    assert resp.status_code == 409
+    assert [o.id for o in SharedShiftContext(settings.sqlite_path, unit_id="icu").orders] == ["other"]